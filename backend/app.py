@@ -2,6 +2,14 @@ from flask import Flask, render_template, redirect, url_for
 from config import Config
 from extensions import db, login_manager, migrate, csrf
 from models import User, Event, Resource, Donation, Request, AdminResponse
+from routes.auth import auth_bp
+from routes.user import user_bp, build_map_feed
+from routes.admin import admin_bp
+from routes.volunteer import volunteer_bp
+from routes.sync import sync_bp
+from routes.search import search_bp
+from services import compression
+from sqlalchemy.orm import configure_mappers
 import os
 
 def create_app(config_class=Config):
@@ -19,16 +27,66 @@ def create_app(config_class=Config):
     migrate.init_app(app, db)
     # csrf.init_app(app) # Enable if CSRF needed globally, but might need template adjustments
     
-    # Register Blueprints
-    from routes.auth import auth_bp
-    from routes.user import user_bp
-    from routes.admin import admin_bp
-    from routes.volunteer import volunteer_bp
+    # Send GET reads to the read replica when one is configured
+    from services import replicas
+    replicas.init_app(app)
     
+    # Shed write floods with 429 before any database work
+    from services import admission
+    admission.init_app(app)
+    
+    # Render caches for shared dashboard fragments
+    from services import fragment_cache
+    fragment_cache.init_app(app)
+    
+    # CLI: flask archive
+    from services import archive
+    archive.init_app(app)
+    
+    # Incremental stock depletion forecasts
+    from services import forecast
+    forecast.init_app(app)
+    
+    # Edge-triggered low-stock alerts on every quantity change
+    from services import stock_alerts
+    stock_alerts.init_app(app)
+    
+    # Change log for delta sync; CLI: flask sync-compact
+    from services import changelog
+    changelog.init_app(app)
+    
+    # Background jobs for post-commit work; CLI: flask jobs worker|stats|purge
+    from services import jobs
+    jobs.init_app(app)
+    
+    # Full-text search index kept in sync on writes; CLI: flask search-reindex
+    from services import search
+    search.init_app(app)
+    
+    # Audit trail of state transitions, written in batches; CLI: flask audit
+    from services import audit
+    audit.init_app(app)
+    
+    # Request status fan-out to coalesced contributions
+    from services import coalescing
+    coalescing.init_app(app)
+    
+    # CLI: flask indexes check|ensure
+    from services import indexes
+    indexes.init_app(app)
+    
+    # Idempotency-Key store for retried submissions
+    from services import idempotency
+    idempotency.init_app(app)
+    
+    # Register Blueprints (imported at module level so a preloading server
+    # pays for them once in the master process)
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(user_bp, url_prefix='/user')
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(volunteer_bp, url_prefix='/volunteer')
+    app.register_blueprint(sync_bp, url_prefix='/sync')
+    app.register_blueprint(search_bp, url_prefix='/search')
     
     # Root Route
     @app.route('/')
@@ -37,14 +95,47 @@ def create_app(config_class=Config):
         
     return app
 
+def warm_app(app):
+    """
+    Do first-request work up front so forked workers start hot:
+    compile every template, configure ORM mappers and precompress the map feed.
+    Connections are disposed afterwards so workers never share a socket.
+    """
+    with app.app_context():
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+        configure_mappers()
+        
+        try:
+            body = build_map_feed()
+            etag = compression.body_etag(body)
+            for encoding in compression.available_encodings():
+                compression.body_cache.put((etag, encoding), compression.compress(body, encoding))
+        except Exception as e:
+            # A cold cache is not worth failing startup over
+            app.logger.warning(f"Map feed warm-up skipped: {e}")
+        
+        if db.engine.url.database not in (None, '', ':memory:'):
+            db.engine.dispose()
+
 def setup_database(app):
     """Setup database with sample data"""
+    if not app.config.get('AUTO_CREATE_SCHEMA', True):
+        # Production: schema is owned by migrations, skip create_all and the probe
+        return
+    
     with app.app_context():
         try:
             # Create all tables
             db.create_all()
             print("✅ Database tables created successfully!")
             
+            # create_all() never alters an existing table: catch up older databases
+            from services import indexes
+            changes = indexes.ensure_schema()
+            if any(changes.values()):
+                print(f"✅ Database schema brought up to date: {changes}")
+            
             # Check if we need to create sample data
             if not User.query.filter_by(email='admin@disaster.org').first():
                 print("Creating sample data...")
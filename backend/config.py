@@ -20,5 +20,83 @@ class Config:
         SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'disaster.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Optional read replica: GET views read from it, and a user's reads stay on
+    # the primary for REPLICA_STICKY_SECONDS after they write (keep it above the lag)
+    REPLICA_DATABASE_URI = os.environ.get('REPLICA_DATABASE_URI')
+    if DB_TYPE == 'mysql' and os.environ.get('DB_REPLICA_HOST'):
+        REPLICA_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{os.environ['DB_REPLICA_HOST']}/{DB_NAME}"
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URI} if REPLICA_DATABASE_URI else {}
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    
     # Session
-    PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
\ No newline at end of file
+    PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
+    
+    # Startup: production workers rely on migrations and preload/warm the app
+    AUTO_CREATE_SCHEMA = os.environ.get('AUTO_CREATE_SCHEMA', '1') == '1'
+    WARM_ON_STARTUP = os.environ.get('WARM_ON_STARTUP', '0') == '1'
+    
+    # Admission control for write endpoints: (tokens per second, burst)
+    ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', '1') == '1'
+    ADMISSION_GLOBAL_LIMIT = (200, 400)
+    ADMISSION_ADMIN_RESERVE = 0.2    # share of the global burst only signed-in admins may use
+    ADMISSION_USER_LIMIT = (5, 20)
+    ADMISSION_IP_LIMIT = (10, 30)    # anonymous traffic only
+    ADMISSION_ENDPOINT_LIMITS = {
+        'auth.register': (2, 10),
+        'auth.login': (20, 50),
+        'user.create_request': (50, 100),
+    }
+    
+    # Idempotency keys for retried submissions: 'database' shares them across
+    # worker processes; 'memory' is per process (only safe with a single worker)
+    IDEMPOTENCY_STORE = os.environ.get('IDEMPOTENCY_STORE', 'database')
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+    # A key whose first request has not finished within the lease (a worker
+    # killed mid-request) can be taken over by a retry; keep it above the worker timeout
+    IDEMPOTENCY_LEASE_SECONDS = int(os.environ.get('IDEMPOTENCY_LEASE_SECONDS', 30))
+    
+    # Stock depletion forecast: smoothing half-life and time bucket size
+    FORECAST_HALF_LIFE_HOURS = float(os.environ.get('FORECAST_HALF_LIFE_HOURS', 24))
+    FORECAST_BUCKET_HOURS = float(os.environ.get('FORECAST_BUCKET_HOURS', 1))
+    
+    # Recent stock alerts kept in memory for streaming subscribers
+    STOCK_ALERT_FEED_SIZE = int(os.environ.get('STOCK_ALERT_FEED_SIZE', 1000))
+    
+    # Delta sync: change log entries per page, and how long to hold back the
+    # newest entries so concurrent MySQL transactions commit before the token passes them
+    SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 1000))
+    SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', 2))
+    
+    # Background jobs: in-process worker threads per web process (0 = only
+    # `flask jobs worker` runs them), lease before a stuck job is retried, retry backoff
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_BACKOFF_BASE = 2
+    JOB_BACKOFF_MAX = 600
+    
+    # Volunteer delivery routes: default carrying capacity (request units) and stops per trip
+    ROUTE_CAPACITY = int(os.environ.get('ROUTE_CAPACITY', 200))
+    ROUTE_MAX_STOPS = int(os.environ.get('ROUTE_MAX_STOPS', 10))
+    
+    # Audit trail: entries are buffered after commit and written in batches by a
+    # background flusher every AUDIT_FLUSH_INTERVAL seconds (0 = no flusher, the
+    # committing request writes each full batch); AUDIT_BATCH_SIZE=1 writes at every commit
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 500))
+    AUDIT_BUFFER_SIZE = int(os.environ.get('AUDIT_BUFFER_SIZE', 10000))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+    
+    # Fold duplicate requests (same event and resource) into one open aggregate;
+    # an aggregate stops taking new demand at the max quantity (0 = no limit)
+    REQUEST_COALESCING_ENABLED = os.environ.get('REQUEST_COALESCING_ENABLED', '0') == '1'
+    REQUEST_COALESCING_MAX_QUANTITY = int(os.environ.get('REQUEST_COALESCING_MAX_QUANTITY', 0))
+    
+    # Fragment cache for shared dashboard sections
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 30))
+    
+    # Ranked /search pages, keyed on the search index version; common terms are
+    # costly to rank and search-as-you-type repeats the same prefixes
+    SEARCH_CACHE_ENABLED = os.environ.get('SEARCH_CACHE_ENABLED', '1') == '1'
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 30))
\ No newline at end of file
@@ -6,9 +6,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
+from services.replicas import RoutingSession
 
-# Database instance
-db = SQLAlchemy()
+# Database instance (reads may be routed to a replica, see services/replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Login manager for user sessions
 login_manager = LoginManager()
@@ -6,6 +6,7 @@ from extensions import db, login_manager
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from sqlalchemy import event, DDL
 
 class User(UserMixin, db.Model):
     """
@@ -19,7 +20,7 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     phone = db.Column(db.String(20), nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    is_admin = db.Column(db.Boolean, default=False)
+    is_admin = db.Column(db.Boolean, default=False, index=True)
     is_volunteer = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -44,6 +45,11 @@ class Event(db.Model):
     Represents different disaster incidents requiring relief coordination.
     """
     __tablename__ = 'events'
+    __table_args__ = (
+        # Events near a point (map bounding box)
+        db.Index('idx_events_location', 'latitude', 'longitude'),
+        {'sqlite_autoincrement': True},  # archived ids must never be handed out again
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -51,8 +57,8 @@ class Event(db.Model):
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     severity = db.Column(db.String(50), default='Medium')  # Low, Medium, High, Critical
-    status = db.Column(db.String(50), default='Active')    # Active, Resolved, Archived
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(50), default='Active', index=True)    # Active, Resolved, Archived
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     donations = db.relationship('Donation', backref='event', lazy=True)
@@ -70,7 +76,7 @@ class Resource(db.Model):
     category = db.Column(db.String(50), nullable=False, index=True)  # Food, Medical, Shelter, etc.
     description = db.Column(db.Text)
     total_quantity = db.Column(db.Integer, default=0)
-    available_quantity = db.Column(db.Integer, default=0)
+    available_quantity = db.Column(db.Integer, default=0, index=True)
     unit = db.Column(db.String(20), default='units')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -84,6 +90,11 @@ class Donation(db.Model):
     Updates resource quantities and can be tied to specific events.
     """
     __tablename__ = 'donations'
+    __table_args__ = (
+        # A user's donations, newest first (dashboard)
+        db.Index('idx_donations_user_donated', 'user_id', 'donated_at'),
+        {'sqlite_autoincrement': True},  # archived ids must never be handed out again
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
@@ -91,7 +102,7 @@ class Donation(db.Model):
     event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='SET NULL'), nullable=True, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     status = db.Column(db.String(50), default='Completed')  # Pending, Completed, Cancelled
-    donated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    donated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     notes = db.Column(db.Text)
 
 class Request(db.Model):
@@ -100,15 +111,27 @@ class Request(db.Model):
     Goes through approval workflow managed by administrators.
     """
     __tablename__ = 'requests'
+    __table_args__ = (
+        # Open request for an event and resource, when folding in duplicate demand
+        db.Index('idx_requests_event_resource_status', 'event_id', 'resource_id', 'status'),
+        # Admin queue by status, newest first
+        db.Index('idx_requests_status_created', 'status', 'created_at'),
+        # A user's requests, newest first (dashboard)
+        db.Index('idx_requests_user_created', 'user_id', 'created_at'),
+        # Closed requests past the archive retention window
+        db.Index('idx_requests_status_updated', 'status', 'updated_at'),
+        {'sqlite_autoincrement': True},  # archived ids must never be handed out again
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     resource_id = db.Column(db.Integer, db.ForeignKey('resources.id', ondelete='CASCADE'), nullable=False, index=True)
     event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
+    approved_quantity = db.Column(db.Integer)  # set on approval; below quantity when allocation served part
     urgency = db.Column(db.String(50), default='Medium')  # Low, Medium, High, Critical
     status = db.Column(db.String(50), default='Pending', index=True)  # Pending, Approved, Rejected, Fulfilled
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -120,22 +143,53 @@ class AdminResponse(db.Model):
     Tracks approval/rejection decisions and administrator comments.
     """
     __tablename__ = 'admin_responses'
+    __table_args__ = (
+        {'sqlite_autoincrement': True},  # archived ids must never be handed out again
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     request_id = db.Column(db.Integer, db.ForeignKey('requests.id', ondelete='CASCADE'), nullable=False, index=True)
     admin_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     action = db.Column(db.String(50), nullable=False)  # Approved, Rejected
     comment = db.Column(db.Text)
-    responded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    responded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationship
     admin = db.relationship('User', backref='responses')
 
+class RequestContribution(db.Model):
+    """
+    One user's share of a coalesced request. Duplicate demand for the same
+    event and resource is folded into one open Request; each submitter keeps
+    a contribution that follows the aggregate's status.
+    """
+    __tablename__ = 'request_contributions'
+    __table_args__ = (
+        {'sqlite_autoincrement': True},  # archived ids must never be handed out again
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(db.Integer, db.ForeignKey('requests.id', ondelete='CASCADE'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    urgency = db.Column(db.String(50), default='Medium')
+    status = db.Column(db.String(50), default='Pending')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    request_obj = db.relationship('Request', backref='contributions')
+
 class VolunteerAssignment(db.Model):
     """
     Assignments for volunteers to fulfill requests.
     """
     __tablename__ = 'volunteer_assignments'
+    __table_args__ = (
+        # A volunteer's assignments, newest first (dashboard)
+        db.Index('idx_volunteer_assignments_user_assigned', 'user_id', 'assigned_at'),
+        {'sqlite_autoincrement': True},  # archived ids must never be handed out again
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
@@ -149,6 +203,239 @@ class VolunteerAssignment(db.Model):
     user = db.relationship('User', backref='assignments')
     request_obj = db.relationship('Request', backref='assignments')
 
+class StockAlert(db.Model):
+    """
+    Edge-triggered stock level changes (entering or leaving Low / Out of Stock).
+    Written in the same transaction as the quantity change that caused it.
+    """
+    __tablename__ = 'stock_alerts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    resource_id = db.Column(db.Integer, db.ForeignKey('resources.id', ondelete='CASCADE'), nullable=False, index=True)
+    previous_status = db.Column(db.String(50), nullable=False)  # Out of Stock, Low Stock, Medium Stock, Good Stock
+    status = db.Column(db.String(50), nullable=False)
+    available_quantity = db.Column(db.Integer, nullable=False)
+    total_quantity = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    resource = db.relationship('Resource')
+
+class AuditLog(db.Model):
+    """
+    Append-only trail of state transitions: who changed which row, and the
+    audited fields before and after. Buffered in memory after commit and
+    written in batches (see services/audit.py); never updated or deleted.
+    """
+    __tablename__ = 'audit_log'
+    __table_args__ = (
+        db.Index('idx_audit_log_row', 'table_name', 'row_id', 'created_at'),
+        db.Index('idx_audit_log_actor', 'actor_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(20), nullable=False)  # create, update, delete
+    actor_id = db.Column(db.Integer, nullable=True)    # None for jobs and CLI commands
+    before = db.Column(db.Text)  # JSON of the audited fields, None on create
+    after = db.Column(db.Text)   # JSON of the audited fields, None on delete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class ChangeLog(db.Model):
+    """
+    Monotonic change sequence for delta sync of offline clients.
+    One row per changed Event, Resource, Request or VolunteerAssignment,
+    written in the same transaction as the change; deletes are tombstones.
+    """
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('idx_change_log_row', 'table_name', 'row_id'),
+        {'sqlite_autoincrement': True},  # ids are sync tokens: never reuse them
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # upsert, delete
+    user_id = db.Column(db.Integer, nullable=True)  # owner of private rows (requests, assignments)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    """
+    Durable background job, enqueued in the same transaction as the write
+    that needs it. Workers claim due jobs with a lease and retry with backoff.
+    """
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('idx_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class IdempotencyKey(db.Model):
+    """
+    Idempotency-Key claimed by a write request, shared by every web process.
+    The stored response is filled in when the first request finishes.
+    """
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('owner_id', 'endpoint', 'idem_key', name='uq_idempotency_keys_scope'),
+        {'sqlite_autoincrement': True},  # ids identify a claim: a lapsed one must not match its successor
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.String(64), nullable=False, default='')  # '' for anonymous callers
+    endpoint = db.Column(db.String(100), nullable=False)
+    idem_key = db.Column(db.String(255), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)  # NULL while the first request is running
+    body = db.Column(db.LargeBinary)
+    mimetype = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    claimed_until = db.Column(db.DateTime)  # lease of the running request; a dead worker's claim lapses
+
+class SearchDocument(db.Model):
+    """
+    Searchable text of events, resources, donation notes and admin comments.
+    Kept in sync on writes; full-text indexed by FTS5 (SQLite) or FULLTEXT (MySQL).
+    """
+    __tablename__ = 'search_documents'
+    __table_args__ = (
+        db.UniqueConstraint('entity_type', 'entity_id', name='uq_search_entity'),
+        # SQLite searches through FTS5 instead (below); elsewhere this would be a plain B-tree
+        db.Index('ft_search_text', 'title', 'body', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # event, resource, donation, admin_response
+    entity_id = db.Column(db.Integer, nullable=False)
+    event_id = db.Column(db.Integer, nullable=True, index=True)
+    title = db.Column(db.String(200), nullable=False, default='')
+    body = db.Column(db.Text, nullable=False, default='')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# SQLite: an external-content FTS5 table over search_documents, maintained by triggers.
+# Its `tags` column holds entity type and event as tokens (e.g. "typeevent event42")
+# so /search filters are matched inside the index instead of after ranking.
+_SEARCH_TAGS = "'type' || replace({0}.entity_type, '_', '') || ' event' || coalesce({0}.event_id, 0)"
+for statement in (
+    f"CREATE VIEW IF NOT EXISTS search_content AS SELECT id, title, body, {_SEARCH_TAGS.format('search_documents')} "
+    "AS tags FROM search_documents",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+    "title, body, tags, content='search_content', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    f"INSERT INTO search_fts(rowid, title, body, tags) VALUES (new.id, new.title, new.body, {_SEARCH_TAGS.format('new')}); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body, tags) "
+    f"VALUES ('delete', old.id, old.title, old.body, {_SEARCH_TAGS.format('old')}); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title, body, tags) "
+    f"VALUES ('delete', old.id, old.title, old.body, {_SEARCH_TAGS.format('old')}); "
+    f"INSERT INTO search_fts(rowid, title, body, tags) VALUES (new.id, new.title, new.body, {_SEARCH_TAGS.format('new')}); END",
+):
+    event.listen(SearchDocument.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in ('DROP TABLE IF EXISTS search_fts', 'DROP VIEW IF EXISTS search_content'):
+    event.listen(SearchDocument.__table__, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+
+class EventArchive(db.Model):
+    """
+    Cold storage for closed events (Resolved/Archived).
+    Mirrors Event without foreign keys so hot tables can be pruned freely.
+    """
+    __tablename__ = 'events_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    severity = db.Column(db.String(50))
+    status = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class RequestArchive(db.Model):
+    """Cold storage for closed requests and the requests of archived events"""
+    __tablename__ = 'requests_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    resource_id = db.Column(db.Integer, nullable=False)
+    event_id = db.Column(db.Integer, nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    approved_quantity = db.Column(db.Integer)
+    urgency = db.Column(db.String(50))
+    status = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class DonationArchive(db.Model):
+    """Cold storage for donations tied to archived events"""
+    __tablename__ = 'donations_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    resource_id = db.Column(db.Integer, nullable=False)
+    event_id = db.Column(db.Integer, nullable=True, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(50))
+    donated_at = db.Column(db.DateTime)
+    notes = db.Column(db.Text)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class AdminResponseArchive(db.Model):
+    """Cold storage for admin responses of archived requests"""
+    __tablename__ = 'admin_responses_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(db.Integer, nullable=False, index=True)
+    admin_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(50), nullable=False)
+    comment = db.Column(db.Text)
+    responded_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class RequestContributionArchive(db.Model):
+    """Cold storage for contributions to archived requests"""
+    __tablename__ = 'request_contributions_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(db.Integer, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    urgency = db.Column(db.String(50))
+    status = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class VolunteerAssignmentArchive(db.Model):
+    """Cold storage for volunteer assignments of archived requests"""
+    __tablename__ = 'volunteer_assignments_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    request_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.String(50))
+    assigned_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    notes = db.Column(db.Text)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
 # Load user callback for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
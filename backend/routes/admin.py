@@ -2,12 +2,17 @@
 Administrative routes for request management and system oversight.
 Requires admin privileges and handles critical resource allocation.
 """
-from flask import Blueprint, render_template, request, jsonify, flash
+from flask import Blueprint, render_template, request, jsonify, flash, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from extensions import db
 from models import User, Event, Resource, Donation, Request, AdminResponse
-from sqlalchemy import text
+from sqlalchemy import text, select, update
+from services import versions, archive
+from services.idempotency import idempotent
+from services.compression import compressed_response
+from services import forecast, stock_alerts, changelog, jobs, search, allocation, coalescing, audit
 import json
+from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -74,6 +79,7 @@ def get_requests():
         'resource_name': req.resource.name,
         'event_name': req.event.name,
         'quantity': req.quantity,
+        'approved_quantity': req.approved_quantity,
         'urgency': req.urgency,
         'status': req.status,
         'created_at': req.created_at.isoformat()
@@ -89,6 +95,7 @@ def get_requests():
 @admin_bp.route('/requests/<int:request_id>/action', methods=['POST'])
 @login_required
 @admin_required
+@idempotent
 def process_request(request_id):
     """
     Process request using stored procedure for transaction safety.
@@ -102,12 +109,27 @@ def process_request(request_id):
         if action not in ['approve', 'reject']:
             return jsonify({'error': 'Invalid action'}), 400
         
+        if db.session.get_bind().dialect.name != 'mysql':
+            # No stored procedures here (SQLite): same steps through the ORM,
+            # where the stock alert listeners see the quantity change directly
+            if action == 'approve':
+                _approve_request(request_id, current_user.id, comment)
+                message = 'Request approved successfully'
+            else:
+                _reject_request(request_id, current_user.id, comment)
+                message = 'Request rejected successfully'
+            db.session.commit()
+            return jsonify({'message': message}), 200
+        
         # Use stored procedure for atomic operation
         if action == 'approve':
+            before = stock_alerts.request_stock(request_id)
             result = db.session.execute(
                 text('CALL process_request_approval(:request_id, :admin_id, :comment)'),
                 {'request_id': request_id, 'admin_id': current_user.id, 'comment': comment}
             )
+            if before:
+                stock_alerts.check_resource(db.session, before.id, (before.available_quantity, before.total_quantity))
             message = 'Request approved successfully'
         else:
             result = db.session.execute(
@@ -116,6 +138,15 @@ def process_request(request_id):
             )
             message = 'Request rejected successfully'
         
+        # The procedures write behind the ORM's back
+        versions.mark_changed(db.session, 'requests', 'resources', 'admin_responses')
+        changelog.record_rows(db.session, Request, Request.id == request_id)
+        coalescing.fan_out(db.session, Request.id == request_id)
+        audit.record(db.session, 'requests', request_id, audit.UPDATE, before={'status': 'Pending'},
+                     after={'status': 'Approved' if action == 'approve' else 'Rejected'})
+        search.index_rows(db.session, AdminResponse, AdminResponse.request_id == request_id)
+        if action == 'approve' and before:
+            changelog.record_rows(db.session, Resource, Resource.id == before.id)
         db.session.commit()
         
         return jsonify({'message': message}), 200
@@ -130,6 +161,48 @@ def process_request(request_id):
         else:
             return jsonify({'error': 'Action failed'}), 500
 
+def _pending_request(request_id):
+    # Claim the row with a write first: a concurrent approval or rejection of
+    # the same request waits for this transaction, then finds it no longer Pending
+    claimed = db.session.execute(
+        update(Request).where(Request.id == request_id, Request.status == 'Pending')
+        .values(updated_at=datetime.utcnow())
+    ).rowcount
+    request_obj = db.session.get(Request, request_id) if claimed else None
+    if not request_obj:
+        raise ValueError('Request not found or not pending')
+    return request_obj
+
+def _approve_request(request_id, admin_id, comment):
+    """
+    ORM equivalent of process_request_approval (procedures.sql).
+    Stock is taken by one conditional UPDATE: SQLite ignores FOR UPDATE, so
+    a read-check-write would let concurrent approvals oversell.
+    """
+    request_obj = _pending_request(request_id)
+    quantity, resource_id = request_obj.quantity, request_obj.resource_id
+    taken = db.session.execute(
+        update(Resource).where(Resource.id == resource_id, Resource.available_quantity >= quantity)
+        .values(available_quantity=Resource.available_quantity - quantity)
+    ).rowcount
+    if not taken:
+        raise ValueError('Insufficient resource quantity')
+    # The update bypasses the flush: do what the ORM listeners would
+    after = db.session.execute(
+        select(Resource.available_quantity, Resource.total_quantity).where(Resource.id == resource_id)).one()
+    stock_alerts.check_resource(db.session, resource_id, (after.available_quantity + quantity, after.total_quantity))
+    versions.mark_changed(db.session, 'resources')
+    changelog.record_rows(db.session, Resource, Resource.id == resource_id)
+    db.session.add(AdminResponse(request_id=request_id, admin_id=admin_id, action='Approved', comment=comment))
+    request_obj.status = 'Approved'
+    request_obj.approved_quantity = quantity
+
+def _reject_request(request_id, admin_id, comment):
+    """ORM equivalent of process_request_rejection (procedures.sql)"""
+    request_obj = _pending_request(request_id)
+    db.session.add(AdminResponse(request_id=request_id, admin_id=admin_id, action='Rejected', comment=comment))
+    request_obj.status = 'Rejected'
+
 @admin_bp.route('/resources')
 @login_required
 @admin_required
@@ -147,6 +220,147 @@ def get_resources():
     
     return jsonify(resources_data)
 
+@admin_bp.route('/history/events/<int:event_id>')
+@login_required
+@admin_required
+def event_history(event_id):
+    """Event history including requests and donations moved to the archive"""
+    history = archive.event_history(event_id)
+    if history is None:
+        return jsonify({'error': 'Event not found'}), 404
+    event, requests, donations = history
+    
+    return jsonify({
+        'id': event.id,
+        'name': event.name,
+        'severity': event.severity,
+        'status': event.status,
+        'created_at': event.created_at.isoformat() if event.created_at else None,
+        'archived': hasattr(event, 'archived_at'),
+        'requests': [{
+            'id': req.id,
+            'user_id': req.user_id,
+            'resource_id': req.resource_id,
+            'quantity': req.quantity,
+            'approved_quantity': req.approved_quantity,
+            'urgency': req.urgency,
+            'status': req.status,
+            'created_at': req.created_at.isoformat() if req.created_at else None
+        } for req in requests],
+        'donations': [{
+            'id': donation.id,
+            'user_id': donation.user_id,
+            'resource_id': donation.resource_id,
+            'quantity': donation.quantity,
+            'donated_at': donation.donated_at.isoformat() if donation.donated_at else None
+        } for donation in donations]
+    })
+
+@admin_bp.route('/forecast')
+@login_required
+@admin_required
+def get_forecast():
+    """Projected depletion per resource at the current burn rate, optionally for one event"""
+    event_id = request.args.get('event_id', type=int)
+    body = forecast.get_forecaster(current_app).forecast(event_id=event_id)
+    return compressed_response(body)
+
+@admin_bp.route('/allocation')
+@login_required
+@admin_required
+def preview_allocation():
+    """
+    Priority-weighted split of current stock across all pending requests,
+    optionally for one ?resource_id=. Nothing changes until it is applied.
+    """
+    plan = allocation.plan(resource_id=request.args.get('resource_id', type=int))
+    return compressed_response(json.dumps(plan, separators=(',', ':')).encode('utf-8'))
+
+@admin_bp.route('/allocation/apply', methods=['POST'])
+@login_required
+@admin_required
+@idempotent
+def apply_allocation():
+    """Apply a previewed allocation; 409 if requests or stock changed since"""
+    data = request.get_json() if request.is_json else request.form
+    token = data.get('token')
+    if not token:
+        return jsonify({'error': 'Preview token is required'}), 400
+    resource_id = data.get('resource_id')
+    try:
+        resource_id = int(resource_id) if resource_id not in (None, '') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid resource_id format'}), 400
+    
+    try:
+        result = allocation.apply(current_user.id, token, resource_id=resource_id)
+    except allocation.StalePlan as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify({'message': 'Allocation applied', **result})
+
+@admin_bp.route('/audit')
+@login_required
+@admin_required
+def get_audit():
+    """
+    Audit trail, newest first: one row (?table=requests&row_id=5), one
+    actor (?actor_id=), and/or a time window (?since=, ?until= ISO times).
+    Older pages: ?before= the `next` value of the previous page.
+    """
+    try:
+        since, until = (datetime.fromisoformat(request.args[key]) if request.args.get(key) else None
+                        for key in ('since', 'until'))
+    except ValueError:
+        return jsonify({'error': 'since and until must be ISO 8601 times'}), 400
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    entries = audit.history(table_name=request.args.get('table'), row_id=request.args.get('row_id', type=int),
+                            actor_id=request.args.get('actor_id', type=int), since=since, until=until,
+                            before_id=request.args.get('before', type=int), limit=limit)
+    return jsonify({'entries': entries, 'next': entries[-1]['id'] if len(entries) == limit else None})
+
+@admin_bp.route('/alerts')
+@login_required
+@admin_required
+def get_alerts():
+    """Stock alerts after the given id, for polling clients"""
+    since = request.args.get('since', 0, type=int)
+    limit = min(request.args.get('limit', 100, type=int), 500)
+    return jsonify({'alerts': stock_alerts.recent_alerts(since=since, limit=limit)})
+
+@admin_bp.route('/alerts/stream')
+@login_required
+@admin_required
+def stream_alerts():
+    """Server-sent stream of stock alerts; resumes from Last-Event-ID"""
+    since = request.headers.get('Last-Event-ID', type=int) or request.args.get('since', 0, type=int)
+    backlog = stock_alerts.recent_alerts(since=since, limit=500)
+    feed = stock_alerts.get_feed(current_app)
+    # Nothing below needs the database: give the connection back for the life of the stream
+    db.session.remove()
+    
+    def events(since):
+        for alert in backlog:
+            yield f"id: {alert['id']}\ndata: {json.dumps(alert)}\n\n"
+            since = alert['id']
+        while True:
+            alerts = feed.wait(since, timeout=15)
+            if not alerts:
+                yield ': keep-alive\n\n'
+            for alert in alerts:
+                yield f"id: {alert['id']}\ndata: {json.dumps(alert)}\n\n"
+                since = alert['id']
+    
+    return Response(stream_with_context(events(since)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@admin_bp.route('/jobs')
+@login_required
+@admin_required
+def job_stats():
+    """Background job queue depth and latency"""
+    return jsonify(jobs.queue_stats())
+
 @admin_bp.route('/stats')
 @login_required
 @admin_required
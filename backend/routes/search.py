@@ -0,0 +1,35 @@
+"""
+Full-text search across events, resources, donation notes and admin comments.
+Regular users search events and resources; admins search everything.
+"""
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from services import search as search_service
+
+search_bp = Blueprint('search', __name__)
+
+MAX_PAGE_SIZE = 50
+
+@search_bp.route('')
+@login_required
+def search():
+    """Ranked matches for ?q=, optionally filtered by ?type=event,resource and ?event_id="""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    allowed = search_service.ENTITY_TYPES if current_user.is_admin else search_service.PUBLIC_TYPES
+    requested = [t for t in request.args.get('type', '').split(',') if t]
+    invalid = [t for t in requested if t not in search_service.ENTITY_TYPES]
+    if invalid:
+        return jsonify({'error': f"Unknown type: {', '.join(invalid)}"}), 400
+    types = [t for t in requested if t in allowed] if requested else list(allowed)
+    if not types:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_PAGE_SIZE))
+    page = max(1, request.args.get('page', 1, type=int))
+    results = search_service.search(q, entity_types=types, event_id=request.args.get('event_id', type=int),
+                                    limit=limit, offset=(page - 1) * limit)
+    
+    return jsonify({'query': q, 'page': page, 'results': results})
@@ -0,0 +1,121 @@
+"""
+Delta-sync API for offline field devices.
+Clients keep the token from their last sync and get back only the rows changed
+since then, plus tombstones for rows that were deleted or archived.
+"""
+from flask import Blueprint, request, jsonify, current_app
+from flask_login import login_required, current_user
+from extensions import db
+from models import Event, Resource, Request, VolunteerAssignment, RequestContribution
+from services import changelog
+
+sync_bp = Blueprint('sync', __name__)
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+SERIALIZERS = {
+    'events': (Event, lambda event: {
+        'id': event.id,
+        'name': event.name,
+        'description': event.description,
+        'latitude': event.latitude,
+        'longitude': event.longitude,
+        'severity': event.severity,
+        'status': event.status,
+        'created_at': _iso(event.created_at)
+    }),
+    'resources': (Resource, lambda resource: {
+        'id': resource.id,
+        'name': resource.name,
+        'category': resource.category,
+        'available_quantity': resource.available_quantity,
+        'total_quantity': resource.total_quantity,
+        'unit': resource.unit
+    }),
+    'requests': (Request, lambda req: {
+        'id': req.id,
+        'resource_id': req.resource_id,
+        'event_id': req.event_id,
+        'quantity': req.quantity,
+        'approved_quantity': req.approved_quantity,
+        'urgency': req.urgency,
+        'status': req.status,
+        'created_at': _iso(req.created_at),
+        'updated_at': _iso(req.updated_at)
+    }),
+    'volunteer_assignments': (VolunteerAssignment, lambda assignment: {
+        'id': assignment.id,
+        'request_id': assignment.request_id,
+        'status': assignment.status,
+        'assigned_at': _iso(assignment.assigned_at),
+        'completed_at': _iso(assignment.completed_at)
+    }),
+    'request_contributions': (RequestContribution, lambda contribution: {
+        'id': contribution.id,
+        'request_id': contribution.request_id,
+        'quantity': contribution.quantity,
+        'urgency': contribution.urgency,
+        'status': contribution.status,
+        'created_at': _iso(contribution.created_at),
+        'updated_at': _iso(contribution.updated_at)
+    }),
+}
+
+def _visible(model, query):
+    """Private tables only show the caller's own rows unless they are an admin"""
+    owner = changelog.SYNCED[model]
+    if owner and not current_user.is_admin:
+        query = query.filter(getattr(model, owner) == current_user.id)
+    return query
+
+def _full_snapshot():
+    token = changelog.current_token()
+    changes = {}
+    for table, (model, serialize) in SERIALIZERS.items():
+        changes[table] = [serialize(row) for row in _visible(model, model.query).order_by(model.id)]
+    return changes, token
+
+@sync_bp.route('')
+@login_required
+def sync():
+    """
+    Rows changed since ?since=<token>; without a token, a full snapshot.
+    Keep calling with the returned token while `more` is true.
+    """
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        changes, token = _full_snapshot()
+        return jsonify({'token': str(token), 'full': True, 'more': False,
+                        'changes': changes, 'deleted': {table: [] for table in SERIALIZERS}})
+
+    latest, token, more = changelog.changes_since(
+        since,
+        user_id=None if current_user.is_admin else current_user.id,
+        limit=current_app.config.get('SYNC_PAGE_SIZE', 1000),
+        settle_seconds=_settle_seconds()
+    )
+
+    changes = {table: [] for table in SERIALIZERS}
+    deleted = {table: [] for table in SERIALIZERS}
+    if latest:
+        for table, (model, serialize) in SERIALIZERS.items():
+            upserts = [row_id for (name, row_id), op in latest.items() if name == table and op == changelog.UPSERT]
+            deleted[table] = sorted(row_id for (name, row_id), op in latest.items()
+                                    if name == table and op == changelog.DELETE)
+            if not upserts:
+                continue
+            rows = _visible(model, model.query.filter(model.id.in_(upserts))).order_by(model.id).all()
+            changes[table] = [serialize(row) for row in rows]
+            # Logged as changed but gone now (removed by raw SQL): tell the client to drop it
+            found = {row.id for row in rows}
+            deleted[table] = sorted(set(deleted[table]) | {row_id for row_id in upserts if row_id not in found})
+
+    return jsonify({'token': str(token), 'full': False, 'more': more,
+                    'changes': changes, 'deleted': deleted})
+
+def _settle_seconds():
+    # SQLite has a single writer, so ids are handed out in commit order
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return 0
+    return current_app.config.get('SYNC_SETTLE_SECONDS', 2)
@@ -2,15 +2,24 @@
 User-facing routes for dashboard, donations, requests, and map interactions.
 Provides relief coordination functionality for regular users.
 """
-from flask import Blueprint, render_template, request, jsonify, flash
+from flask import Blueprint, render_template, request, jsonify, flash, current_app
 from flask_login import login_required, current_user
 from extensions import db
-from models import User, Event, Resource, Donation, Request
+from models import User, Event, Resource, Donation, Request, RequestContribution
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
+from services.compression import compressed_response
+from services import archive, coalescing
+from services.idempotency import idempotent
 import json
 
 user_bp = Blueprint('user', __name__)
 
+# Map feed encoding: 5 decimal places (~1 m) is plenty for a marker
+MAP_COORD_SCALE = 100000
+SEVERITY_LEVELS = ['Low', 'Medium', 'High', 'Critical']
+_SEVERITY_INDEX = {level: i for i, level in enumerate(SEVERITY_LEVELS)}
+
 @user_bp.route('/dashboard')
 @login_required
 def dashboard():
@@ -18,7 +27,7 @@ def dashboard():
     events = Event.query.filter_by(status='Active').all()
     resources = Resource.query.all()
     donations = Donation.query.filter_by(user_id=current_user.id).order_by(Donation.donated_at.desc()).limit(10).all()
-    requests = Request.query.filter_by(user_id=current_user.id).order_by(Request.created_at.desc()).limit(10).all()
+    requests = _visible_requests(current_user.id).order_by(Request.created_at.desc()).limit(10).all()
     
     return render_template('user_dashboard.html',
                          events=events,
@@ -26,6 +35,11 @@ def dashboard():
                          donations=donations,
                          requests=requests)
 
+def _visible_requests(user_id):
+    """Requests the user filed or contributed to (coalesced aggregates)"""
+    contributed = select(RequestContribution.request_id).where(RequestContribution.user_id == user_id)
+    return Request.query.filter((Request.user_id == user_id) | Request.id.in_(contributed))
+
 @user_bp.route('/events')
 @login_required
 def get_events():
@@ -42,6 +56,51 @@ def get_events():
     
     return jsonify(events_data)
 
+def build_map_feed():
+    """
+    Columnar map feed: only what a marker needs, packed as parallel arrays.
+    Coordinates are fixed-point integers and severity is an index into
+    SEVERITY_LEVELS; descriptions are fetched per event on demand.
+    """
+    rows = db.session.query(Event.id, Event.latitude, Event.longitude, Event.severity) \
+        .filter(Event.status == 'Active').order_by(Event.id).all()
+
+    feed = {
+        'v': 1,
+        'scale': MAP_COORD_SCALE,
+        'severities': SEVERITY_LEVELS,
+        'id': [row.id for row in rows],
+        'lat': [int(round(row.latitude * MAP_COORD_SCALE)) for row in rows],
+        'lon': [int(round(row.longitude * MAP_COORD_SCALE)) for row in rows],
+        'sev': [_SEVERITY_INDEX.get(row.severity, 1) for row in rows],
+    }
+    return json.dumps(feed, separators=(',', ':')).encode('utf-8')
+
+@user_bp.route('/events/map')
+@login_required
+def get_map_feed():
+    """Compact, compressed events feed for the map (see build_map_feed)"""
+    return compressed_response(build_map_feed())
+
+@user_bp.route('/events/<int:event_id>')
+@login_required
+def get_event(event_id):
+    """Full event details, loaded lazily when a map marker is opened"""
+    event = db.session.get(Event, event_id)
+    if not event:
+        return jsonify({'error': 'Event not found'}), 404
+
+    return jsonify({
+        'id': event.id,
+        'name': event.name,
+        'description': event.description,
+        'latitude': event.latitude,
+        'longitude': event.longitude,
+        'severity': event.severity,
+        'status': event.status,
+        'created_at': event.created_at.isoformat() if event.created_at else None
+    })
+
 @user_bp.route('/resources')
 @login_required
 def get_resources():
@@ -59,6 +118,7 @@ def get_resources():
 
 @user_bp.route('/donate', methods=['POST'])
 @login_required
+@idempotent
 def donate():
     """Create a donation with transaction handling and quantity updates"""
     try:
@@ -119,8 +179,13 @@ def donate():
 
 @user_bp.route('/requests', methods=['POST'])
 @login_required
+@idempotent
 def create_request():
-    """Create resource request with availability validation"""
+    """
+    Create resource request with availability validation. With coalescing on,
+    demand for an event and resource that already has an open request is
+    added to it, and the caller gets a contribution linked to that request.
+    """
     try:
         data = request.get_json() if request.is_json else request.form
         resource_id = data.get('resource_id')
@@ -149,22 +214,25 @@ def create_request():
         if not event:
             return jsonify({'error': 'Event not found'}), 404
         
-        # Create request (availability check happens in trigger)
-        request_obj = Request(
-            user_id=current_user.id,
-            resource_id=resource_id,
-            event_id=event_id,
-            quantity=quantity,
-            urgency=urgency
+        # Create or fold into an open request (stock is checked at approval)
+        request_obj, contribution, coalesced = coalescing.submit(
+            current_user.id, resource_id, event_id, quantity, urgency
         )
-        
-        db.session.add(request_obj)
+        available = resource.available_quantity
         db.session.commit()
+        if quantity > available:
+            # Demand beyond current stock, for monitoring (not a state change, so not audited)
+            current_app.logger.warning(f"Shortfall on resource {resource_id}: request {request_obj.id} "
+                                       f"asks for {quantity}, {available} available")
         
-        return jsonify({
+        response = {
             'message': 'Request submitted successfully',
-            'request_id': request_obj.id
-        }), 201
+            'request_id': request_obj.id,
+            'coalesced': coalesced
+        }
+        if contribution is not None:
+            response['contribution_id'] = contribution.id
+        return jsonify(response), 201
         
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -177,8 +245,11 @@ def create_request():
 @login_required
 def get_request(request_id):
     """Get specific request details with authorization check"""
-    request_obj = Request.query.filter_by(id=request_id, user_id=current_user.id).first()
+    request_obj = _visible_requests(current_user.id).filter(Request.id == request_id).first()
     if not request_obj:
+        archived = archive.archived_request_details(request_id, user_id=current_user.id)
+        if archived:
+            return jsonify(archived)
         return jsonify({'error': 'Request not found'}), 404
     
     request_data = {
@@ -186,11 +257,18 @@ def get_request(request_id):
         'resource_name': request_obj.resource.name,
         'event_name': request_obj.event.name,
         'quantity': request_obj.quantity,
+        'approved_quantity': request_obj.approved_quantity,
         'urgency': request_obj.urgency,
         'status': request_obj.status,
         'created_at': request_obj.created_at.isoformat()
     }
     
+    # Coalesced request: how many users share it and what the caller asked for
+    if request_obj.contributions:
+        request_data['contributors'] = len({c.user_id for c in request_obj.contributions})
+        request_data['your_quantity'] = sum(c.quantity for c in request_obj.contributions
+                                            if c.user_id == current_user.id)
+    
     # Add response data if exists
     if request_obj.responses:
         response = request_obj.responses[0]
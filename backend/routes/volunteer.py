@@ -2,14 +2,17 @@
 Volunteer routes for task assignment and status updates.
 Allows users to sign up as volunteers and fulfill approved requests.
 """
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app
 from flask_login import login_required, current_user
 from extensions import db
 from models import Request, VolunteerAssignment, User
 from datetime import datetime
+from services import jobs, routing
 
 volunteer_bp = Blueprint('volunteer', __name__)
 
+MAX_ROUTE_STOPS = 50
+
 @volunteer_bp.route('/dashboard')
 @login_required
 def dashboard():
@@ -72,6 +75,50 @@ def accept_task(request_id):
     flash('Task accepted successfully', 'success')
     return redirect(url_for('volunteer.dashboard'))
 
+@volunteer_bp.route('/routes/plan')
+@login_required
+def plan_route():
+    """
+    Suggest a multi-stop delivery route over open tasks.
+    ?lat=&lon= is the volunteer's position (default: the most urgent stop),
+    ?capacity= the units they can carry, ?max_stops= and ?event_id= narrow it.
+    """
+    if not current_user.is_volunteer:
+        return jsonify({'error': 'Must be a volunteer'}), 403
+    
+    lat, lon = request.args.get('lat', type=float), request.args.get('lon', type=float)
+    if (lat is None) != (lon is None):
+        return jsonify({'error': 'Both lat and lon are required'}), 400
+    config = current_app.config
+    capacity = request.args.get('capacity', config.get('ROUTE_CAPACITY', 200), type=int)
+    max_stops = request.args.get('max_stops', config.get('ROUTE_MAX_STOPS', 10), type=int)
+    if capacity <= 0 or max_stops <= 0:
+        return jsonify({'error': 'capacity and max_stops must be positive'}), 400
+    
+    plan = routing.plan_route(origin=(lat, lon) if lat is not None else None, capacity=capacity,
+                              max_stops=min(max_stops, MAX_ROUTE_STOPS),
+                              event_id=request.args.get('event_id', type=int))
+    return jsonify(plan)
+
+@volunteer_bp.route('/routes/claim', methods=['POST'])
+@login_required
+def claim_route():
+    """Accept every task of a planned route at once, or none if any was taken meanwhile"""
+    if not current_user.is_volunteer:
+        return jsonify({'error': 'Must be a volunteer'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    request_ids = data.get('request_ids')
+    if not isinstance(request_ids, list) or not request_ids or not all(isinstance(i, int) for i in request_ids):
+        return jsonify({'error': 'request_ids must be a non-empty list of request ids'}), 400
+    
+    try:
+        claimed = routing.claim_route(current_user.id, request_ids)
+    except routing.RouteConflict as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify({'message': f'Accepted {claimed} tasks', 'claimed': claimed})
+
 @volunteer_bp.route('/tasks/<int:assignment_id>/complete', methods=['POST'])
 @login_required
 def complete_task(assignment_id):
@@ -84,10 +131,19 @@ def complete_task(assignment_id):
     assignment.status = 'Completed'
     assignment.completed_at = datetime.utcnow()
     
-    # Update request status as well
-    assignment.request_obj.status = 'Fulfilled'
+    # Request status follows in the background, committed with the assignment
+    jobs.enqueue('volunteer.propagate_completion', {'assignment_id': assignment.id})
     
     db.session.commit()
     
     flash('Task completed! Thank you for your help.', 'success')
     return redirect(url_for('volunteer.dashboard'))
+
+@jobs.task('volunteer.propagate_completion')
+def propagate_completion(payload):
+    """Mark the request of a completed assignment as Fulfilled (safe to run twice)"""
+    assignment = db.session.get(VolunteerAssignment, payload['assignment_id'])
+    if assignment is None or assignment.status != 'Completed':
+        return
+    if assignment.request_obj.status == 'Approved':
+        assignment.request_obj.status = 'Fulfilled'
@@ -0,0 +1,123 @@
+"""
+Token-bucket admission control for write endpoints.
+Requests are checked against global, per-endpoint, per-user and per-IP buckets
+before the view runs, so floods are shed with 429 before any database work.
+"""
+import math
+import threading
+import time
+
+from flask import request, session, jsonify
+from flask_login import current_user
+
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+class LocalBucketBackend:
+    """
+    In-process bucket state. A shared backend (e.g. Redis with a script doing
+    the same arithmetic) only has to implement acquire() to replace it.
+    """
+    SWEEP_EVERY = 1024
+    
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = {}  # key -> [tokens, last_refill, rate, burst]
+        self._lock = threading.Lock()
+        self._calls = 0
+    
+    def _refill(self, key, rate, burst, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(burst), now, rate, burst]
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        return bucket
+    
+    def _sweep(self, now):
+        # A bucket that has refilled completely is indistinguishable from a new one
+        idle = [key for key, (tokens, last, rate, burst) in self._buckets.items()
+                if tokens + (now - last) * rate >= burst]
+        for key in idle:
+            del self._buckets[key]
+    
+    def acquire(self, limits, cost=1):
+        """
+        Take `cost` tokens from every bucket in `limits`, all or nothing.
+        `limits` is a list of (key, rate, burst, floor); a bucket only grants
+        tokens while it stays above its floor. Returns (allowed, retry_after).
+        """
+        with self._lock:
+            now = self.clock()
+            self._calls += 1
+            if self._calls % self.SWEEP_EVERY == 0:
+                self._sweep(now)
+            
+            buckets = [(self._refill(key, rate, burst, now), rate, floor) for key, rate, burst, floor in limits]
+            retry_after = 0.0
+            for bucket, rate, floor in buckets:
+                shortfall = cost + floor - bucket[0]
+                if shortfall > 0:
+                    retry_after = max(retry_after, shortfall / rate)
+            if retry_after:
+                return False, retry_after
+            
+            for bucket, rate, floor in buckets:
+                bucket[0] -= cost
+            return True, 0.0
+
+class AdmissionController:
+    """Builds the bucket set for a request from app config and enforces it"""
+    def __init__(self, config, backend=None):
+        self.backend = backend or LocalBucketBackend()
+        self.global_limit = config.get('ADMISSION_GLOBAL_LIMIT', (200, 400))
+        self.user_limit = config.get('ADMISSION_USER_LIMIT', (5, 20))
+        self.ip_limit = config.get('ADMISSION_IP_LIMIT', (10, 30))
+        self.endpoint_limits = config.get('ADMISSION_ENDPOINT_LIMITS', {})
+        self.admin_reserve = config.get('ADMISSION_ADMIN_RESERVE', 0.2)
+    
+    def limits_for(self, endpoint, user_id, remote_addr, is_admin=False):
+        rate, burst = self.global_limit
+        # Everyone but signed-in admins must leave the reserved headroom untouched
+        floor = 0 if is_admin else burst * self.admin_reserve
+        limits = [(('global',), rate, burst, floor)]
+        
+        if endpoint in self.endpoint_limits:
+            rate, burst = self.endpoint_limits[endpoint]
+            limits.append((('endpoint', endpoint), rate, burst, 0))
+        if user_id is not None:
+            rate, burst = self.user_limit
+            limits.append((('user', user_id), rate, burst, 0))
+        else:
+            # Per-IP only for anonymous traffic: field teams often share a NAT
+            rate, burst = self.ip_limit
+            limits.append((('ip', remote_addr), rate, burst, 0))
+        return limits
+    
+    def check(self):
+        """before_request hook: returns a 429 response or None"""
+        if request.method not in WRITE_METHODS or request.endpoint is None:
+            return None
+        
+        # Flask-Login keeps the id in the session cookie; the user is only
+        # loaded to vouch for the admin reserve, so anonymous floods stay free
+        user_id = session.get('_user_id')
+        is_admin = (user_id is not None and request.endpoint.startswith('admin.')
+                    and current_user.is_authenticated and current_user.is_admin)
+        allowed, retry_after = self.backend.acquire(
+            self.limits_for(request.endpoint, user_id, request.remote_addr, is_admin=is_admin))
+        if allowed:
+            return None
+        
+        response = jsonify({'error': 'Too many requests, please retry later'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
+
+def init_app(app, backend=None):
+    """Install admission control as the first before_request hook"""
+    if not app.config.get('ADMISSION_CONTROL_ENABLED', True):
+        return
+    controller = AdmissionController(app.config, backend=backend)
+    app.extensions['admission'] = controller
+    app.before_request_funcs.setdefault(None, []).insert(0, controller.check)
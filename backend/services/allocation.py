@@ -0,0 +1,239 @@
+"""
+Priority-weighted allocation of scarce stock across all pending requests.
+Each resource's available quantity is shared by weighted max-min fairness
+(water-filling): every request gets the same stock per unit of priority,
+capped at what it asked for. All resources are solved in one NumPy pass;
+admins preview the plan and apply it in a single transaction.
+"""
+import hashlib
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select, update, insert, case, bindparam
+
+from extensions import db
+from models import Event, Resource, Request, AdminResponse
+from services import versions, changelog, search, coalescing, audit, stock_alerts
+
+URGENCY_WEIGHT = {'Low': 1.0, 'Medium': 2.0, 'High': 4.0, 'Critical': 8.0}
+SEVERITY_WEIGHT = {'Low': 1.0, 'Medium': 1.5, 'High': 2.0, 'Critical': 3.0}
+
+class StalePlan(Exception):
+    """Requests or stock changed since the plan was previewed"""
+
+def water_fill(group, demand, weight, capacity):
+    """
+    Weighted max-min fair shares.
+
+    group[i] is the resource index of request i, demand[i] what it asked for
+    and weight[i] its priority; capacity[g] is the stock of resource g.
+    Returns (allocation, level): request i gets min(demand, weight * level)
+    of its resource, with level chosen per resource so the stock is used up,
+    or infinite where the stock covers all demand.
+    """
+    group = np.asarray(group, dtype=np.int64)
+    demand = np.asarray(demand, dtype=np.float64)
+    weight = np.asarray(weight, dtype=np.float64)
+    capacity = np.asarray(capacity, dtype=np.float64)
+    level = np.full(len(capacity), np.inf)
+    if len(group) == 0:
+        return np.zeros(0), level
+
+    # Level at which each request is fully served, ascending within each resource
+    saturates = demand / weight
+    order = np.lexsort((saturates, group))
+    g, d, w, t = group[order], demand[order], weight[order], saturates[order]
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+    sizes = np.diff(np.r_[starts, len(g)])
+    offset = np.repeat(starts, sizes)
+
+    # With the level at t[k], requests before k (and k itself) are served in
+    # full and the rest get weight * t[k]
+    served = np.cumsum(d)
+    served -= np.repeat(np.r_[0, served[starts[1:] - 1]], sizes)
+    weight_left = np.cumsum(w[::-1])[::-1]
+    group_end = np.repeat(np.r_[starts[1:], len(g)], sizes)
+    weight_left -= np.r_[weight_left[1:], 0][group_end - 1]
+    used = served + (weight_left - w) * t
+    over = used > capacity[g]
+
+    # First request per resource that cannot be fully served fixes the level
+    position = np.where(over, np.arange(len(g)), len(g))
+    first = np.minimum.reduceat(position, starts)
+    short = first < len(g)
+    k = first[short]
+    served_before = np.where(k > offset[k], served[k - 1], 0.0) if len(k) else np.zeros(0)
+    level[g[starts[short]]] = (capacity[g[k]] - served_before) / weight_left[k]
+
+    allocation = np.minimum(demand, weight * level[group])
+    return allocation, level
+
+def round_shares(group, allocation, capacity):
+    """
+    Integer quantities: floor every share, then hand the units left on each
+    resource to the largest fractional remainders
+    """
+    group = np.asarray(group, dtype=np.int64)
+    whole = np.floor(allocation + 1e-9)
+    remainder = allocation - whole
+    spare = np.floor(np.asarray(capacity, dtype=np.float64) + 1e-9) \
+        - np.bincount(group, weights=whole, minlength=len(capacity))
+    order = np.lexsort((-remainder, group))
+    g = group[order]
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]]) if len(g) else np.zeros(0, dtype=np.int64)
+    rank = np.arange(len(g)) - np.repeat(starts, np.diff(np.r_[starts, len(g)]))
+    extra = np.zeros(len(g))
+    extra[order] = (rank < spare[g]) & (remainder[order] > 1e-9)
+    return (whole + extra).astype(np.int64)
+
+def _inputs(resource_id=None, lock=False):
+    weight = case(URGENCY_WEIGHT, value=Request.urgency, else_=1.0) \
+        * case(SEVERITY_WEIGHT, value=Event.severity, else_=1.0)
+    query = select(Request.id, Request.resource_id, Request.event_id, Request.quantity, Request.urgency,
+                   Event.severity, weight.label('weight')).join(Event, Event.id == Request.event_id) \
+        .where(Request.status == 'Pending').order_by(Request.id)
+    resources = select(Resource).order_by(Resource.id)
+    if resource_id is not None:
+        query = query.where(Request.resource_id == resource_id)
+        resources = resources.where(Resource.id == resource_id)
+    if lock:
+        resources = resources.with_for_update()
+        query = query.with_for_update(of=Request)
+    # Stock first, so concurrent approvals queue on the resource rows
+    stock = db.session.scalars(resources).all()
+    return stock, db.session.execute(query).all()
+
+def _token(stock, rows):
+    digest = hashlib.sha1()
+    for resource in stock:
+        digest.update(f'r{resource.id}:{resource.available_quantity};'.encode())
+    for row in rows:
+        digest.update(f'q{row.id}:{row.quantity}:{row.urgency}:{row.severity};'.encode())
+    return digest.hexdigest()[:16]
+
+def _solve(stock, rows):
+    """Arrays for the pending requests of stocked resources, and their shares"""
+    resource_ids = np.array([resource.id for resource in stock], dtype=np.int64)
+    capacity = np.array([max(resource.available_quantity, 0) for resource in stock], dtype=np.float64)
+    columns = list(zip(*rows)) if rows else [()] * 7
+    ids, requested_resource, event_ids, quantities, urgencies, severities, weights = columns
+    group = np.searchsorted(resource_ids, np.array(requested_resource, dtype=np.int64))
+    known = group < len(resource_ids)
+    known[known] = resource_ids[group[known]] == np.array(requested_resource, dtype=np.int64)[known]
+    request = {
+        'id': np.array(ids, dtype=np.int64)[known],
+        'resource_id': np.array(requested_resource, dtype=np.int64)[known],
+        'event_id': np.array(event_ids, dtype=np.int64)[known],
+        'quantity': np.array(quantities, dtype=np.float64)[known],
+        'urgency': np.array(urgencies, dtype=object)[known],
+        'severity': np.array(severities, dtype=object)[known],
+        'weight': np.array(weights, dtype=np.float64)[known],
+    }
+    group = group[known]
+    allocation, level = water_fill(group, request['quantity'], request['weight'], capacity)
+    request['allocated'] = round_shares(group, allocation, capacity)
+    return request, group, level
+
+def plan(resource_id=None):
+    """Allocation of current stock to pending requests, without changing anything"""
+    stock, rows = _inputs(resource_id)
+    token = _token(stock, rows)
+    request, group, level = _solve(stock, rows)
+    allocated = np.bincount(group, weights=request['allocated'], minlength=len(stock))
+    requested = np.bincount(group, weights=request['quantity'], minlength=len(stock))
+    columns = ('id', 'resource_id', 'event_id', 'urgency', 'severity', 'weight', 'quantity', 'allocated')
+    return {
+        'token': token,
+        'resources': [{
+            'id': resource.id,
+            'name': resource.name,
+            'available': resource.available_quantity,
+            'requested': int(requested[i]),
+            'allocated': int(allocated[i]),
+            'share_per_weight': None if np.isinf(level[i]) else round(float(level[i]), 3),
+        } for i, resource in enumerate(stock) if requested[i]],
+        'requests': [{
+            'id': id_, 'resource_id': resource_id, 'event_id': event_id, 'urgency': urgency,
+            'severity': severity, 'weight': weight, 'requested': int(quantity), 'allocated': allocated_,
+        } for id_, resource_id, event_id, urgency, severity, weight, quantity, allocated_
+            in zip(*(request[column].tolist() for column in columns))],
+    }
+
+def _chunks(values, size=500):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def apply(admin_id, token, resource_id=None):
+    """
+    Approve the previewed plan in one transaction. Fully served requests are
+    approved, partly served ones approved for the allocated quantity
+    (approved_quantity; quantity keeps what was asked), unserved ones stay pending.
+    Raises StalePlan if anything changed since the preview produced `token`.
+    SQLite ignores FOR UPDATE, so both writes are conditional as well: requests
+    are approved only while still pending and stock is taken only while it
+    lasts, and the plan is rejected if either falls short.
+    """
+    stock, rows = _inputs(resource_id, lock=True)
+    if _token(stock, rows) != token:
+        db.session.rollback()
+        raise StalePlan('Requests or stock changed since the preview')
+    request, group, level = _solve(stock, rows)
+    served = request['allocated'] > 0
+    ids = request['id'][served].tolist()
+    shares = request['allocated'][served].tolist()
+    asked = request['quantity'][served].astype(np.int64).tolist()
+    now = datetime.utcnow()
+
+    # Bulk statements: one executemany each instead of a flush per request
+    requests = Request.__table__
+    approved = db.session.execute(
+        update(requests).where(requests.c.id == bindparam('request_id'), requests.c.status == 'Pending')
+        .values(status='Approved', approved_quantity=bindparam('share'), updated_at=now),
+        [{'request_id': id_, 'share': share} for id_, share in zip(ids, shares)]
+    ).rowcount if ids else 0
+    if approved != len(ids):
+        db.session.rollback()
+        raise StalePlan('Requests changed since the preview')
+    db.session.execute(insert(AdminResponse), [
+        {'request_id': id_, 'admin_id': admin_id, 'action': 'Approved', 'responded_at': now,
+         'comment': 'Allocated by priority' if share == quantity
+         else f'Partially allocated by priority: {share} of {quantity} requested'}
+        for id_, share, quantity in zip(ids, shares, asked)
+    ])
+    # Those statements bypass the flush, so tell its listeners
+    versions.mark_changed(db.session, 'requests', 'admin_responses')
+    audit.record_many(db.session, [
+        audit.entry('requests', id_, audit.UPDATE, before={'status': 'Pending', 'approved_quantity': None},
+                    after={'status': 'Approved', 'approved_quantity': share}, actor_id=admin_id)
+        for id_, share in zip(ids, shares)
+    ])
+    for chunk in _chunks(ids):
+        changelog.record_rows(db.session, Request, Request.id.in_(chunk))
+        coalescing.fan_out(db.session, Request.id.in_(chunk))
+        search.index_rows(db.session, AdminResponse, AdminResponse.request_id.in_(chunk))
+
+    used = np.bincount(group, weights=request['allocated'], minlength=len(stock))
+    taken = {resource.id: int(used[i]) for i, resource in enumerate(stock) if used[i]}
+    if taken:
+        resources = Resource.__table__
+        updated = db.session.execute(
+            update(resources).where(resources.c.id == bindparam('resource_id'),
+                                    resources.c.available_quantity >= bindparam('used'))
+            .values(available_quantity=resources.c.available_quantity - bindparam('used')),
+            [{'resource_id': resource_id_, 'used': quantity} for resource_id_, quantity in taken.items()]
+        ).rowcount
+        if updated != len(taken):
+            db.session.rollback()
+            raise StalePlan('Stock changed since the preview')
+        # The update bypasses the flush: do what the ORM listeners would
+        for chunk in _chunks(list(taken)):
+            levels = db.session.execute(select(Resource.id, Resource.available_quantity, Resource.total_quantity)
+                                        .where(Resource.id.in_(chunk))).all()
+            stock_alerts.check_changes(db.session, [
+                (row.id, (row.available_quantity + taken[row.id], row.total_quantity),
+                 (row.available_quantity, row.total_quantity)) for row in levels])
+            changelog.record_rows(db.session, Resource, Resource.id.in_(chunk))
+        versions.mark_changed(db.session, 'resources')
+    db.session.commit()
+    partial = sum(1 for share, quantity in zip(shares, asked) if share < quantity)
+    return {'approved': len(ids), 'partial': partial, 'pending': len(request['id']) - len(ids)}
@@ -0,0 +1,192 @@
+"""
+Hot/cold archival of closed events and requests.
+Moves history out of the hot tables in bounded batches so status scans,
+indexes and backups only grow with live work. Archived rows keep their ids,
+and lookups fall back from the hot table to its archive by id, so hot ids
+must never be reused: the models declare sqlite_autoincrement, and `flask
+indexes ensure` rebuilds SQLite tables created before that.
+"""
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import select, insert, delete, literal
+
+from extensions import db
+from models import (User, Resource, Event, Request, Donation, AdminResponse, VolunteerAssignment,
+                    RequestContribution, EventArchive, RequestArchive, DonationArchive,
+                    AdminResponseArchive, VolunteerAssignmentArchive, RequestContributionArchive)
+from services import versions, changelog, search
+
+CLOSED_EVENT_STATUSES = ('Resolved', 'Archived')
+CLOSED_REQUEST_STATUSES = ('Fulfilled', 'Rejected')
+
+ARCHIVE_OF = {
+    Event: EventArchive,
+    Request: RequestArchive,
+    Donation: DonationArchive,
+    AdminResponse: AdminResponseArchive,
+    VolunteerAssignment: VolunteerAssignmentArchive,
+    RequestContribution: RequestContributionArchive,
+}
+
+def _move(model, where, archived_at):
+    """Copy matching rows into the archive table, then delete them from the hot table"""
+    source = model.__table__
+    target = ARCHIVE_OF[model].__table__
+    columns = [column.name for column in source.columns]
+    
+    rows = select(*[source.c[name] for name in columns],
+                  literal(archived_at, target.c.archived_at.type)).where(where)
+    result = db.session.execute(insert(target).from_select(columns + ['archived_at'], rows))
+    if model in changelog.SYNCED:
+        # Archived rows leave the hot tables: sync clients get tombstones
+        changelog.record_rows(db.session, model, where, op=changelog.DELETE)
+    if model in search.ENTITY_TYPE:
+        search.remove_rows(db.session, model, where)
+    db.session.execute(delete(source).where(where))
+    return result.rowcount
+
+def _move_requests(request_filter, archived_at):
+    """Move matching requests together with their responses, assignments and contributions (children first)"""
+    request_ids = select(Request.id).where(request_filter)
+    counts = {
+        'admin_responses': _move(AdminResponse, AdminResponse.request_id.in_(request_ids), archived_at),
+        'volunteer_assignments': _move(VolunteerAssignment, VolunteerAssignment.request_id.in_(request_ids), archived_at),
+        'request_contributions': _move(RequestContribution, RequestContribution.request_id.in_(request_ids), archived_at),
+        'requests': _move(Request, request_filter, archived_at),
+    }
+    return counts
+
+def _commit_batch(counts):
+    versions.mark_changed(db.session, *(table for table, moved in counts.items() if moved))
+    db.session.commit()
+
+def archive_closed_events(batch_size=100, max_batches=None):
+    """
+    Archive Resolved/Archived events with all their requests, donations,
+    responses and assignments. Each batch is its own transaction.
+    Returns the number of rows moved per table.
+    """
+    totals = {}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        event_ids = db.session.scalars(
+            select(Event.id).where(Event.status.in_(CLOSED_EVENT_STATUSES))
+            .order_by(Event.id).limit(batch_size)
+        ).all()
+        if not event_ids:
+            break
+        
+        archived_at = datetime.utcnow()
+        try:
+            counts = _move_requests(Request.event_id.in_(event_ids), archived_at)
+            counts['donations'] = _move(Donation, Donation.event_id.in_(event_ids), archived_at)
+            counts['events'] = _move(Event, Event.id.in_(event_ids), archived_at)
+            _commit_batch(counts)
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        for table, moved in counts.items():
+            totals[table] = totals.get(table, 0) + moved
+        batches += 1
+    return totals
+
+def archive_closed_requests(older_than_days=30, batch_size=500, max_batches=None):
+    """
+    Archive Fulfilled/Rejected requests (with responses and assignments) of
+    events that are still active, once they are older than the retention window.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    totals = {}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        request_ids = db.session.scalars(
+            select(Request.id).where(Request.status.in_(CLOSED_REQUEST_STATUSES),
+                                     Request.updated_at < cutoff)
+            .order_by(Request.id).limit(batch_size)
+        ).all()
+        if not request_ids:
+            break
+        
+        try:
+            counts = _move_requests(Request.id.in_(request_ids), datetime.utcnow())
+            _commit_batch(counts)
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        for table, moved in counts.items():
+            totals[table] = totals.get(table, 0) + moved
+        batches += 1
+    return totals
+
+def archived_request_details(request_id, user_id=None):
+    """
+    Details of an archived request in the same shape as the live request API.
+    With user_id, only for its owner or a contributor to the coalesced request.
+    """
+    request_obj = db.session.get(RequestArchive, request_id)
+    if request_obj is None:
+        return None
+    contributions = RequestContributionArchive.query.filter_by(request_id=request_id).all()
+    if user_id is not None and request_obj.user_id != user_id \
+            and not any(c.user_id == user_id for c in contributions):
+        return None
+    
+    resource = db.session.get(Resource, request_obj.resource_id)
+    event = db.session.get(Event, request_obj.event_id) or db.session.get(EventArchive, request_obj.event_id)
+    request_data = {
+        'id': request_obj.id,
+        'resource_name': resource.name if resource else None,
+        'event_name': event.name if event else None,
+        'quantity': request_obj.quantity,
+        'approved_quantity': request_obj.approved_quantity,
+        'urgency': request_obj.urgency,
+        'status': request_obj.status,
+        'created_at': request_obj.created_at.isoformat(),
+        'archived': True
+    }
+    
+    if contributions:
+        request_data['contributors'] = len({c.user_id for c in contributions})
+        if user_id is not None:
+            request_data['your_quantity'] = sum(c.quantity for c in contributions if c.user_id == user_id)
+    
+    response = AdminResponseArchive.query.filter_by(request_id=request_id) \
+        .order_by(AdminResponseArchive.responded_at).first()
+    if response:
+        admin = db.session.get(User, response.admin_id)
+        request_data['response'] = {
+            'action': response.action,
+            'comment': response.comment,
+            'responded_at': response.responded_at.isoformat(),
+            'admin_name': admin.name if admin else None
+        }
+    return request_data
+
+def event_history(event_id):
+    """Event with all its requests and donations, whether hot or archived"""
+    event = db.session.get(Event, event_id) or db.session.get(EventArchive, event_id)
+    if event is None:
+        return None
+    
+    requests = Request.query.filter_by(event_id=event_id).all() + \
+        RequestArchive.query.filter_by(event_id=event_id).all()
+    donations = Donation.query.filter_by(event_id=event_id).all() + \
+        DonationArchive.query.filter_by(event_id=event_id).all()
+    return event, requests, donations
+
+def init_app(app):
+    """Register the `flask archive` command"""
+    @app.cli.command('archive')
+    @click.option('--batch-size', default=100, help='Rows per transaction')
+    @click.option('--max-batches', default=None, type=int, help='Stop after this many batches')
+    @click.option('--request-age-days', default=30, help='Retention for closed requests of active events')
+    def archive_command(batch_size, max_batches, request_age_days):
+        """Move closed events and requests into the archive tables"""
+        events = archive_closed_events(batch_size=batch_size, max_batches=max_batches)
+        requests = archive_closed_requests(older_than_days=request_age_days,
+                                           batch_size=batch_size * 5, max_batches=max_batches)
+        click.echo(f"Archived closed events: {events or 'nothing to do'}")
+        click.echo(f"Archived closed requests: {requests or 'nothing to do'}")
@@ -0,0 +1,263 @@
+"""
+Append-only audit trail of state transitions.
+Every flush that creates, deletes or changes an audited field of a request,
+assignment, event or user stages an entry (actor, before and after values) on
+the session. On commit the entries go into an in-memory buffer that is written
+to `audit_log` in batched inserts by a background flusher, so auditing costs
+an append instead of an extra INSERT per action; a rollback drops them.
+Entries still buffered when a process dies are lost; AUDIT_BATCH_SIZE=1
+writes them at every commit instead.
+"""
+import atexit
+import json
+import os
+import threading
+import weakref
+from collections import deque
+from datetime import datetime
+
+import click
+from flask import current_app, has_app_context, has_request_context
+from flask_login import current_user
+from sqlalchemy import and_, event, insert, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import User, Event, Request, VolunteerAssignment, AuditLog
+
+# Audited models and the fields whose changes are state transitions
+AUDITED = {
+    Request: ('status', 'quantity', 'approved_quantity', 'urgency'),
+    VolunteerAssignment: ('status', 'completed_at'),
+    Event: ('status', 'severity'),
+    User: ('is_admin', 'is_volunteer'),
+}
+_FIELDS_BY_TABLE = {model.__table__.name: fields for model, fields in AUDITED.items()}
+
+CREATE, UPDATE, DELETE = 'create', 'update', 'delete'
+
+_PENDING_KEY = '_audit_entries'
+_buffers = weakref.WeakSet()
+
+def _dump(values):
+    return None if values is None else json.dumps(values, default=str, sort_keys=True)
+
+def _actor():
+    if has_request_context() and current_user and current_user.is_authenticated:
+        return current_user.id
+    return None
+
+def entry(table_name, row_id, action, before=None, after=None, actor_id=None):
+    """One audit_log row, ready for a batched insert"""
+    return {'table_name': table_name, 'row_id': row_id, 'action': action, 'actor_id': actor_id,
+            'before': _dump(before), 'after': _dump(after), 'created_at': datetime.utcnow()}
+
+def record(session, table_name, row_id, action, before=None, after=None, actor_id=None):
+    """
+    Stage an entry for a change made outside the flush (bulk SQL, stored
+    procedures) or an event that is not a row change; kept if the session commits
+    """
+    session.info.setdefault(_PENDING_KEY, []).append(
+        entry(table_name, row_id, action, before, after, actor_id if actor_id is not None else _actor()))
+
+def record_many(session, entries):
+    """Stage prepared entries (see entry()) in one go"""
+    session.info.setdefault(_PENDING_KEY, []).extend(entries)
+
+def _changes(obj, fields):
+    """(before, after) of the audited fields that changed, or None"""
+    state = inspect(obj)
+    before, after = {}, {}
+    for name in fields:
+        history = state.attrs[name].history
+        if history.has_changes():
+            before[name] = history.deleted[0] if history.deleted else None
+            after[name] = getattr(obj, name)
+    return (before, after) if after and before != after else None
+
+def _after_flush(session, flush_context):
+    # History is still intact here, and new rows have their ids
+    actor = _actor()
+    entries = []
+    for obj in session.new:
+        fields = _FIELDS_BY_TABLE.get(getattr(obj, '__tablename__', None))
+        if fields:
+            entries.append(entry(obj.__tablename__, obj.id, CREATE,
+                                 after={name: getattr(obj, name) for name in fields}, actor_id=actor))
+    for obj in session.dirty:
+        fields = _FIELDS_BY_TABLE.get(getattr(obj, '__tablename__', None))
+        if fields:
+            change = _changes(obj, fields)
+            if change:
+                entries.append(entry(obj.__tablename__, obj.id, UPDATE, *change, actor_id=actor))
+    for obj in session.deleted:
+        fields = _FIELDS_BY_TABLE.get(getattr(obj, '__tablename__', None))
+        if fields:
+            entries.append(entry(obj.__tablename__, obj.id, DELETE,
+                                 before={name: getattr(obj, name) for name in fields}, actor_id=actor))
+    if entries:
+        record_many(session, entries)
+
+def _after_commit(session):
+    entries = session.info.pop(_PENDING_KEY, None)
+    if entries and has_app_context():
+        buffer = current_app.extensions.get('audit')
+        if buffer is not None:
+            buffer.append(entries)
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+class AuditBuffer:
+    """
+    Bounded in-memory buffer of committed entries in front of `audit_log`.
+    A background thread (started lazily per process) writes them every
+    flush_interval seconds or as soon as batch_size are waiting; without
+    one, the committing thread writes each full batch. A buffer that reaches
+    max_entries is written by the committing thread (backpressure instead of
+    dropping entries). A failed write keeps the entries for the next attempt.
+    """
+    def __init__(self, app, batch_size=500, max_entries=10000, flush_interval=1.0):
+        self.app = app
+        self.batch_size = max(1, batch_size)
+        self.max_entries = max(self.batch_size, max_entries)
+        self.flush_interval = flush_interval
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self.written = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, entries):
+        with self._lock:
+            self._entries.extend(entries)
+            waiting = len(self._entries)
+        background = self._flusher()
+        if waiting >= self.max_entries or (waiting >= self.batch_size and not background):
+            self.flush()
+        elif waiting >= self.batch_size:
+            self._wake.set()
+
+    def _flusher(self):
+        """True if a background flusher runs in this process (starting it if needed)"""
+        if self.flush_interval <= 0:
+            return False
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    threading.Thread(target=self._run, name='audit-flusher', daemon=True).start()
+        return True
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                # Database hiccup: the entries stay buffered for the next round
+                self.app.logger.error(f"Audit flush failed: {e}")
+
+    def flush(self):
+        """Write everything buffered so far in batches; returns the number written"""
+        written = 0
+        with self._write_lock:
+            while True:
+                with self._lock:
+                    batch = [self._entries.popleft() for _ in range(min(self.batch_size, len(self._entries)))]
+                if not batch:
+                    return written
+                try:
+                    with db.engine.begin() as connection:
+                        connection.execute(insert(AuditLog.__table__), batch)
+                except Exception:
+                    with self._lock:
+                        self._entries.extendleft(reversed(batch))
+                    raise
+                written += len(batch)
+                self.written += len(batch)
+
+@atexit.register
+def _flush_at_exit():
+    for buffer in list(_buffers):
+        try:
+            with buffer.app.app_context():
+                buffer.flush()
+        except Exception as e:
+            buffer.app.logger.error(f"Audit flush at exit failed, {len(buffer)} entries lost: {e}")
+
+def get_buffer(app):
+    return app.extensions['audit']
+
+def flush():
+    """Write buffered entries now (lookups call it, so they see their own writes)"""
+    buffer = current_app.extensions.get('audit')
+    return buffer.flush() if buffer is not None else 0
+
+def _serialize(row):
+    return {
+        'id': row.id,
+        'table_name': row.table_name,
+        'row_id': row.row_id,
+        'action': row.action,
+        'actor_id': row.actor_id,
+        'before': json.loads(row.before) if row.before else None,
+        'after': json.loads(row.after) if row.after else None,
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+def history(table_name=None, row_id=None, actor_id=None, since=None, until=None, before_id=None, limit=100):
+    """
+    Audit entries, newest first, for one row or actor and/or a time window.
+    Page back with before_id, the id of the last entry already seen.
+    Ordered by (created_at, id) rather than id alone so the created_at
+    indexes serve both the window filters and the sort.
+    """
+    flush()
+    query = select(AuditLog)
+    if before_id is not None:
+        seen = select(AuditLog.created_at).where(AuditLog.id == before_id).scalar_subquery()
+        query = query.where(or_(AuditLog.created_at < seen,
+                                and_(AuditLog.created_at == seen, AuditLog.id < before_id)))
+    if table_name is not None:
+        query = query.where(AuditLog.table_name == table_name)
+    if row_id is not None:
+        query = query.where(AuditLog.row_id == row_id)
+    if actor_id is not None:
+        query = query.where(AuditLog.actor_id == actor_id)
+    if since is not None:
+        query = query.where(AuditLog.created_at >= since)
+    if until is not None:
+        query = query.where(AuditLog.created_at < until)
+    rows = db.session.scalars(query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit)).all()
+    return [_serialize(row) for row in rows]
+
+def init_app(app):
+    """Install the session listeners once per process, give the app its buffer, register `flask audit`"""
+    buffer = app.extensions['audit'] = AuditBuffer(
+        app,
+        batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+        max_entries=app.config.get('AUDIT_BUFFER_SIZE', 10000),
+        flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL', 0),
+    )
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+
+    _buffers.add(buffer)
+
+    @app.cli.command('audit')
+    @click.argument('table_name')
+    @click.argument('row_id', type=int)
+    def audit_command(table_name, row_id):
+        """Print the audit trail of one row, e.g. `flask audit requests 42`"""
+        for item in reversed(history(table_name, row_id, limit=1000)):
+            click.echo(f"{item['created_at']} {item['action']:9s} actor={item['actor_id']} "
+                       f"{item['before']} -> {item['after']}")
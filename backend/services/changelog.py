@@ -0,0 +1,118 @@
+"""
+Change log behind the delta-sync API.
+Every flush that inserts, updates or deletes a synced row appends a ChangeLog
+entry on the same connection, so the entry commits or rolls back with the change.
+"""
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import event, select, insert, delete, literal, func
+from sqlalchemy.orm import Session, aliased
+
+from extensions import db
+from models import Event, Resource, Request, VolunteerAssignment, RequestContribution, ChangeLog
+
+# Synced tables and the column that makes a row private to one user
+SYNCED = {
+    Event: None,
+    Resource: None,
+    Request: 'user_id',
+    VolunteerAssignment: 'user_id',
+    RequestContribution: 'user_id',
+}
+_OWNER_BY_TABLE = {model.__table__.name: owner for model, owner in SYNCED.items()}
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+def _entry(obj, op):
+    table = obj.__table__.name
+    owner = _OWNER_BY_TABLE[table]
+    return {'table_name': table, 'row_id': obj.id, 'op': op,
+            'user_id': getattr(obj, owner) if owner else None}
+
+def _synced(objects):
+    return [obj for obj in objects if getattr(obj, '__tablename__', None) in _OWNER_BY_TABLE]
+
+def _after_flush(session, flush_context):
+    entries = [_entry(obj, UPSERT) for obj in _synced(session.new)]
+    entries += [_entry(obj, UPSERT) for obj in _synced(session.dirty)
+                if session.is_modified(obj, include_collections=False)]
+    entries += [_entry(obj, DELETE) for obj in _synced(session.deleted)]
+    if entries:
+        # Core insert on the flush's connection: no ORM events, same transaction
+        session.connection().execute(insert(ChangeLog.__table__), entries)
+
+def record_rows(session, model, where, op=UPSERT):
+    """
+    Log rows changed by bulk SQL or stored procedures, which bypass the flush.
+    Call it while the rows still exist (before a bulk delete).
+    """
+    owner = SYNCED[model]
+    source = model.__table__
+    rows = select(literal(source.name), source.c.id, literal(op),
+                  source.c[owner] if owner else literal(None, ChangeLog.user_id.type),
+                  literal(datetime.utcnow(), ChangeLog.changed_at.type)).where(where)
+    session.execute(insert(ChangeLog).from_select(
+        ['table_name', 'row_id', 'op', 'user_id', 'changed_at'], rows))
+
+def changes_since(since, user_id=None, limit=1000, settle_seconds=0):
+    """
+    Change log entries after the token, collapsed to the latest op per row.
+    Returns (entries, token, more). With user_id set, private rows of other
+    users are left out. Entries younger than settle_seconds are held back so
+    transactions that took a lower id but commit later are not skipped; a
+    client with nothing to fetch costs one primary-key range lookup.
+    """
+    query = select(ChangeLog.id, ChangeLog.table_name, ChangeLog.row_id, ChangeLog.op, ChangeLog.changed_at) \
+        .where(ChangeLog.id > since)
+    if user_id is not None:
+        query = query.where((ChangeLog.user_id == None) | (ChangeLog.user_id == user_id))
+    rows = db.session.execute(query.order_by(ChangeLog.id).limit(limit + 1)).all()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if settle_seconds:
+        cutoff = datetime.utcnow() - timedelta(seconds=settle_seconds)
+        for i, row in enumerate(rows):
+            if row.changed_at > cutoff:
+                # The rest is picked up by the next sync, not an immediate retry
+                rows, more = rows[:i], False
+                break
+
+    latest = {}
+    for row in rows:
+        latest[(row.table_name, row.row_id)] = row.op
+    token = rows[-1].id if rows else since
+    return latest, token, more
+
+def current_token():
+    return db.session.scalar(select(func.max(ChangeLog.id))) or 0
+
+def compact(batch_size=5000):
+    """Drop entries superseded by a newer entry for the same row; no token loses information"""
+    newer = aliased(ChangeLog)
+    superseded = select(ChangeLog.id).where(
+        select(newer.id).where(newer.table_name == ChangeLog.table_name,
+                               newer.row_id == ChangeLog.row_id,
+                               newer.id > ChangeLog.id).exists()
+    ).limit(batch_size)
+    removed = 0
+    while True:
+        # Ids are fetched first: MySQL cannot delete from a table it is subquerying
+        ids = db.session.scalars(superseded).all()
+        if not ids:
+            return removed
+        db.session.execute(delete(ChangeLog).where(ChangeLog.id.in_(ids)))
+        db.session.commit()
+        removed += len(ids)
+
+def init_app(app):
+    """Install the flush listener once per process and register `flask sync-compact`"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+
+    @app.cli.command('sync-compact')
+    def compact_command():
+        """Remove change log entries superseded by newer ones"""
+        click.echo(f"Removed {compact()} superseded change log entries")
@@ -0,0 +1,124 @@
+"""
+Coalescing of duplicate requests.
+During an incident many users ask for the same resource at the same event.
+With REQUEST_COALESCING_ENABLED, a new request is folded into the open
+(Pending) request for that event and resource instead of adding another row
+to the admin queue; each submitter keeps a RequestContribution linked to the
+aggregate, and status changes on the aggregate fan out to its contributions.
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case, event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Request, RequestContribution
+from services import versions, changelog, audit
+
+URGENCY_RANK = {'Low': 0, 'Medium': 1, 'High': 2, 'Critical': 3}
+
+def enabled():
+    return current_app.config.get('REQUEST_COALESCING_ENABLED', False)
+
+def _fold(event_id, resource_id, quantity, urgency):
+    """
+    Add `quantity` to the oldest open request for the event and resource with
+    room for it; returns that request, or None when there is none.
+    SQLite ignores FOR UPDATE, so the open requests are locked with a write
+    that changes nothing before they are read: a concurrent submitter waits
+    for this transaction, then finds the aggregate it adds to or creates.
+    The quantity itself is added in SQL, never read-modified-written.
+    """
+    is_open = (Request.event_id == event_id, Request.resource_id == resource_id, Request.status == 'Pending')
+    max_quantity = current_app.config.get('REQUEST_COALESCING_MAX_QUANTITY', 0)
+    has_room = (Request.quantity + quantity <= max_quantity,) if max_quantity else ()
+    db.session.execute(update(Request).where(*is_open).values(updated_at=Request.updated_at)
+                       .execution_options(synchronize_session=False))
+    before = db.session.execute(select(Request.id, Request.quantity, Request.urgency)
+                                .where(*is_open, *has_room).order_by(Request.id).limit(1)).first()
+    if before is None:
+        return None
+
+    rank = case(URGENCY_RANK, value=Request.urgency, else_=1)
+    folded = db.session.execute(
+        update(Request).where(Request.id == before.id, *is_open, *has_room)
+        .values(quantity=Request.quantity + quantity,
+                urgency=case((rank < URGENCY_RANK.get(urgency, 1), urgency), else_=Request.urgency),
+                updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not folded:
+        return None
+    request_obj = db.session.get(Request, before.id, populate_existing=True)
+    # The update bypasses the flush: do what the ORM listeners would
+    changelog.record_rows(db.session, Request, Request.id == before.id)
+    audit.record(db.session, 'requests', before.id, audit.UPDATE,
+                 before={'quantity': before.quantity, 'urgency': before.urgency},
+                 after={'quantity': request_obj.quantity, 'urgency': request_obj.urgency})
+    return request_obj
+
+def submit(user_id, resource_id, event_id, quantity, urgency='Medium'):
+    """
+    Add a user's demand: folded into an open aggregate when coalescing is on
+    and one exists, otherwise a new request. Returns (request, contribution,
+    coalesced); contribution is None when coalescing is off. The caller commits.
+    """
+    if not enabled():
+        request_obj = Request(user_id=user_id, resource_id=resource_id, event_id=event_id,
+                              quantity=quantity, urgency=urgency)
+        db.session.add(request_obj)
+        return request_obj, None, False
+
+    request_obj = _fold(event_id, resource_id, quantity, urgency)
+    coalesced = request_obj is not None
+    if not coalesced:
+        request_obj = Request(user_id=user_id, resource_id=resource_id, event_id=event_id,
+                              quantity=quantity, urgency=urgency)
+        db.session.add(request_obj)
+
+    contribution = RequestContribution(request_obj=request_obj, user_id=user_id, quantity=quantity,
+                                       urgency=urgency, status=request_obj.status or 'Pending')
+    db.session.add(contribution)
+    return request_obj, contribution, coalesced
+
+def _before_flush(session, flush_context, instances):
+    # Requests whose status changed in this flush, with their new status
+    changed = {}
+    for obj in session.dirty:
+        if isinstance(obj, Request) and obj.id is not None \
+                and inspect(obj).attrs.status.history.has_changes():
+            changed[obj.id] = obj.status
+    if not changed:
+        return
+    with session.no_autoflush:
+        contributions = session.scalars(
+            select(RequestContribution).where(RequestContribution.request_id.in_(changed))
+        ).all()
+    # Through the ORM so the change log and data versions see them
+    for contribution in contributions:
+        if contribution.status != changed[contribution.request_id]:
+            contribution.status = changed[contribution.request_id]
+
+def fan_out(session, where):
+    """
+    Copy the status of requests matching `where` to their contributions, for
+    writes that bypass the flush (bulk statements, stored procedures)
+    """
+    request_ids = select(Request.id).where(where)
+    contributions = RequestContribution.__table__
+    status = select(Request.status).where(Request.id == contributions.c.request_id).scalar_subquery()
+    result = session.execute(
+        update(contributions)
+        .where(contributions.c.request_id.in_(request_ids), contributions.c.status != status)
+        .values(status=status, updated_at=datetime.utcnow())
+    )
+    if result.rowcount:
+        versions.mark_changed(session, 'request_contributions')
+        changelog.record_rows(session, RequestContribution, RequestContribution.request_id.in_(request_ids))
+    return result.rowcount
+
+def init_app(app):
+    """Install the status fan-out listener once per process"""
+    if not event.contains(Session, 'before_flush', _before_flush):
+        event.listen(Session, 'before_flush', _before_flush)
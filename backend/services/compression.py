@@ -0,0 +1,100 @@
+"""
+HTTP compression helpers for bandwidth-sensitive JSON feeds.
+Negotiates gzip/brotli with the client and keeps precompressed bodies cached.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Bodies smaller than this are cheaper to send as-is than to compress
+MIN_COMPRESS_BYTES = 256
+
+class BodyCache:
+    """
+    Small thread-safe LRU of compressed bodies keyed by (etag, encoding).
+    Content-addressed keys mean entries never go stale, they only get evicted.
+    """
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+body_cache = BodyCache()
+
+def available_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def negotiate_encoding():
+    """Pick the best content-coding the client accepts, or None for identity"""
+    return request.accept_encodings.best_match(available_encodings())
+
+def compress(body, encoding):
+    """Compress a body once at the highest level; results are cached"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=11)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=9, mtime=0)
+    return body
+
+def body_etag(body):
+    """Strong validator derived from the uncompressed body"""
+    return hashlib.sha1(body).hexdigest()[:20]
+
+def compressed_response(body, mimetype='application/json', etag=None, cache=body_cache):
+    """
+    Build a response for an uncompressed body with ETag revalidation and
+    content negotiation. Compressed variants are served from cache.
+    """
+    etag = etag or body_etag(body)
+    
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+    
+    encoding = negotiate_encoding() if len(body) >= MIN_COMPRESS_BYTES else None
+    data = body
+    if encoding:
+        data = cache.get((etag, encoding))
+        if data is None:
+            data = compress(body, encoding)
+            cache.put((etag, encoding), data)
+    
+    response = Response(data, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'private, no-cache'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
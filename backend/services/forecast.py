@@ -0,0 +1,255 @@
+"""
+Stock depletion forecasting per resource and event.
+Donation inflow and approved-request outflow are bucketed in time and
+exponentially smoothed with NumPy across all resources at once; new rows are
+folded in incrementally using id watermarks on the append-only tables, held
+back for a settle window as delta sync holds back change log entries.
+"""
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select, func
+
+from extensions import db
+from models import Resource, Donation, Request, AdminResponse
+from services import versions
+
+# Anything further out than this is reported as "not depleting"
+MAX_HORIZON_DAYS = 3650
+
+class SmoothedRates:
+    """
+    Exponentially smoothed per-key totals over fixed time buckets.
+    One row per key; every fold updates all rows with a single vector op.
+    Levels are bias-corrected per row, so a key seen for the first time
+    yesterday is not reported at a fraction of its real rate.
+    """
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.index = {}
+        self.level = np.zeros(0)
+        self.weight = np.zeros(0)
+        self.pending = {}         # bucket -> per-row sums not folded yet
+        self.next_bucket = None   # first bucket that has not been folded
+
+    def _rows(self, keys):
+        rows = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            row = self.index.get(key)
+            if row is None:
+                row = self.index[key] = len(self.index)
+            rows[i] = row
+        grow = len(self.index) - len(self.level)
+        if grow > 0:
+            self.level = np.concatenate([self.level, np.zeros(grow)])
+            self.weight = np.concatenate([self.weight, np.zeros(grow)])
+            for sums in self.pending.values():
+                sums.resize(len(self.index), refcheck=False)
+        return rows
+
+    def add(self, keys, buckets, quantities):
+        """Accumulate observations; keys, buckets and quantities are parallel sequences"""
+        if len(keys) == 0:
+            return
+        rows = self._rows(keys)
+        buckets = np.asarray(buckets, dtype=np.int64)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        if self.next_bucket is not None:
+            # Late rows for an already folded bucket count towards the oldest open one
+            buckets = np.maximum(buckets, self.next_bucket)
+        for bucket in np.unique(buckets):
+            mask = buckets == bucket
+            sums = self.pending.setdefault(int(bucket), np.zeros(len(self.index)))
+            np.add.at(sums, rows[mask], quantities[mask])
+
+    def advance(self, current_bucket):
+        """Fold every bucket before current_bucket into the smoothed levels"""
+        if self.next_bucket is None:
+            if not self.pending:
+                return
+            self.next_bucket = min(self.pending)
+        decay = 1.0 - self.alpha
+        for bucket in sorted(b for b in self.pending if b < current_bucket):
+            # Empty buckets in between only decay: closed form instead of a loop
+            self._decay(bucket - self.next_bucket)
+            x = self.pending.pop(bucket)
+            started = (self.weight > 0) | (x != 0)
+            self.level = np.where(started, self.alpha * x + decay * self.level, 0.0)
+            self.weight = np.where(started, self.alpha + decay * self.weight, 0.0)
+            self.next_bucket = bucket + 1
+        if current_bucket > self.next_bucket:
+            self._decay(current_bucket - self.next_bucket)
+            self.next_bucket = current_bucket
+
+    def _decay(self, empty_buckets):
+        if empty_buckets <= 0:
+            return
+        factor = (1.0 - self.alpha) ** empty_buckets
+        self.level = self.level * factor
+        self.weight = np.where(self.weight > 0, 1.0 - (1.0 - self.weight) * factor, 0.0)
+
+    def rates(self, keys):
+        """Smoothed quantity per bucket for each key (0 for unknown keys)"""
+        out = np.zeros(len(keys))
+        rows = np.fromiter((self.index.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+        known = rows >= 0
+        if known.any():
+            weight = self.weight[rows[known]]
+            level = self.level[rows[known]]
+            out[known] = np.divide(level, weight, out=np.zeros_like(level), where=weight > 0)
+        return out
+
+def _settled(rows, cutoff):
+    """Rows (in id order) up to the first one stamped after cutoff, if any"""
+    if cutoff is None:
+        return rows
+    for i, row in enumerate(rows):
+        if row.at > cutoff:
+            return rows[:i]
+    return rows
+
+def _epoch_buckets(timestamps, bucket_seconds):
+    seconds = np.array(timestamps, dtype='datetime64[s]').astype(np.int64)
+    return seconds // bucket_seconds
+
+class StockForecaster:
+    """
+    Incremental depletion forecaster.
+    Inflow is completed donations; outflow is approvals (admin responses),
+    which are append-only, so an id watermark per table is enough to fold in
+    only the rows that arrived since the last refresh. Rows younger than
+    settle_seconds are left for a later refresh and the watermark stops short
+    of them, so a MySQL transaction that took a lower id but commits later is
+    not skipped (see changelog.changes_since). Rates come from closed buckets
+    only, so a new row shows up once its bucket closes.
+    """
+    def __init__(self, half_life_hours=24, bucket_hours=1, ttl=5, settle_seconds=0, clock=time.time):
+        self.half_life_hours = half_life_hours
+        self.bucket_seconds = int(bucket_hours * 3600)
+        # Per-bucket smoothing factor giving the requested half-life in hours
+        self.alpha = 1.0 - 0.5 ** (bucket_hours / half_life_hours)
+        self.ttl = ttl
+        self.settle_seconds = settle_seconds
+        self.clock = clock
+        self.inflow = SmoothedRates(self.alpha)
+        self.outflow = SmoothedRates(self.alpha)
+        self.event_outflow = SmoothedRates(self.alpha)
+        self.last_donation_id = 0
+        self.last_response_id = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def _current_bucket(self):
+        return int(self.clock()) // self.bucket_seconds
+
+    def refresh(self):
+        """Fold settled donations and approvals newer than the watermarks into the series"""
+        cutoff = datetime.utcfromtimestamp(self.clock() - self.settle_seconds) if self.settle_seconds else None
+        donations = _settled(db.session.execute(
+            select(Donation.id, Donation.resource_id, Donation.donated_at.label('at'), Donation.quantity)
+            .where(Donation.id > self.last_donation_id, Donation.status == 'Completed')
+            .order_by(Donation.id)
+        ).all(), cutoff)
+        if donations:
+            ids, resource_ids, times, quantities = zip(*donations)
+            self.inflow.add(resource_ids, _epoch_buckets(times, self.bucket_seconds), quantities)
+            self.last_donation_id = ids[-1]
+
+        approvals = _settled(db.session.execute(
+            select(AdminResponse.id, Request.resource_id, Request.event_id, AdminResponse.responded_at.label('at'),
+                   func.coalesce(Request.approved_quantity, Request.quantity))
+            .join(Request, Request.id == AdminResponse.request_id)
+            .where(AdminResponse.id > self.last_response_id, AdminResponse.action == 'Approved')
+            .order_by(AdminResponse.id)
+        ).all(), cutoff)
+        if approvals:
+            ids, resource_ids, event_ids, times, quantities = zip(*approvals)
+            buckets = _epoch_buckets(times, self.bucket_seconds)
+            self.outflow.add(resource_ids, buckets, quantities)
+            self.event_outflow.add(list(zip(resource_ids, event_ids)), buckets, quantities)
+            self.last_response_id = ids[-1]
+
+        current = self._current_bucket()
+        for series in (self.inflow, self.outflow, self.event_outflow):
+            series.advance(current)
+
+    def _watermarks(self):
+        """Two index-only lookups telling whether anything new has arrived"""
+        return db.session.execute(select(
+            select(func.max(Donation.id)).scalar_subquery(),
+            select(func.max(AdminResponse.id)).scalar_subquery()
+        )).one()
+
+    def forecast(self, event_id=None):
+        """Serialized forecast, rebuilt only when new rows or stock changes arrive"""
+        generation = (tuple(self._watermarks()), self._current_bucket(), versions.table_version('resources'))
+        with self._lock:
+            if self._cache.get('generation') != generation:
+                self._cache = {'generation': generation}
+            cached = self._cache.get(event_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+            self.refresh()
+            body = json.dumps(self._build(event_id), separators=(',', ':')).encode('utf-8')
+            self._cache[event_id] = (time.monotonic() + self.ttl, body)
+            return body
+
+    def _build(self, event_id):
+        resources = db.session.execute(
+            select(Resource.id, Resource.name, Resource.unit, Resource.available_quantity).order_by(Resource.id)
+        ).all()
+        ids = [row.id for row in resources]
+        per_day = 86400.0 / self.bucket_seconds
+
+        available = np.array([row.available_quantity or 0 for row in resources], dtype=np.float64)
+        inflow = self.inflow.rates(ids) * per_day
+        outflow = self.outflow.rates(ids) * per_day
+        if event_id is not None:
+            # Depletion if only this event's demand drew on the stock
+            outflow = self.event_outflow.rates([(rid, event_id) for rid in ids]) * per_day
+            inflow = np.zeros_like(outflow)
+        net = outflow - inflow
+        days = np.divide(available, net, out=np.full_like(net, np.inf), where=net > 0)
+        days[available <= 0] = 0.0
+        days[days > MAX_HORIZON_DAYS] = np.inf
+
+        now = datetime.utcfromtimestamp(self.clock())
+        order = np.argsort(days, kind='stable')
+        items = []
+        for i in order:
+            if event_id is not None and outflow[i] == 0:
+                continue
+            finite = bool(np.isfinite(days[i]))
+            items.append({
+                'id': ids[i],
+                'name': resources[i].name,
+                'unit': resources[i].unit,
+                'available': int(available[i]),
+                'inflow_per_day': round(float(inflow[i]), 2),
+                'outflow_per_day': round(float(outflow[i]), 2),
+                'net_per_day': round(float(net[i]), 2),
+                'days_to_depletion': round(float(days[i]), 2) if finite else None,
+                'depletion_at': (now + timedelta(days=float(days[i]))).isoformat() if finite else None
+            })
+        return {
+            'generated_at': now.isoformat(),
+            'half_life_hours': self.half_life_hours,
+            'bucket_hours': self.bucket_seconds / 3600,
+            'event_id': event_id,
+            'resources': items
+        }
+
+def get_forecaster(app):
+    return app.extensions['forecaster']
+
+def init_app(app):
+    app.extensions['forecaster'] = StockForecaster(
+        half_life_hours=app.config.get('FORECAST_HALF_LIFE_HOURS', 24),
+        bucket_hours=app.config.get('FORECAST_BUCKET_HOURS', 1),
+        ttl=app.config.get('FORECAST_TTL', 5),
+        settle_seconds=app.config.get('SYNC_SETTLE_SECONDS', 2)
+    )
@@ -0,0 +1,78 @@
+"""
+Render cache for shared template fragments.
+Fragments are keyed on the data versions of the tables they render, so the
+parts of a dashboard that are identical for every user are rendered once.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from markupsafe import Markup
+
+from services import versions, replicas
+
+class FragmentCache:
+    """
+    Thread-safe LRU of rendered fragments.
+    Table versions are tracked per process, so the TTL bounds how long another
+    worker's writes can go unseen.
+    """
+    def __init__(self, max_entries=256, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def cached_fragment(name, *tables, caller):
+    """
+    Jinja call block that renders its body once per data version:
+
+        {% call cached_fragment('resources_table', 'resources') %}...{% endcall %}
+    """
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is None:
+        return caller()
+    
+    key = (name, tables, versions.table_version(*tables))
+    html = cache.get(key)
+    if html is None:
+        html = Markup(caller())
+        # A lagging replica may not have the write that produced this version yet
+        lag = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+        if not (replicas.reading_from_replica() and versions.seconds_since_change(*tables) < lag):
+            cache.put(key, html)
+    return html
+
+def init_app(app):
+    """Attach a fragment cache to the app and expose the Jinja helper"""
+    versions.init_app(app)
+    if app.config.get('FRAGMENT_CACHE_ENABLED', True):
+        app.extensions['fragment_cache'] = FragmentCache(
+            max_entries=app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 256),
+            ttl=app.config.get('FRAGMENT_CACHE_TTL', 30)
+        )
+    app.jinja_env.globals['cached_fragment'] = cached_fragment
@@ -0,0 +1,261 @@
+"""
+Idempotency-Key support for write endpoints.
+The first request with a key runs the view; retries with the same key get the
+stored response back without running it again. Keys live in the database by
+default, so a retry is recognised whichever worker process it reaches;
+IDEMPOTENCY_STORE = 'memory' keeps them per process (single worker only).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, request, jsonify, make_response
+from flask_login import current_user
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+class _Entry:
+    __slots__ = ('fingerprint', 'expires_at', 'done', 'response', 'claim_id')
+    
+    def __init__(self, fingerprint, expires_at, claim_id=None):
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.done = threading.Event()
+        self.response = None  # (status, body, mimetype) once completed
+        self.claim_id = claim_id  # idempotency_keys row claimed (database store)
+
+class IdempotencyStore:
+    """
+    Compact in-process key store with TTL eviction.
+    Keys are kept in insertion order, so expired entries are always at the
+    front and eviction is O(1) per entry. Keys live per worker process.
+    """
+    def __init__(self, ttl=86400, max_entries=50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _evict(self, now):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            expired = entry.expires_at <= now
+            # Over capacity, drop the oldest finished key; never one still in flight
+            if expired or (len(self._entries) >= self.max_entries and entry.done.is_set()):
+                del self._entries[key]
+            else:
+                break
+    
+    def begin(self, key, fingerprint):
+        """
+        Claim a key. Returns (entry, owner): the owner must call complete()
+        or abandon(); everyone else waits on entry.done.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                return entry, False
+            entry = _Entry(fingerprint, now + self.ttl)
+            self._entries[key] = entry
+            return entry, True
+    
+    def complete(self, key, entry, response):
+        entry.response = response
+        entry.done.set()
+    
+    def abandon(self, key, entry):
+        """Forget a key whose request failed so a retry can run again"""
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+    
+    def wait(self, key, entry, timeout):
+        """Stored response of an entry someone else owns, or None if it is not done in time"""
+        entry.done.wait(timeout)
+        return entry.response
+    
+    def __len__(self):
+        return len(self._entries)
+
+class DatabaseIdempotencyStore:
+    """
+    Key store in the `idempotency_keys` table, shared by every worker process.
+    Inserting the key's row claims it (the unique scope settles races); others
+    poll the row for the stored response. A claim without a response is held
+    for `lease` seconds: past that its worker is presumed dead and a retry
+    takes the key over. Writes run in their own short transactions, apart
+    from the request's session.
+    """
+    def __init__(self, ttl=86400, lease=30, poll_interval=0.05, purge_interval=60):
+        self.ttl = ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+    
+    @staticmethod
+    def _scope(key):
+        owner_id, endpoint, idem_key = key
+        table = IdempotencyKey.__table__
+        return and_(table.c.owner_id == (owner_id or ''), table.c.endpoint == endpoint,
+                    table.c.idem_key == idem_key)
+    
+    def _row(self, key):
+        table = IdempotencyKey.__table__
+        with db.engine.connect() as connection:
+            return connection.execute(
+                select(table.c.fingerprint, table.c.status_code, table.c.body, table.c.mimetype)
+                .where(self._scope(key))).first()
+    
+    def _purge(self, now):
+        if time.monotonic() - self._purged_at >= self.purge_interval:
+            self._purged_at = time.monotonic()
+            with db.engine.begin() as connection:
+                connection.execute(delete(IdempotencyKey.__table__).where(IdempotencyKey.expires_at <= now))
+    
+    def begin(self, key, fingerprint):
+        """Claim a key. Returns (entry, owner), as IdempotencyStore.begin"""
+        now = datetime.utcnow()
+        self._purge(now)
+        owner_id, endpoint, idem_key = key
+        table = IdempotencyKey.__table__
+        lapsed = and_(table.c.status_code.is_(None),
+                      or_(table.c.claimed_until.is_(None), table.c.claimed_until <= now))
+        for _ in range(3):
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(delete(table).where(self._scope(key), or_(table.c.expires_at <= now, lapsed)))
+                    claim_id = connection.execute(insert(table).values(
+                        owner_id=owner_id or '', endpoint=endpoint, idem_key=idem_key, fingerprint=fingerprint,
+                        created_at=now, expires_at=now + timedelta(seconds=self.ttl),
+                        claimed_until=now + timedelta(seconds=self.lease))).inserted_primary_key[0]
+                return _Entry(fingerprint, None, claim_id), True
+            except IntegrityError:
+                row = self._row(key)
+                if row is not None:
+                    return _Entry(row.fingerprint, None), False
+                # Abandoned in between: try to claim it again
+        raise RuntimeError('Could not claim idempotency key')
+    
+    def complete(self, key, entry, response):
+        # Only our own claim: past its lease a retry may have taken the key over
+        status, body, mimetype = response
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as connection:
+            connection.execute(update(table).where(table.c.id == entry.claim_id, table.c.status_code.is_(None))
+                               .values(status_code=status, body=body, mimetype=mimetype, claimed_until=None))
+    
+    def abandon(self, key, entry):
+        table = IdempotencyKey.__table__
+        with db.engine.begin() as connection:
+            connection.execute(delete(table).where(table.c.id == entry.claim_id, table.c.status_code.is_(None)))
+    
+    def wait(self, key, entry, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            row = self._row(key)
+            if row is None:
+                return None
+            if row.status_code is not None:
+                return row.status_code, row.body, row.mimetype
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+def _fingerprint():
+    """
+    Hash of the method, path and parsed payload. Form posts are hashed by
+    field, not raw body: a browser retrying a FormData post sends a new
+    multipart boundary with the same fields.
+    """
+    if request.mimetype in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        files = []
+        for name, upload in sorted(request.files.items(multi=True)):
+            files.append([name, upload.filename, hashlib.sha256(upload.stream.read()).hexdigest()])
+            upload.stream.seek(0)
+        payload = {'form': sorted(request.form.items(multi=True)), 'files': files}
+    elif request.is_json:
+        payload = {'json': request.get_json(silent=True)}
+    else:
+        payload = {'data': request.get_data().decode('latin-1')}
+    canonical = json.dumps([request.method, request.path, payload], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def _replay(stored):
+    status, body, mimetype = stored
+    response = make_response(body, status)
+    response.mimetype = mimetype
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(view):
+    """
+    Honor the Idempotency-Key header on a write endpoint.
+    Responses below 500 are stored and replayed; 5xx and exceptions release
+    the key so the client can retry. If the response cannot be stored, the
+    client still gets it and the key is released when its lease runs out.
+    Place below @login_required.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        store = current_app.extensions.get('idempotency')
+        if not key or store is None:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': 'Idempotency key too long'}), 400
+        
+        owner_id = current_user.get_id() if current_user.is_authenticated else None
+        scoped_key = (owner_id, request.endpoint, key)
+        fingerprint = _fingerprint()
+        entry, owner = store.begin(scoped_key, fingerprint)
+        
+        if not owner:
+            if entry.fingerprint != fingerprint:
+                return jsonify({'error': 'Idempotency key reused with a different request'}), 422
+            stored = store.wait(scoped_key, entry, current_app.config.get('IDEMPOTENCY_WAIT_SECONDS', 10))
+            if stored is None:
+                return jsonify({'error': 'A request with this idempotency key is still in progress'}), 409
+            return _replay(stored)
+        
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            store.abandon(scoped_key, entry)
+            raise
+        
+        if response.status_code >= 500 or response.direct_passthrough:
+            store.abandon(scoped_key, entry)
+        else:
+            try:
+                store.complete(scoped_key, entry, (response.status_code, response.get_data(), response.mimetype))
+            except Exception as e:
+                # The view has committed: answer the client rather than turn its write into a 500
+                current_app.logger.error(f"Idempotency key {key!r} not stored, released after its lease: {e}")
+        return response
+    return wrapper
+
+def init_app(app):
+    if app.config.get('IDEMPOTENCY_STORE', 'memory') == 'database':
+        app.extensions['idempotency'] = DatabaseIdempotencyStore(
+            ttl=app.config.get('IDEMPOTENCY_TTL', 86400),
+            lease=app.config.get('IDEMPOTENCY_LEASE_SECONDS', 30)
+        )
+    else:
+        app.extensions['idempotency'] = IdempotencyStore(
+            ttl=app.config.get('IDEMPOTENCY_TTL', 86400),
+            max_entries=app.config.get('IDEMPOTENCY_MAX_KEYS', 50000)
+        )
@@ -0,0 +1,237 @@
+"""
+Schema and index upkeep, and query plan checks.
+The models declare the same indexes as sql/schema.sql; databases created from
+older models or an older schema are brought up to date by `flask indexes
+ensure` (or sql/migrate_indexes.sql on MySQL): it adds the columns create_all()
+never adds to an existing table, rebuilds SQLite tables that still reuse ids,
+then creates missing indexes. full_scans() asks the database for a statement's
+plan, so tests can fail any hot query that reads a whole table.
+"""
+import re
+
+import click
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from extensions import db
+
+_CREATE_TABLE = re.compile(r'CREATE TABLE (\w+) \((.*?)\n\)', re.S)
+_INDEX = re.compile(r'^\s*(?:UNIQUE |FULLTEXT )?(?:INDEX|KEY) \w+ \(([^)]*)\)', re.M)
+_UNIQUE_COLUMN = re.compile(r'^\s*(\w+) [^,\n]*\bUNIQUE\b', re.M)
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$')
+_ALIAS = re.compile(r'\b(\w+) AS (\w+)\b')
+
+def _columns(text):
+    return tuple(column.strip().strip('`') for column in text.split(','))
+
+def model_indexes():
+    """{table: {column tuple, ...}} for every index and unique key the models declare"""
+    declared = {}
+    for table in db.metadata.sorted_tables:
+        keys = {tuple(column.name for column in index.columns) for index in table.indexes}
+        keys |= {tuple(column.name for column in constraint.columns) for constraint in table.constraints
+                 if constraint.__class__.__name__ == 'UniqueConstraint'}
+        keys |= {(column.name,) for column in table.columns if column.unique}
+        declared[table.name] = keys
+    return declared
+
+def schema_indexes(sql):
+    """{table: {column tuple, ...}} for the indexes and unique keys in a schema.sql script"""
+    declared = {}
+    for table, body in _CREATE_TABLE.findall(sql.replace('\r\n', '\n')):
+        keys = {_columns(columns) for columns in _INDEX.findall(body)}
+        keys |= {(column,) for column in _UNIQUE_COLUMN.findall(body)
+                 if column not in ('UNIQUE', 'FULLTEXT', 'INDEX', 'KEY')}
+        declared[table] = keys
+    return declared
+
+def _applies_to(index, dialect):
+    # Index.ddl_if(dialect=...) limits an index to some backends (e.g. FULLTEXT to MySQL)
+    condition = index._ddl_if
+    if condition is None or condition.dialect is None:
+        return True
+    return dialect in ((condition.dialect,) if isinstance(condition.dialect, str) else condition.dialect)
+
+def missing_indexes(bind=None):
+    """
+    Model indexes absent from the connected database, for tables that exist.
+    Compared by columns, not name: schema.sql names its indexes differently
+    (idx_status vs ix_events_status) and a same-column index serves as well.
+    """
+    inspector = inspect(bind or db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {tuple(index['column_names']) for index in inspector.get_indexes(table.name)}
+        present |= {tuple(constraint['column_names'])
+                    for constraint in inspector.get_unique_constraints(table.name)}
+        missing += [index for index in sorted(table.indexes, key=lambda index: index.name)
+                    if _applies_to(index, inspector.dialect.name)
+                    and tuple(column.name for column in index.columns) not in present]
+    return missing
+
+def ensure_indexes(bind=None):
+    """Create the model indexes the database lacks; returns their names"""
+    bind = bind or db.engine
+    missing = missing_indexes(bind)
+    for index in missing:
+        index.create(bind)
+    return [index.name for index in missing]
+
+def missing_columns(bind=None):
+    """Model columns absent from the connected database, for tables that exist"""
+    inspector = inspect(bind or db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {column['name'] for column in inspector.get_columns(table.name)}
+        missing += [column for column in table.columns if column.name not in present]
+    return missing
+
+def ensure_columns(bind=None):
+    """
+    ALTER TABLE ... ADD COLUMN for each missing model column; returns
+    'table.column' names. A NOT NULL column without a server default cannot
+    be added to a table that has rows, so it is left to a hand-written migration.
+    """
+    bind = bind or db.engine
+    missing = missing_columns(bind)
+    impossible = [f"{column.table.name}.{column.name}" for column in missing
+                  if not column.nullable and column.server_default is None]
+    if impossible:
+        raise RuntimeError(f"Cannot add NOT NULL columns without a default: {', '.join(impossible)}")
+    
+    compiler = bind.dialect.ddl_compiler(bind.dialect, None)
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as connection:
+        for column in missing:
+            connection.exec_driver_sql(f"ALTER TABLE {preparer.format_table(column.table)} "
+                                       f"ADD COLUMN {compiler.get_column_specification(column)}")
+    return [f"{column.table.name}.{column.name}" for column in missing]
+
+def reusing_ids(bind=None):
+    """
+    SQLite tables the models declare with sqlite_autoincrement but that were
+    created without AUTOINCREMENT, so a deleted (archived) max id is handed out again
+    """
+    bind = bind or db.engine
+    if bind.dialect.name != 'sqlite':
+        return []
+    with bind.connect() as connection:
+        created = dict(connection.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'table'")).all())
+    return [table for table in db.metadata.sorted_tables
+            if table.dialect_options['sqlite']['autoincrement'] and table.name in created
+            and 'AUTOINCREMENT' not in created[table.name].upper()]
+
+def ensure_autoincrement(bind=None):
+    """
+    Rebuild the tables reusing_ids() lists with AUTOINCREMENT (SQLite cannot
+    alter a primary key in place), starting the id sequence past both the
+    live and the archived ids. Their indexes go with the old table: run
+    ensure_indexes() afterwards. Returns the rebuilt table names.
+    """
+    bind = bind or db.engine
+    tables = reusing_ids(bind)
+    if not tables:
+        return []
+    
+    existing_tables = set(inspect(bind).get_table_names())
+    connection = bind.raw_connection()
+    foreign_keys = connection.execute('PRAGMA foreign_keys').fetchone()[0]
+    try:
+        for table in tables:
+            create = str(CreateTable(table).compile(dialect=bind.dialect)).strip()
+            create = create.replace(f'CREATE TABLE {table.name} ', f'CREATE TABLE _rebuild_{table.name} ', 1)
+            present = {row[1] for row in connection.execute(f'PRAGMA table_info({table.name})')}
+            columns = ', '.join(column.name for column in table.columns if column.name in present)
+            archive = f'{table.name}_archive'
+            archived_max = f'(SELECT max(id) FROM {archive})' if archive in existing_tables else '0'
+            # executescript commits first and runs the whole rebuild as one transaction
+            connection.executescript(f"""
+                PRAGMA foreign_keys = OFF;
+                BEGIN;
+                {create};
+                INSERT INTO _rebuild_{table.name} ({columns}) SELECT {columns} FROM {table.name};
+                DROP TABLE {table.name};
+                ALTER TABLE _rebuild_{table.name} RENAME TO {table.name};
+                DELETE FROM sqlite_sequence WHERE name = '{table.name}';
+                INSERT INTO sqlite_sequence (name, seq)
+                    VALUES ('{table.name}', max(coalesce((SELECT max(id) FROM {table.name}), 0),
+                                                coalesce({archived_max}, 0)));
+                COMMIT;
+            """)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.execute(f'PRAGMA foreign_keys = {foreign_keys}')
+        connection.close()
+    return [table.name for table in tables]
+
+def ensure_schema(bind=None):
+    """Bring an existing database up to the models: columns, then id sequences, then indexes"""
+    bind = bind or db.engine
+    return {
+        'columns': ensure_columns(bind),
+        'rebuilt': ensure_autoincrement(bind),
+        'indexes': ensure_indexes(bind),
+    }
+
+def full_scans(connection, statement, parameters=()):
+    """
+    Tables the database would read in full to run `statement`: SQLite plan
+    steps that SCAN a table without an index, MySQL EXPLAIN rows of type ALL
+    """
+    if connection.dialect.name == 'mysql':
+        plan = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings().all()
+        return [row['table'] for row in plan if row['type'] == 'ALL']
+
+    tables = set(db.metadata.tables)
+    aliases = {alias: table for table, alias in _ALIAS.findall(statement) if table in tables}
+    plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+    scans = []
+    for row in plan:
+        match = _SQLITE_SCAN.match(row[-1])
+        if match:
+            name = aliases.get(match.group(2) or match.group(1), match.group(1))
+            if name in tables:
+                scans.append(name)
+    return scans
+
+def init_app(app):
+    """Register `flask indexes check|ensure`"""
+    indexes_cli = click.Group('indexes', help='Model schema and index upkeep')
+
+    @indexes_cli.command('check')
+    def check_command():
+        """List model columns, id sequences and indexes missing from the database"""
+        columns = missing_columns()
+        for column in columns:
+            click.echo(f"{column.table.name}: column {column.name}")
+        tables = reusing_ids()
+        for table in tables:
+            click.echo(f"{table.name}: reuses ids (no AUTOINCREMENT)")
+        missing = missing_indexes()
+        for index in missing:
+            click.echo(f"{index.table.name}: {index.name} ({', '.join(column.name for column in index.columns)})")
+        total = len(columns) + len(tables) + len(missing)
+        click.echo(f"{total} missing" if total else 'All model columns and indexes present')
+
+    @indexes_cli.command('ensure')
+    def ensure_command():
+        """Add missing columns, rebuild SQLite tables that reuse ids, create missing indexes"""
+        done = ensure_schema()
+        if done['columns']:
+            click.echo(f"Added {len(done['columns'])} columns: {', '.join(done['columns'])}")
+        if done['rebuilt']:
+            click.echo(f"Rebuilt {len(done['rebuilt'])} tables with AUTOINCREMENT: {', '.join(done['rebuilt'])}")
+        if done['indexes']:
+            click.echo(f"Created {len(done['indexes'])} indexes: {', '.join(done['indexes'])}")
+        if not any(done.values()):
+            click.echo('Nothing to do')
+
+    app.cli.add_command(indexes_cli)
@@ -0,0 +1,290 @@
+"""
+Durable background jobs for post-commit work, backed by the `jobs` table.
+A job is enqueued on the caller's session, so it exists only if the write
+that needs it commits; workers claim it with a lease and retry with backoff,
+giving at-least-once execution without an external broker.
+"""
+import json
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, update, delete, func, or_, and_, make_url
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Job
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+_tasks = {}
+_WAKE_KEY = '_jobs_enqueued'
+
+def task(name):
+    """
+    Register a job handler. It receives the payload dict inside an app
+    context and must not commit: the runner commits its writes with the job.
+    """
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+def enqueue(name, payload=None, delay=0, max_attempts=None, session=None):
+    """
+    Add a job to the current transaction. It becomes visible to workers
+    when the caller commits and disappears if the caller rolls back.
+    """
+    if name not in _tasks:
+        raise KeyError(f'Unknown job: {name}')
+    session = session or db.session
+    job = Job(name=name, payload=json.dumps(payload or {}),
+              run_at=datetime.utcnow() + timedelta(seconds=delay),
+              max_attempts=max_attempts or current_app.config.get('JOB_MAX_ATTEMPTS', 5))
+    session.add(job)
+    session.info[_WAKE_KEY] = True
+    return job
+
+def _due(now):
+    # Queued and due, or running on a lease that ran out (its worker died)
+    return or_(and_(Job.status == QUEUED, Job.run_at <= now),
+               and_(Job.status == RUNNING, Job.locked_until < now))
+
+def claim(worker_id, lease_seconds=300):
+    """
+    Atomically take the next due job, or return None. The conditional
+    UPDATE makes two workers racing for the same row agree on one winner.
+    """
+    while True:
+        now = datetime.utcnow()
+        job_id = db.session.scalar(select(Job.id).where(_due(now)).order_by(Job.run_at, Job.id).limit(1))
+        if job_id is None:
+            db.session.rollback()
+            return None
+        result = db.session.execute(
+            update(Job).where(Job.id == job_id, _due(now)).values(
+                status=RUNNING, locked_by=worker_id, locked_until=now + timedelta(seconds=lease_seconds),
+                attempts=Job.attempts + 1, started_at=now)
+        )
+        db.session.commit()
+        if result.rowcount == 1:
+            return db.session.get(Job, job_id)
+
+def backoff_seconds(attempts, base=2, cap=600):
+    """Exponential backoff with jitter: roughly base * 2^(attempts - 1), capped"""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+def execute(job):
+    """
+    Run a claimed job. On success the handler's writes and the job's `done`
+    mark commit together; on failure they roll back and the job is retried
+    later, or marked failed after its last attempt.
+    """
+    handler = _tasks.get(job.name)
+    job_id, attempts, max_attempts = job.id, job.attempts, job.max_attempts
+    try:
+        if handler is None:
+            raise KeyError(f'No handler registered for job {job.name!r}')
+        handler(json.loads(job.payload or '{}'))
+        job.status = DONE
+        job.finished_at = datetime.utcnow()
+        job.last_error = None
+        db.session.commit()
+        _metrics().record(job)
+        return True
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc(limit=5)
+        config = current_app.config
+        values = {'last_error': error[-4000:], 'locked_by': None, 'locked_until': None}
+        if attempts >= max_attempts:
+            values.update(status=FAILED, finished_at=datetime.utcnow())
+        else:
+            delay = backoff_seconds(attempts, config.get('JOB_BACKOFF_BASE', 2), config.get('JOB_BACKOFF_MAX', 600))
+            values.update(status=QUEUED, run_at=datetime.utcnow() + timedelta(seconds=delay))
+        db.session.execute(update(Job).where(Job.id == job_id).values(**values))
+        db.session.commit()
+        current_app.logger.warning(f"Job {job_id} failed (attempt {attempts}/{max_attempts}): {error.splitlines()[-1]}")
+        return False
+
+def run_pending(worker_id='inline', limit=None):
+    """Run due jobs in this thread until none are left; returns how many ran"""
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker_id, current_app.config.get('JOB_LEASE_SECONDS', 300))
+        if job is None:
+            break
+        execute(job)
+        count += 1
+    return count
+
+class JobMetrics:
+    """Rolling queue-wait and run-time samples of jobs finished in this process"""
+    def __init__(self, max_samples=1000):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.completed = 0
+
+    def record(self, job):
+        wait = (job.started_at - job.created_at).total_seconds()
+        run = (job.finished_at - job.started_at).total_seconds()
+        with self._lock:
+            self._samples.append((wait, run))
+            self.completed += 1
+
+    def summary(self):
+        with self._lock:
+            samples = list(self._samples)
+        summary = {'completed': self.completed}
+        for index, name in ((0, 'wait'), (1, 'run')):
+            values = sorted(sample[index] for sample in samples)
+            if values:
+                summary[f'{name}_p50_ms'] = round(values[len(values) // 2] * 1000, 1)
+                summary[f'{name}_p95_ms'] = round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1)
+        return summary
+
+def _metrics():
+    return current_app.extensions['jobs']['metrics']
+
+def queue_stats():
+    """Queue depth per status, age of the oldest due job and this process's latencies"""
+    now = datetime.utcnow()
+    depth = dict(db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+    oldest = db.session.scalar(select(func.min(Job.run_at)).where(Job.status == QUEUED, Job.run_at <= now))
+    return {
+        'depth': {status: depth.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)},
+        'oldest_due_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        'latency': _metrics().summary()
+    }
+
+def purge(older_than_hours=24):
+    """Delete finished jobs (done or failed) older than the retention window"""
+    cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
+    result = db.session.execute(delete(Job).where(Job.status.in_((DONE, FAILED)), Job.finished_at < cutoff))
+    db.session.commit()
+    return result.rowcount
+
+class WorkerPool:
+    """
+    Worker threads, each with its own app context and session. They sleep
+    until woken by a commit that enqueued jobs, or until the poll interval
+    passes (jobs enqueued by other processes, retries coming due).
+    """
+    def __init__(self, app, size=2, poll_interval=1.0):
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self.pid = os.getpid()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        prefix = f'{socket.gethostname()}:{self.pid}'
+        for i in range(self.size):
+            thread = threading.Thread(target=self._run, args=(f'{prefix}:{i}',), name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    ran = run_pending(worker_id)
+            except Exception as e:
+                # Database hiccup: keep the worker alive and retry after the poll interval
+                self.app.logger.error(f"Job worker {worker_id} error: {e}")
+                ran = 0
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+def _pool_for(app):
+    """In-process pool, started lazily so pre-fork servers start one per worker process"""
+    state = app.extensions['jobs']
+    size = app.config.get('JOB_WORKERS', 0)
+    if size <= 0:
+        return None
+    with state['lock']:
+        pool = state.get('pool')
+        if pool is None or pool.pid != os.getpid():
+            pool = state['pool'] = WorkerPool(app, size, app.config.get('JOB_POLL_INTERVAL', 1.0)).start()
+    return pool
+
+def _warn_without_workers(app):
+    state = app.extensions['jobs']
+    if not state.get('warned'):
+        state['warned'] = True
+        app.logger.warning("Jobs were enqueued but JOB_WORKERS=0: they only run while "
+                           "`flask --app app jobs worker` does (completed tasks stay Approved until then)")
+
+def _after_commit(session):
+    if session.info.pop(_WAKE_KEY, False) and has_app_context():
+        app = current_app._get_current_object()
+        pool = _pool_for(app)
+        if pool is not None:
+            pool.wake()
+        else:
+            _warn_without_workers(app)
+
+def _after_rollback(session):
+    session.info.pop(_WAKE_KEY, None)
+
+def init_app(app):
+    """Install the commit hook and register `flask jobs worker|stats|purge`"""
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if app.config.get('JOB_WORKERS', 0) > 0 and url.get_backend_name() == 'sqlite' \
+            and url.database in (None, '', ':memory:'):
+        # Worker threads would share the requests' single in-memory connection
+        raise RuntimeError('JOB_WORKERS must be 0 with an in-memory SQLite database; '
+                           'run jobs with jobs.run_pending() instead')
+    app.extensions['jobs'] = {'metrics': JobMetrics(), 'lock': threading.Lock()}
+    if not event.contains(Session, 'after_commit', _after_commit):
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+
+    jobs_cli = click.Group('jobs', help='Background job queue')
+
+    @jobs_cli.command('worker')
+    @click.option('--concurrency', default=2, help='Worker threads')
+    @click.option('--poll-interval', default=1.0, help='Seconds between polls when idle')
+    def worker_command(concurrency, poll_interval):
+        """Run job workers in the foreground until interrupted"""
+        pool = WorkerPool(app, concurrency, poll_interval).start()
+        click.echo(f"Running {concurrency} job workers (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pool.stop()
+
+    @jobs_cli.command('stats')
+    def stats_command():
+        """Print queue depth and latency"""
+        click.echo(json.dumps(queue_stats(), indent=2))
+
+    @jobs_cli.command('purge')
+    @click.option('--older-than-hours', default=24, help='Retention for finished jobs')
+    def purge_command(older_than_hours):
+        """Delete finished jobs older than the retention window"""
+        click.echo(f"Purged {purge(older_than_hours)} finished jobs")
+
+    app.cli.add_command(jobs_cli)
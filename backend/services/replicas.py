@@ -0,0 +1,54 @@
+"""
+Read/write splitting across a primary and an optional read replica.
+GET and HEAD views send their SELECTs to the `replica` bind; writes, flushes and
+everything outside a request go to the primary. After a user writes, their
+reads stay on the primary for a while so they see their own changes.
+"""
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+
+_STICKY_KEY = '_primary_until'
+
+class RoutingSession(Session):
+    """Session that routes reads to the replica while the current request allows it"""
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        reading = not self._flushing and getattr(clause, 'is_select', False)
+        if has_request_context():
+            if reading and g.get('_use_replica'):
+                engine = self._db.engines.get(REPLICA_BIND)
+                if engine is not None:
+                    return engine
+            elif self._flushing or (clause is not None and not reading):
+                # Once a request writes, its remaining reads must see that write
+                g._use_replica = False
+                g._db_wrote = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def replica_configured(app):
+    return REPLICA_BIND in (app.config.get('SQLALCHEMY_BINDS') or {})
+
+def reading_from_replica():
+    """Whether reads in the current request are being served by the replica"""
+    return has_request_context() and bool(g.get('_use_replica'))
+
+def _route_reads():
+    g._use_replica = request.method in READ_METHODS and session.get(_STICKY_KEY, 0) <= time.time()
+
+def _stick_after_write(response):
+    if g.pop('_db_wrote', False) and response.status_code < 400:
+        session[_STICKY_KEY] = time.time() + current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+    return response
+
+def init_app(app):
+    """Route GET reads to the replica bind when SQLALCHEMY_BINDS has one"""
+    if not replica_configured(app):
+        return
+    app.before_request(_route_reads)
+    app.after_request(_stick_after_write)
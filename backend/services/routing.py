@@ -0,0 +1,185 @@
+"""
+Multi-stop delivery routes for volunteers.
+Approved, unassigned requests are grouped into stops by event location; a
+route is built nearest-neighbour under the volunteer's carrying capacity and
+its stop order refined with 2-opt, both vectorized with NumPy. A route is
+claimed as one batch: every request in it or none.
+"""
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select, update, case, exists, func
+
+from extensions import db
+from models import Event, Request, VolunteerAssignment
+
+EARTH_RADIUS_KM = 6371.0
+URGENCY_RANK = {'Critical': 0, 'High': 1, 'Medium': 2, 'Low': 3}
+
+class RouteConflict(Exception):
+    """Some requests of a route were claimed or changed since it was planned"""
+
+def distance_matrix(lat, lon):
+    """Pairwise great-circle distances in km between points given in degrees"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def route_length(order, dist):
+    return float(dist[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+def two_opt(order, dist, max_rounds=1000):
+    """
+    Improve an open path that starts at order[0] by reversing segments.
+    Every round scores all segment reversals at once, then applies the best
+    improving ones that touch disjoint parts of the path (their gains add up).
+    """
+    order = np.array(order)
+    n = len(order)
+    if n < 4:
+        return order
+    # A free end is modelled as a closing edge to a dummy node at distance 0
+    padded = np.zeros((dist.shape[0] + 1, dist.shape[1] + 1))
+    padded[:-1, :-1] = dist
+    dummy = dist.shape[0]
+    i, j = np.triu_indices(n, k=1)  # reverse order[i + 1 .. j]; j = n - 1 flips the tail
+    for _ in range(max_rounds):
+        path = np.append(order, dummy)
+        a, b = path[i], path[i + 1]
+        c, e = path[j], path[j + 1]
+        delta = padded[a, c] + padded[b, e] - padded[a, b] - padded[c, e]
+        improving = np.flatnonzero(delta < -1e-9)
+        if len(improving) == 0:
+            break
+        used = np.zeros(n + 1, dtype=bool)
+        for k in improving[np.argsort(delta[improving])][:n]:
+            lo, hi = i[k], j[k] + 1
+            if used[lo:hi + 1].any():
+                continue
+            used[lo:hi + 1] = True
+            order[lo + 1:hi] = order[lo + 1:hi][::-1].copy()
+    return order
+
+def _candidates(event_id=None):
+    """Approved requests with no assignment, most urgent first, with their event location"""
+    urgency = case(URGENCY_RANK, value=Request.urgency, else_=len(URGENCY_RANK))
+    # Requests approved before approved_quantity existed were approved in full
+    quantity = func.coalesce(Request.approved_quantity, Request.quantity).label('quantity')
+    query = select(Request.id, Request.event_id, quantity, Event.latitude, Event.longitude) \
+        .join(Event, Event.id == Request.event_id) \
+        .where(Request.status == 'Approved',
+               ~exists().where(VolunteerAssignment.request_id == Request.id)) \
+        .order_by(urgency, Request.created_at, Request.id)
+    if event_id is not None:
+        query = query.where(Request.event_id == event_id)
+    return db.session.execute(query).all()
+
+def build_route(origin, stops, capacity, max_stops, improve=True):
+    """
+    Pick and order stops for one trip.
+
+    `stops` is a list of dicts with lat, lon and `requests` as (id, quantity)
+    pairs, most urgent first. Starting from `origin` (lat, lon), or from the
+    first stop if there is none, repeatedly go to the nearest stop with a
+    request that still fits, loading what fits there, then shorten the
+    visiting order with 2-opt unless `improve` is false. Returns the chosen
+    stops in visiting order, each with the request ids loaded.
+    """
+    if not stops or capacity <= 0:
+        return []
+    if origin is None:
+        origin = (stops[0]['lat'], stops[0]['lon'])
+    # The origin is the last point; it has nothing to load
+    start = len(stops)
+    dist = distance_matrix(np.array([s['lat'] for s in stops] + [origin[0]], dtype=np.float64),
+                           np.array([s['lon'] for s in stops] + [origin[1]], dtype=np.float64))
+    smallest = np.array([min(q for _, q in s['requests']) for s in stops] + [np.inf], dtype=np.float64)
+
+    remaining = float(capacity)
+    visited = np.zeros(len(stops) + 1, dtype=bool)
+    visited[start] = True
+    path, loads = [start], {}
+    while len(loads) < max_stops:
+        # Stops whose smallest request no longer fits drop out on their own
+        reachable = ~visited & (smallest <= remaining)
+        if not reachable.any():
+            break
+        current = int(np.argmin(np.where(reachable, dist[path[-1]], np.inf)))
+        visited[current] = True
+        path.append(current)
+        loads[current] = _load(stops[current], remaining)
+        remaining -= sum(q for _, q in loads[current])
+
+    if improve:
+        path = two_opt(path, dist)
+    return [{
+        'event_id': stops[index]['event_id'],
+        'latitude': stops[index]['lat'],
+        'longitude': stops[index]['lon'],
+        'request_ids': [request_id for request_id, _ in loads[index]],
+        'quantity': sum(q for _, q in loads[index]),
+        'leg_km': round(float(dist[previous, index]), 2),
+    } for previous, index in zip(path[:-1], path[1:])]
+
+def _load(stop, remaining):
+    """Requests of a stop that fit, most urgent first"""
+    loaded = []
+    for request_id, quantity in stop['requests']:
+        if quantity <= remaining:
+            loaded.append((request_id, quantity))
+            remaining -= quantity
+    return loaded
+
+def plan_route(origin=None, capacity=200, max_stops=10, event_id=None):
+    """Plan a route over the currently open requests; returns stops, distance and timing"""
+    started = time.perf_counter()
+    stops = {}
+    for row in _candidates(event_id):
+        stop = stops.get(row.event_id)
+        if stop is None:
+            stop = stops[row.event_id] = {'event_id': row.event_id, 'lat': row.latitude,
+                                          'lon': row.longitude, 'requests': []}
+        stop['requests'].append((row.id, row.quantity))
+    route = build_route(origin, list(stops.values()), capacity, max_stops)
+    return {
+        'stops': route,
+        'total_km': round(sum(stop['leg_km'] for stop in route), 2),
+        'quantity': sum(stop['quantity'] for stop in route),
+        'candidate_stops': len(stops),
+        'planning_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+
+def claim_route(user_id, request_ids):
+    """
+    Assign every request to the volunteer in one transaction, in route order.
+    Raises RouteConflict, writing nothing, if any of them is no longer
+    approved or already has a volunteer.
+    """
+    request_ids = list(dict.fromkeys(request_ids))
+    if not request_ids:
+        raise RouteConflict('Route has no requests')
+    # Claim the requests with one conditional write before assigning them:
+    # SQLite ignores FOR UPDATE, but a concurrent claim waits for this write's
+    # transaction and then finds the requests assigned, so it claims none
+    is_open = (Request.id.in_(request_ids), Request.status == 'Approved',
+               ~exists().where(VolunteerAssignment.request_id == Request.id))
+    claimed = db.session.execute(
+        update(Request).where(*is_open).values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if claimed != len(request_ids):
+        db.session.rollback()
+        open_ids = set(db.session.scalars(select(Request.id).where(*is_open)))
+        taken = [request_id for request_id in request_ids if request_id not in open_ids]
+        raise RouteConflict(f'Requests no longer available: {taken}')
+    total = len(request_ids)
+    db.session.add_all([
+        VolunteerAssignment(user_id=user_id, request_id=request_id, status='In Progress',
+                            notes=f'Route delivery {position} of {total}')
+        for position, request_id in enumerate(request_ids, start=1)
+    ])
+    db.session.commit()
+    return total
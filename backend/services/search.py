@@ -0,0 +1,238 @@
+"""
+Full-text search over events, resources, donation notes and admin comments.
+Each flush that changes searchable text rewrites the entity's SearchDocument on
+the same connection; SQLite indexes it with FTS5, MySQL with a FULLTEXT index.
+Ranked pages are cached per process on the index version, as dashboard
+fragments are (see fragment_cache.py).
+"""
+import re
+
+import click
+from flask import current_app
+from sqlalchemy import event, select, insert, update, delete, text, literal, literal_column, func, table, column, inspect
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Event, Resource, Donation, Request, AdminResponse, SearchDocument
+from services import versions, replicas
+from services.fragment_cache import FragmentCache
+
+ENTITY_TYPES = ('event', 'resource', 'donation', 'admin_response')
+PUBLIC_TYPES = ('event', 'resource')
+MAX_TERMS = 8
+MIN_PREFIX = 3            # shorter last terms match whole words only
+SNIPPET_WORDS = 12
+
+# The SQLite FTS5 table created alongside search_documents (see models.py)
+search_fts = table('search_fts', column('rowid'))
+
+# Attributes whose changes require re-indexing; quantity updates are skipped
+TEXT_FIELDS = {
+    Event: ('name', 'description'),
+    Resource: ('name', 'category', 'description'),
+    Donation: ('notes', 'event_id', 'resource_id'),
+    AdminResponse: ('comment', 'action'),
+}
+ENTITY_TYPE = {Event: 'event', Resource: 'resource', Donation: 'donation', AdminResponse: 'admin_response'}
+
+def _document(conn, obj):
+    """Searchable fields of one entity, or None if it has no text worth indexing"""
+    if isinstance(obj, Event):
+        return {'event_id': obj.id, 'title': obj.name or '', 'body': obj.description or ''}
+    if isinstance(obj, Resource):
+        return {'event_id': None, 'title': obj.name or '',
+                'body': ' '.join(filter(None, [obj.category, obj.description]))}
+    if isinstance(obj, Donation):
+        if not obj.notes:
+            return None
+        name = conn.scalar(select(Resource.name).where(Resource.id == obj.resource_id))
+        return {'event_id': obj.event_id, 'title': name or '', 'body': obj.notes}
+    if isinstance(obj, AdminResponse):
+        if not obj.comment:
+            return None
+        event_id = conn.scalar(select(Request.event_id).where(Request.id == obj.request_id))
+        return {'event_id': event_id, 'title': obj.action or '', 'body': obj.comment}
+
+def _text_changed(obj):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in TEXT_FIELDS[type(obj)])
+
+def _write(conn, entity_type, entity_id, document):
+    documents = SearchDocument.__table__
+    match = (documents.c.entity_type == entity_type) & (documents.c.entity_id == entity_id)
+    if document is None:
+        conn.execute(delete(documents).where(match))
+        return
+    # Update in place so the FTS rowid is stable; insert if it was never indexed
+    if conn.execute(update(documents).where(match).values(**document)).rowcount == 0:
+        conn.execute(insert(documents).values(entity_type=entity_type, entity_id=entity_id, **document))
+
+def _after_flush(session, flush_context):
+    changed = [obj for obj in session.new if type(obj) in TEXT_FIELDS]
+    changed += [obj for obj in session.dirty if type(obj) in TEXT_FIELDS and _text_changed(obj)]
+    deleted = [obj for obj in session.deleted if type(obj) in TEXT_FIELDS]
+    if not changed and not deleted:
+        return
+    conn = session.connection()
+    versions.mark_changed(session, SearchDocument.__tablename__)
+    for obj in changed:
+        _write(conn, ENTITY_TYPE[type(obj)], obj.id, _document(conn, obj))
+    for obj in deleted:
+        _write(conn, ENTITY_TYPE[type(obj)], obj.id, None)
+
+def index_rows(session, model, where):
+    """Re-index rows written by bulk SQL or stored procedures"""
+    remove_rows(session, model, where)
+    versions.mark_changed(session, SearchDocument.__tablename__)
+    session.execute(insert(SearchDocument).from_select(
+        ['entity_type', 'entity_id', 'event_id', 'title', 'body'], _sources()[model].where(where)))
+
+def remove_rows(session, model, where):
+    """Drop the documents of rows about to be bulk deleted (e.g. archived)"""
+    ids = select(model.id).where(where)
+    versions.mark_changed(session, SearchDocument.__tablename__)
+    session.execute(delete(SearchDocument).where(SearchDocument.entity_type == ENTITY_TYPE[model],
+                                                 SearchDocument.entity_id.in_(ids)))
+
+def _terms(q):
+    return re.findall(r'\w+', (q or '').lower())[:MAX_TERMS]
+
+def _tag(entity_type=None, event_id=None):
+    # Mirrors the `tags` column of search_fts (see models.py)
+    if entity_type is not None:
+        return 'type' + entity_type.replace('_', '')
+    return f'event{event_id}'
+
+def fts5_query(terms, entity_types=None, event_id=None):
+    """
+    All terms required in title or body, the last one as a prefix
+    (search-as-you-type); filters become required tags
+    """
+    quoted = [f'"{term}"' for term in terms]
+    if len(terms[-1]) >= MIN_PREFIX:
+        quoted[-1] += '*'
+    query = '{title body}: (' + ' '.join(quoted) + ')'
+    if entity_types:
+        query += ' AND tags: (' + ' OR '.join(_tag(entity_type=t) for t in entity_types) + ')'
+    if event_id is not None:
+        query += f' AND tags: {_tag(event_id=event_id)}'
+    return query
+
+def snippet(body, terms, size=SNIPPET_WORDS):
+    """
+    Up to `size` words of body starting just before the first word that
+    begins with a query term (FTS5's snippet() would rescan every match)
+    """
+    words = list(re.finditer(r'\w+', body or ''))
+    if not words:
+        return ''
+    hit = next((i for i, word in enumerate(words) if word.group().lower().startswith(tuple(terms))), 0)
+    start = max(0, min(hit - 2, len(words) - size))
+    end = min(len(words), start + size)
+    return ('…' if start else '') + body[words[start].start():words[end - 1].end()] + ('…' if end < len(words) else '')
+
+def boolean_query(terms):
+    """MySQL boolean-mode equivalent of fts5_query's terms"""
+    last = f' +{terms[-1]}*' if len(terms[-1]) >= MIN_PREFIX else f' +{terms[-1]}'
+    return ' '.join(f'+{term}' for term in terms[:-1]) + last
+
+def search(q, entity_types=None, event_id=None, limit=20, offset=0):
+    """
+    Ranked matches as dicts. Titles weigh more than bodies; restrict to
+    entity_types and/or documents tied to event_id.
+    """
+    terms = _terms(q)
+    if not terms:
+        return []
+    if entity_types and set(ENTITY_TYPES) <= set(entity_types):
+        entity_types = None  # every type: not a filter
+    
+    cache = current_app.extensions.get('search_cache')
+    key = (tuple(terms), tuple(sorted(entity_types or ())), event_id, limit, offset,
+           versions.table_version(SearchDocument.__tablename__))
+    results = cache.get(key) if cache is not None else None
+    if results is None:
+        results = _ranked(terms, entity_types, event_id, limit, offset)
+        # A lagging replica may not have the write that produced this version yet
+        lag = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+        if cache is not None and not (replicas.reading_from_replica()
+                                      and versions.seconds_since_change(SearchDocument.__tablename__) < lag):
+            cache.put(key, results)
+    return list(results)
+
+def _ranked(terms, entity_types, event_id, limit, offset):
+    dialect = db.session.get_bind(clause=select(SearchDocument)).dialect.name
+    doc = SearchDocument.__table__
+
+    if dialect == 'sqlite':
+        # Rank and page inside FTS5 so only the requested page is joined to
+        # the documents; every match is scored, however old
+        page = select(search_fts.c.rowid, literal_column('bm25(search_fts, 5.0, 1.0, 0.0)').label('score')) \
+            .where(text('search_fts MATCH :match').bindparams(match=fts5_query(terms, entity_types, event_id))) \
+            .order_by(text('score')).limit(limit).offset(offset).subquery('page')
+        query = select(doc.c.entity_type, doc.c.entity_id, doc.c.event_id, doc.c.title, doc.c.body, page.c.score) \
+            .join_from(page, doc, doc.c.id == page.c.rowid) \
+            .order_by(page.c.score)
+    else:
+        filters = []
+        if entity_types:
+            filters.append(doc.c.entity_type.in_(entity_types))
+        if event_id is not None:
+            filters.append(doc.c.event_id == event_id)
+        relevance = text('MATCH (search_documents.title, search_documents.body) AGAINST (:match IN BOOLEAN MODE)') \
+            .bindparams(match=boolean_query(terms))
+        query = select(doc.c.entity_type, doc.c.entity_id, doc.c.event_id, doc.c.title, doc.c.body,
+                       relevance.label('score')) \
+            .where(relevance, *filters).order_by(text('score DESC')).limit(limit).offset(offset)
+
+    rows = db.session.execute(query).all()
+    return [{
+        'type': row.entity_type,
+        'id': row.entity_id,
+        'event_id': row.event_id,
+        'title': row.title,
+        'snippet': snippet(row.body, terms),
+        'score': round(abs(float(row.score)), 4)
+    } for row in rows]
+
+def _sources():
+    """Per model, a SELECT producing its documents (type, id, event, title, body)"""
+    return {
+        Event: select(literal('event'), Event.id, Event.id, Event.name, func.coalesce(Event.description, '')),
+        Resource: select(literal('resource'), Resource.id, literal(None, db.Integer), Resource.name,
+                         func.coalesce(Resource.category, '') + ' ' + func.coalesce(Resource.description, '')),
+        Donation: select(literal('donation'), Donation.id, Donation.event_id, Resource.name, Donation.notes)
+            .join(Resource, Resource.id == Donation.resource_id).where(Donation.notes != ''),
+        AdminResponse: select(literal('admin_response'), AdminResponse.id, Request.event_id, AdminResponse.action,
+                              AdminResponse.comment)
+            .join(Request, Request.id == AdminResponse.request_id).where(AdminResponse.comment != ''),
+    }
+
+def reindex():
+    """Rebuild every document from the source tables; returns the number indexed"""
+    db.session.execute(delete(SearchDocument))
+    versions.mark_changed(db.session, SearchDocument.__tablename__)
+    for source in _sources().values():
+        db.session.execute(insert(SearchDocument).from_select(
+            ['entity_type', 'entity_id', 'event_id', 'title', 'body'], source))
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(SearchDocument))
+
+def init_app(app):
+    """
+    Install the flush listener once per process, attach the result cache and
+    register `flask search-reindex`
+    """
+    versions.init_app(app)
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+    if app.config.get('SEARCH_CACHE_ENABLED', True):
+        app.extensions['search_cache'] = FragmentCache(
+            max_entries=app.config.get('SEARCH_CACHE_MAX_ENTRIES', 512),
+            ttl=app.config.get('SEARCH_CACHE_TTL', 30)
+        )
+
+    @app.cli.command('search-reindex')
+    def reindex_command():
+        """Rebuild the search index from events, resources, donations and responses"""
+        click.echo(f"Indexed {reindex()} documents")
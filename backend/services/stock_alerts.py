@@ -0,0 +1,174 @@
+"""
+Incremental low-stock detection.
+Every flush that changes a resource's quantities re-evaluates just that row
+against the thresholds in sql/views.sql; crossings into or out of Low / Out of
+Stock are written as StockAlert rows and published to a feed after commit.
+"""
+import threading
+from collections import deque
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Resource, Request, StockAlert
+
+# Same thresholds as resource_availability_view
+LOW_STOCK_RATIO = 0.1
+MEDIUM_STOCK_RATIO = 0.3
+ALERT_LEVELS = ('Out of Stock', 'Low Stock')
+
+_PENDING_KEY = '_stock_alerts'
+
+def stock_status(available, total):
+    """Stock level for one resource, as in resource_availability_view"""
+    available = available or 0
+    total = total or 0
+    if available <= 0:
+        return 'Out of Stock'
+    if available < total * LOW_STOCK_RATIO:
+        return 'Low Stock'
+    if available < total * MEDIUM_STOCK_RATIO:
+        return 'Medium Stock'
+    return 'Good Stock'
+
+def _alert_for(resource_id, before, after):
+    """StockAlert for a (available, total) change, or None if no alert edge was crossed"""
+    previous, status = stock_status(*before), stock_status(*after)
+    if previous == status or (previous not in ALERT_LEVELS and status not in ALERT_LEVELS):
+        return None
+    return StockAlert(resource_id=resource_id, previous_status=previous, status=status,
+                      available_quantity=after[0] or 0, total_quantity=after[1] or 0)
+
+def _quantity_change(session, resource):
+    """((available, total) before, after) for a dirty resource, or None if unchanged"""
+    state = inspect(resource)
+    histories = [state.attrs[name].history for name in ('available_quantity', 'total_quantity')]
+    if not any(history.has_changes() for history in histories):
+        return None
+    after = (resource.available_quantity, resource.total_quantity)
+    if all(history.deleted or not history.has_changes() for history in histories):
+        before = tuple(history.deleted[0] if history.deleted else value
+                       for history, value in zip(histories, after))
+    else:
+        # Assigned without being loaded first: the database still has the old row
+        with session.no_autoflush:
+            before = tuple(session.execute(
+                select(Resource.available_quantity, Resource.total_quantity).where(Resource.id == resource.id)
+            ).one())
+    return (before, after) if before != after else None
+
+def _before_flush(session, flush_context, instances):
+    for obj in list(session.dirty):
+        if not isinstance(obj, Resource):
+            continue
+        change = _quantity_change(session, obj)
+        if change is None:
+            continue
+        alert = _alert_for(obj.id, *change)
+        if alert is not None:
+            session.add(alert)
+
+def _after_flush(session, flush_context):
+    # Serialize now: ids are assigned, and attributes expire on commit
+    alerts = [serialize(obj) for obj in session.new if isinstance(obj, StockAlert)]
+    if alerts:
+        session.info.setdefault(_PENDING_KEY, []).extend(alerts)
+
+def _after_commit(session):
+    alerts = session.info.pop(_PENDING_KEY, None)
+    if alerts and has_app_context():
+        feed = current_app.extensions.get('stock_alerts')
+        if feed is not None:
+            feed.publish(alerts)
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def request_stock(request_id):
+    """(resource_id, available, total) behind a request, for writes done outside the ORM"""
+    return db.session.execute(
+        select(Resource.id, Resource.available_quantity, Resource.total_quantity)
+        .join(Request, Request.resource_id == Resource.id)
+        .where(Request.id == request_id)
+    ).first()
+
+def check_changes(session, changes):
+    """
+    Queue alerts for (resource_id, before, after) level changes made by bulk
+    SQL, when the caller already knows both sides
+    """
+    alerts = [alert for alert in (_alert_for(*change) for change in changes) if alert is not None]
+    session.add_all(alerts)
+    return alerts
+
+def check_resource(session, resource_id, before):
+    """
+    Compare one resource against its levels from before a raw SQL or
+    stored-procedure write, queuing an alert on the session if needed.
+    """
+    after = session.execute(
+        select(Resource.available_quantity, Resource.total_quantity).where(Resource.id == resource_id)
+    ).first()
+    if after is None:
+        return None
+    alert = _alert_for(resource_id, before, tuple(after))
+    if alert is not None:
+        session.add(alert)
+    return alert
+
+def serialize(alert):
+    return {
+        'id': alert.id,
+        'resource_id': alert.resource_id,
+        'previous_status': alert.previous_status,
+        'status': alert.status,
+        'available_quantity': alert.available_quantity,
+        'total_quantity': alert.total_quantity,
+        'created_at': alert.created_at.isoformat() if alert.created_at else None
+    }
+
+def recent_alerts(since=0, limit=100):
+    """Committed alerts after the given id, oldest first (primary key range scan)"""
+    alerts = StockAlert.query.filter(StockAlert.id > since).order_by(StockAlert.id).limit(limit).all()
+    return [serialize(alert) for alert in alerts]
+
+class AlertFeed:
+    """
+    In-process fan-out of committed alerts for streaming subscribers.
+    Keeps the most recent alerts so a subscriber that reconnects with its
+    last seen id only misses what fell off the buffer (it can backfill from
+    recent_alerts). Alerts committed by other worker processes only reach
+    subscribers through that backfill.
+    """
+    def __init__(self, max_entries=1000):
+        self._alerts = deque(maxlen=max_entries)
+        self._changed = threading.Condition()
+
+    def publish(self, alerts):
+        with self._changed:
+            self._alerts.extend(alerts)
+            self._changed.notify_all()
+
+    def last_id(self):
+        with self._changed:
+            return self._alerts[-1]['id'] if self._alerts else 0
+
+    def wait(self, since, timeout=None):
+        """Alerts with id > since, blocking up to timeout until there is one"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._alerts and self._alerts[-1]['id'] > since, timeout)
+            return [alert for alert in self._alerts if alert['id'] > since]
+
+def get_feed(app):
+    return app.extensions['stock_alerts']
+
+def init_app(app):
+    """Install the session listeners once per process and give the app its feed"""
+    app.extensions['stock_alerts'] = AlertFeed(app.config.get('STOCK_ALERT_FEED_SIZE', 1000))
+    if not event.contains(Session, 'before_flush', _before_flush):
+        event.listen(Session, 'before_flush', _before_flush)
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
@@ -0,0 +1,74 @@
+"""
+Per-table data versions for cache invalidation.
+Every committed ORM write bumps a process-wide version for the tables it touched,
+so caches can key on versions instead of re-reading the data.
+"""
+import itertools
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_versions = {}
+_changed_at = {}
+_counter = itertools.count(1)
+_lock = threading.Lock()
+
+_PENDING_KEY = '_dirty_tables'
+
+def table_version(*tables):
+    """Current version tuple for the given table names"""
+    return tuple(_versions.get(table, 0) for table in tables)
+
+def seconds_since_change(*tables):
+    """Time since any of the tables was last bumped in this process"""
+    last = max((_changed_at.get(table, 0) for table in tables), default=0)
+    return time.monotonic() - last
+
+def bump(*tables):
+    """Move the given tables to a new, never-reused version"""
+    now = time.monotonic()
+    with _lock:
+        for table in tables:
+            _versions[table] = next(_counter)
+            _changed_at[table] = now
+
+def mark_changed(session, *tables):
+    """
+    Record tables changed outside the ORM unit of work (raw SQL, stored
+    procedures) so they are bumped when the session commits.
+    """
+    session.info.setdefault(_PENDING_KEY, set()).update(tables)
+
+def _tables_of(objects):
+    return {obj.__table__.name for obj in objects if hasattr(obj, '__table__')}
+
+def _after_flush(session, flush_context):
+    changed = _tables_of(session.new) | _tables_of(session.deleted)
+    changed |= _tables_of(obj for obj in session.dirty if session.is_modified(obj))
+    if changed:
+        mark_changed(session, *changed)
+
+def _do_orm_execute(orm_execute_state):
+    # Bulk ORM UPDATE/DELETE statements skip the flush entirely
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            mark_changed(orm_execute_state.session, mapper.local_table.name)
+
+def _after_commit(session):
+    tables = session.info.pop(_PENDING_KEY, None)
+    if tables:
+        bump(*tables)
+
+def _after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+def init_app(app):
+    """Install the session listeners once per process"""
+    if not event.contains(Session, 'after_flush', _after_flush):
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'do_orm_execute', _do_orm_execute)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
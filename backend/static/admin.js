@@ -6,6 +6,7 @@
 // Global variables
 let currentRequestId = null;
 let currentAction = null;
+let currentActionKey = null;
 
 // Initialize when document is ready
 document.addEventListener('DOMContentLoaded', function() {
@@ -19,9 +20,19 @@ function initializeAdminEventListeners() {
     if (actionForm) {
         actionForm.addEventListener('submit', handleActionSubmit);
     }
+
+    // A different comment is a different submission
+    const actionComment = document.getElementById('actionComment');
+    if (actionComment) {
+        actionComment.addEventListener('input', () => currentActionKey = newIdempotencyKey());
+    }
 }
 
 function processRequest(requestId, action) {
+    // Re-opening the same decision keeps its key so a retry is applied once
+    if (!currentActionKey || requestId !== currentRequestId || action !== currentAction) {
+        currentActionKey = newIdempotencyKey();
+    }
     currentRequestId = requestId;
     currentAction = action;
     
@@ -73,6 +84,7 @@ async function handleActionSubmit(event) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                'Idempotency-Key': currentActionKey
             },
             body: JSON.stringify({
                 action: currentAction,
@@ -87,6 +99,7 @@ async function handleActionSubmit(event) {
             
             // Close modals
             bootstrap.Modal.getInstance(document.getElementById('actionModal')).hide();
+            currentActionKey = null;
             
             // Reload the page to reflect changes
             setTimeout(() => window.location.reload(), 1000);
@@ -208,6 +221,13 @@ function displaySystemStats(stats) {
 }
 
 // Utility functions
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+}
+
 function getUrgencyBadgeClass(urgency) {
     const classes = {
         'Critical': 'danger',
@@ -20,6 +20,28 @@ function initializeEventListeners() {
     if (requestForm) {
         requestForm.addEventListener('submit', handleRequestSubmit);
     }
+
+    // Editing a form makes it a new submission with a new idempotency key
+    [donateForm, requestForm].forEach(form => {
+        if (form) {
+            form.addEventListener('input', () => delete form.dataset.idempotencyKey);
+        }
+    });
+}
+
+function newIdempotencyKey() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+}
+
+// Same key for every retry of one submission, so the server applies it once
+function idempotencyKeyFor(form) {
+    if (!form.dataset.idempotencyKey) {
+        form.dataset.idempotencyKey = newIdempotencyKey();
+    }
+    return form.dataset.idempotencyKey;
 }
 
 async function handleDonationSubmit(event) {
@@ -38,6 +60,9 @@ async function handleDonationSubmit(event) {
         
         const response = await fetch('/user/donate', {
             method: 'POST',
+            headers: {
+                'Idempotency-Key': idempotencyKeyFor(form)
+            },
             body: formData
         });
         
@@ -48,6 +73,7 @@ async function handleDonationSubmit(event) {
             // Close modal and reset form
             bootstrap.Modal.getInstance(document.getElementById('donateModal')).hide();
             form.reset();
+            delete form.dataset.idempotencyKey;
             // Reload page to show updated donations
             setTimeout(() => window.location.reload(), 1500);
         } else {
@@ -79,6 +105,9 @@ async function handleRequestSubmit(event) {
         
         const response = await fetch('/user/requests', {
             method: 'POST',
+            headers: {
+                'Idempotency-Key': idempotencyKeyFor(form)
+            },
             body: formData
         });
         
@@ -89,6 +118,7 @@ async function handleRequestSubmit(event) {
             // Close modal and reset form
             bootstrap.Modal.getInstance(document.getElementById('requestModal')).hide();
             form.reset();
+            delete form.dataset.idempotencyKey;
             // Reload page to show updated requests
             setTimeout(() => window.location.reload(), 1500);
         } else {
@@ -132,5 +162,6 @@ function formatNumber(num) {
 // Export functions for potential use in other scripts
 window.dashboardUtils = {
     showAlert,
-    formatNumber
+    formatNumber,
+    newIdempotencyKey
 };
\ No newline at end of file
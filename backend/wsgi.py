@@ -0,0 +1,14 @@
+"""
+WSGI entry point for production servers.
+Builds and warms the app at import time so a pre-fork server started with
+--preload does it once in the master, e.g.:
+
+    AUTO_CREATE_SCHEMA=0 WARM_ON_STARTUP=1 gunicorn --preload -w 4 -b 0.0.0.0:5001 wsgi:app
+"""
+from app import create_app, setup_database, warm_app
+
+app = create_app()
+setup_database(app)
+
+if app.config.get('WARM_ON_STARTUP'):
+    warm_app(app)
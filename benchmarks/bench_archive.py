@@ -0,0 +1,98 @@
+"""
+Archival benchmark: hot-path query time as closed history grows, with the
+history left in the hot tables vs moved to the archive tables.
+
+Usage: python benchmarks/bench_archive.py [--sizes 10000 50000 200000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from app import create_app
+from extensions import db
+from models import User, Event, Resource, Request
+from services import archive
+
+ACTIVE_EVENTS = 200
+PENDING_REQUESTS = 2000
+REQUESTS_PER_CLOSED_EVENT = 4
+
+HOT_QUERIES = {
+    'pending requests': lambda: Request.query.filter_by(status='Pending').order_by(Request.created_at.desc()).all(),
+    'active events': lambda: Event.query.filter_by(status='Active').all(),
+    'approved queue': lambda: Request.query.filter_by(status='Approved').all(),
+}
+
+def seed(closed_events):
+    now = datetime.utcnow()
+    db.session.add(User(id=1, name='Bench', email='bench@x.org', phone='0', password_hash='x'))
+    db.session.add(Resource(id=1, name='Water', category='Food', total_quantity=10**6, available_quantity=10**6))
+    db.session.commit()
+    
+    events = [{'name': f'Active {i}', 'latitude': 0.0, 'longitude': 0.0, 'status': 'Active', 'created_at': now}
+              for i in range(ACTIVE_EVENTS)]
+    events += [{'name': f'Closed {i}', 'latitude': 0.0, 'longitude': 0.0, 'status': 'Resolved', 'created_at': now}
+               for i in range(closed_events)]
+    db.session.execute(db.insert(Event), events)
+    
+    requests = [{'user_id': 1, 'resource_id': 1, 'event_id': 1 + i % ACTIVE_EVENTS, 'quantity': 1,
+                 'status': 'Pending', 'created_at': now, 'updated_at': now} for i in range(PENDING_REQUESTS)]
+    requests += [{'user_id': 1, 'resource_id': 1, 'event_id': ACTIVE_EVENTS + 1 + i // REQUESTS_PER_CLOSED_EVENT,
+                  'quantity': 1, 'status': 'Fulfilled', 'created_at': now, 'updated_at': now}
+                 for i in range(closed_events * REQUESTS_PER_CLOSED_EVENT)]
+    db.session.execute(db.insert(Request), requests)
+    db.session.commit()
+
+def time_queries(runs):
+    timings = {}
+    for name, query in HOT_QUERIES.items():
+        samples = []
+        for _ in range(runs):
+            db.session.expunge_all()
+            start = time.perf_counter()
+            query()
+            samples.append((time.perf_counter() - start) * 1000)
+        timings[name] = statistics.median(samples)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000],
+                        help='Closed events of history (each with %d requests)' % REQUESTS_PER_CLOSED_EVENT)
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    
+    print(f"{ACTIVE_EVENTS} active events, {PENDING_REQUESTS} pending requests; median ms per query")
+    print(f"{'closed events':>14s}  {'query':18s} {'history hot':>12s} {'archived':>10s}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            class BenchConfig:
+                SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmp, 'archive.db')
+                SQLALCHEMY_TRACK_MODIFICATIONS = False
+                SECRET_KEY = 'bench-key'
+            
+            app = create_app(BenchConfig)
+            with app.app_context():
+                db.create_all()
+                seed(size)
+                before = time_queries(args.runs)
+                
+                start = time.perf_counter()
+                moved = archive.archive_closed_events(batch_size=args.batch_size)
+                elapsed = time.perf_counter() - start
+                after = time_queries(args.runs)
+                
+                for name in HOT_QUERIES:
+                    print(f"{size:14d}  {name:18s} {before[name]:12.2f} {after[name]:10.2f}")
+                rows = sum(moved.values())
+                print(f"{'':14s}  archived {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Audit log benchmark: cost per audited transition when entries are written
+synchronously at every commit vs buffered and written in batches.
+
+Usage: python benchmarks/bench_audit.py [--transitions 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from app import create_app
+from extensions import db
+from models import User, Event, Resource, Request, AuditLog
+from services import audit
+
+class BenchConfig:
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = 'bench-key'
+    ADMISSION_CONTROL_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = False
+
+# (label, batch size, flush interval): batch size 1 is one INSERT per commit
+MODES = [
+    ('synchronous INSERT per commit', 1, 0),
+    ('buffered, batches of 500', 500, 0),
+    ('buffered, background flusher', 500, 1.0),
+]
+
+def seed(n_requests):
+    db.session.add(User(name='User', email='user@bench.org', phone='0', password_hash='x'))
+    db.session.add(Event(name='Event', latitude=0, longitude=0))
+    db.session.add(Resource(name='Water', category='Food', total_quantity=10 ** 9, available_quantity=10 ** 9))
+    db.session.commit()
+    db.session.execute(db.insert(Request), [
+        {'user_id': 1, 'resource_id': 1, 'event_id': 1, 'quantity': 1, 'status': 'Pending'}
+        for _ in range(n_requests)])
+    db.session.commit()
+
+def run(batch_size, flush_interval, n):
+    # File database: the background flusher writes on its own connection
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    config = type('ModeConfig', (BenchConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'AUDIT_BATCH_SIZE': batch_size,
+        'AUDIT_FLUSH_INTERVAL': flush_interval,
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        seed(n)
+        audit.flush()
+
+        # One status transition per transaction, as an admin approving one by one
+        ids = db.session.scalars(db.select(Request.id).order_by(Request.id)).all()
+        start = time.perf_counter()
+        for request_id in ids:
+            db.session.get(Request, request_id).status = 'Approved'
+            db.session.commit()
+        elapsed = time.perf_counter() - start
+        audit.flush()
+        written = AuditLog.query.filter_by(table_name='requests', action='update').count()
+        db.session.remove()
+    return elapsed / n * 10 ** 6, written
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--transitions', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{args.transitions} single-request status transitions, one commit each (SQLite file)")
+    for label, batch_size, flush_interval in MODES:
+        per_commit, written = run(batch_size, flush_interval, args.transitions)
+        print(f"{label:32s} {per_commit:8.1f} us per transition   ({written} entries written)")
+
+    # The part on the request path: staging an entry and handing it to the buffer
+    app = create_app(BenchConfig)
+    with app.app_context():
+        buffer = audit.AuditBuffer(app, batch_size=10 ** 9, max_entries=10 ** 9)
+        start = time.perf_counter()
+        for i in range(args.transitions):
+            buffer.append([audit.entry('requests', i, audit.UPDATE, {'status': 'Pending'}, {'status': 'Approved'}, 1)])
+        print(f"stage + append one entry:        "
+              f"{(time.perf_counter() - start) / args.transitions * 10 ** 6:8.1f} us")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,541 @@
+"""
+Capacity simulator: replays the first hours of a disaster against the app on
+a compressed clock and reports backlogs, endpoint latencies and database lock
+waits over time, to size workers and database settings before the season.
+
+Registrations, logins, requests and donations arrive as Poisson processes
+whose rate follows a storm curve (build-up to landfall, peak, exponential
+decay). Admins work the Pending queue and volunteers plan, claim and complete
+routes as agents, so the Pending and Approved-unassigned backlogs grow
+whenever they fall behind. Every simulated person has their own cookie
+session; calls run on --workers threads, in-process against create_app (a
+temporary SQLite file) or over HTTP against a running server (--url, with
+--database-uri pointing at its database for seeding and backlog sampling).
+
+Usage: python benchmarks/bench_capacity.py [--hours 48] [--speed 720] [--scale 1] [--workers 8]
+                                           [--url http://localhost:5001 --database-uri URI] [--csv out.csv]
+"""
+import argparse
+import csv
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.request import HTTPCookieProcessor, Request as UrlRequest, build_opener
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from sqlalchemy import event as sa_event, func, select, text
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from config import Config
+from extensions import db
+from models import User, Event, Resource, Request, VolunteerAssignment
+
+class SimConfig(Config):
+    # Production settings, on a throwaway database
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SECRET_KEY = 'bench-key'
+    ADMISSION_CONTROL_ENABLED = False  # every in-process client shares one IP
+    AUTO_CREATE_SCHEMA = True
+
+PASSWORD = 'password123'
+URGENCIES = ['Low', 'Medium', 'High', 'Critical']
+URGENCY_WEIGHTS = [2, 4, 3, 1]
+
+# Arrivals per simulated hour at the peak of the storm curve (times --scale)
+ARRIVALS = {'register': 6, 'login': 12, 'request': 120, 'donate': 15}
+HALF_LIFE_HOURS = 12      # decay of the arrival rate after the peak
+FLOOR = 0.15              # share of the peak rate that never goes away
+ADMIN_APPROVALS = 40      # approvals per hour per admin
+VOLUNTEER_POLL_MINUTES = 15
+ROUTE_STOPS = 3
+ROUTE_HOURS = 1.5         # mean time to deliver a claimed route
+LOCK_WAIT_SECONDS = 0.01  # SQLite: a write or commit slower than this waited for the lock
+
+def intensity(hour, landfall):
+    """Share of the peak arrival rate at a given hour of the timeline"""
+    if hour < landfall:
+        return 0.2 + 0.8 * hour / landfall
+    return max(FLOOR, 0.5 ** ((hour - landfall) / HALF_LIFE_HOURS))
+
+def next_arrival(rng, hour, peak_rate, landfall):
+    """Next arrival of a Poisson process at peak_rate * intensity (by thinning)"""
+    while True:
+        hour += rng.expovariate(peak_rate)
+        if rng.random() <= intensity(hour, landfall):
+            return hour
+
+class LocalClient:
+    """Cookie session against the app in this process"""
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def call(self, method, path, body=None):
+        response = self._client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+class HttpClient:
+    """Cookie session against a running server"""
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self._opener = build_opener(HTTPCookieProcessor(CookieJar()))
+
+    def call(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        request = UrlRequest(self.base_url + path, data=data, method=method,
+                             headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with self._opener.open(request, timeout=120) as response:
+                status, payload = response.status, response.read()
+        except HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+class Actor:
+    """One simulated person: account, session and a lock so their calls never overlap"""
+    def __init__(self, email, client, user_id=None):
+        self.email = email
+        self.client = client
+        self.user_id = user_id
+        self.logged_in = False
+        self.lock = threading.Lock()
+
+class LockProbe:
+    """
+    Database lock waits: InnoDB row lock counters on MySQL; on SQLite (in
+    process only) the writes and commits slower than LOCK_WAIT_SECONDS, which
+    also counts time spent waiting for the GIL, and the statements that gave
+    up with 'database is locked'
+    """
+    def __init__(self, engine, in_process):
+        self.engine = engine
+        self.mysql = engine.dialect.name == 'mysql'
+        self.enabled = self.mysql or in_process
+        self._lock = threading.Lock()
+        self._waits, self._wait_seconds, self._locked = 0, 0.0, 0
+        self._last = self._innodb() if self.mysql else None
+        if self.enabled and not self.mysql:
+            sa_event.listen(engine, 'before_cursor_execute', self._before)
+            sa_event.listen(engine, 'after_cursor_execute', self._after)
+            sa_event.listen(engine, 'handle_error', self._error)
+            do_commit = engine.dialect.do_commit
+
+            def timed_commit(dbapi_connection):
+                started = time.perf_counter()
+                try:
+                    do_commit(dbapi_connection)
+                finally:
+                    self._observe(time.perf_counter() - started)
+            engine.dialect.do_commit = timed_commit
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['sim_started'] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith('SELECT'):
+            self._observe(time.perf_counter() - conn.info.pop('sim_started'))
+
+    def _error(self, context):
+        if 'database is locked' in str(context.original_exception):
+            with self._lock:
+                self._locked += 1
+
+    def _observe(self, seconds):
+        if seconds >= LOCK_WAIT_SECONDS:
+            with self._lock:
+                self._waits += 1
+                self._wait_seconds += seconds
+
+    def _innodb(self):
+        with self.engine.connect() as connection:
+            rows = dict(connection.execute(text("SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_%'")).all())
+        return int(rows['Innodb_row_lock_waits']), int(rows['Innodb_row_lock_time']) / 1000, 0
+
+    def take(self):
+        """(waits, seconds waited, "database is locked" errors) since the previous call"""
+        if not self.enabled:
+            return None
+        if self.mysql:
+            now = self._innodb()
+            taken, self._last = tuple(a - b for a, b in zip(now, self._last)), now
+            return taken
+        with self._lock:
+            taken = self._waits, self._wait_seconds, self._locked
+            self._waits, self._wait_seconds, self._locked = 0, 0.0, 0
+        return taken
+
+class Simulation:
+    """Event heap on simulated hours, dispatched to a worker pool at hour * 3600 / speed wall seconds"""
+    def __init__(self, args, app, make_client):
+        self.args = args
+        self.app = app
+        self.make_client = make_client
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.wall_per_hour = 3600 / args.speed
+        self.probe = LockProbe(db.engine, in_process=not args.url)
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._start = None
+
+        self.residents, self.admins, self.volunteers = [], [], []
+        self.event_ids, self.resource_ids = [], []
+        self._registered = itertools.count()
+
+        # (endpoint, due hour, queue wait s, latency s, status)
+        self.calls = []
+        # (hour, pending, approved-unassigned, calls in flight, lock probe)
+        self.samples = []
+        self._calls_lock = threading.Lock()
+
+    # Scheduling
+
+    def at(self, hour, handler, *args):
+        if hour > self.args.hours:
+            return
+        with self._cond:
+            heapq.heappush(self._heap, (hour, next(self._seq), handler, args))
+            self._cond.notify()
+
+    def random(self, fn, *args):
+        """Call an rng method from a worker thread"""
+        with self.rng_lock:
+            return fn(*args)
+
+    def now(self):
+        """Current simulated hour; agents act after their previous call returned, so never before it"""
+        return (time.perf_counter() - self._start) / self.wall_per_hour
+
+    def run(self):
+        self._start = time.perf_counter()
+        sampler = threading.Thread(target=self._sample_loop, name='sim-sampler', daemon=True)
+        sampler.start()
+        with ThreadPoolExecutor(self.args.workers, thread_name_prefix='sim') as pool:
+            while True:
+                with self._cond:
+                    if not self._heap:
+                        if not self._in_flight:
+                            break
+                        self._cond.wait()
+                        continue
+                    hour = self._heap[0][0]
+                    delay = self._start + hour * self.wall_per_hour - time.perf_counter()
+                    if delay > 0:
+                        self._cond.wait(delay)
+                        continue
+                    hour, _, handler, args = heapq.heappop(self._heap)
+                    self._in_flight += 1
+                pool.submit(self._dispatch, hour, handler, args)
+        elapsed = time.perf_counter() - self._start
+        sampler.join()
+        return elapsed
+
+    def _dispatch(self, hour, handler, args):
+        try:
+            handler(hour, *args)
+        except Exception as e:
+            print(f"  {handler.__name__} at hour {hour:.2f} failed: {e!r}", file=sys.stderr)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+
+    def call(self, actor, hour, endpoint, method, path, body=None):
+        """One HTTP call by an actor, timed from the moment it was due"""
+        due = self._start + hour * self.wall_per_hour
+        with actor.lock:
+            started = time.perf_counter()
+            try:
+                status, payload = actor.client.call(method, path, body)
+            except Exception:
+                status, payload = 599, None
+            finished = time.perf_counter()
+        with self._calls_lock:
+            self.calls.append((endpoint, hour, max(0.0, started - due), finished - started, status))
+        return status, payload
+
+    # Setup
+
+    def seed(self):
+        """Events, stocked resources and accounts, and a client per account"""
+        args = self.args
+        password_hash = generate_password_hash(PASSWORD)
+        accounts = ([('admin', i, True, False) for i in range(args.admins)] +
+                    [('volunteer', i, False, True) for i in range(args.volunteers)] +
+                    [('resident', i, False, False) for i in range(args.residents)])
+        with self.app.app_context():
+            db.create_all()
+            db.session.execute(db.insert(User), [
+                {'name': f'{role.title()} {i}', 'email': f'{role}{i}@sim.org', 'phone': '0',
+                 'password_hash': password_hash, 'is_admin': is_admin, 'is_volunteer': is_volunteer}
+                for role, i, is_admin, is_volunteer in accounts])
+            db.session.execute(db.insert(Event), [
+                {'name': f'Storm zone {i}', 'latitude': 25 + self.rng.random() * 5,
+                 'longitude': -82 + self.rng.random() * 5, 'severity': 'High'}
+                for i in range(args.events)])
+            db.session.execute(db.insert(Resource), [
+                {'name': f'Supply {i}', 'category': 'Food', 'total_quantity': args.stock,
+                 'available_quantity': args.stock} for i in range(args.resources)])
+            db.session.commit()
+            ids = dict(db.session.execute(select(User.email, User.id)).all())
+            self.event_ids = db.session.scalars(select(Event.id)).all()
+            self.resource_ids = db.session.scalars(select(Resource.id)).all()
+            db.session.remove()
+
+        for role, i, _, _ in accounts:
+            email = f'{role}{i}@sim.org'
+            actor = Actor(email, self.make_client(), ids[email])
+            {'admin': self.admins, 'volunteer': self.volunteers, 'resident': self.residents}[role].append(actor)
+
+    def start(self):
+        """Log staff in before the clock starts, then schedule arrivals, agents and samples"""
+        for actor in self.admins + self.volunteers:
+            status, _ = actor.client.call('POST', '/auth/login', {'email': actor.email, 'password': PASSWORD})
+            assert status == 200, (actor.email, status)
+            actor.logged_in = True
+
+        # Arrivals do not depend on how the system copes, so they are drawn up front
+        for kind, rate in ARRIVALS.items():
+            hour, rate = 0.0, rate * self.args.scale
+            while rate > 0:
+                hour = next_arrival(self.rng, hour, rate, self.args.landfall)
+                if hour > self.args.hours:
+                    break
+                self.at(hour, self.arrival, kind)
+        for admin in self.admins:
+            self.at(self.rng.expovariate(ADMIN_APPROVALS), self.approve, admin)
+        for volunteer in self.volunteers:
+            self.at(self.rng.uniform(0, VOLUNTEER_POLL_MINUTES / 60), self.claim, volunteer)
+
+    # Arrival processes
+
+    def arrival(self, hour, kind):
+        if kind == 'register':
+            self.register(hour)
+            return
+        with self.rng_lock:
+            actor = self.rng.choice(self.residents)
+        if kind == 'login':
+            # Returning user on a new device or an expired session
+            actor.logged_in = False
+            self.call(actor, hour, 'GET /auth/logout', 'GET', '/auth/logout')
+            self.login(hour, actor)
+        elif kind == 'request':
+            self.request(hour, actor)
+        else:
+            self.donate(hour, actor)
+
+    def register(self, hour):
+        email = f'newcomer{next(self._registered)}@sim.org'
+        actor = Actor(email, self.make_client())
+        status, _ = self.call(actor, hour, 'POST /auth/register', 'POST', '/auth/register',
+                              {'name': 'Newcomer', 'email': email, 'phone': '0', 'password': PASSWORD})
+        if status == 201:
+            with self.rng_lock:
+                self.residents.append(actor)
+                first_login = self.now() + self.rng.expovariate(6)  # ~10 minutes later
+            self.at(first_login, self.login, actor)
+
+    def login(self, hour, actor):
+        status, _ = self.call(actor, hour, 'POST /auth/login', 'POST', '/auth/login',
+                              {'email': actor.email, 'password': PASSWORD})
+        actor.logged_in = status < 400
+
+    def _pick(self):
+        with self.rng_lock:
+            return (self.rng.choice(self.event_ids), self.rng.choice(self.resource_ids),
+                    self.rng.randint(1, 20), self.rng.choices(URGENCIES, URGENCY_WEIGHTS)[0])
+
+    def request(self, hour, actor):
+        if not actor.logged_in:
+            self.login(hour, actor)
+        event_id, resource_id, quantity, urgency = self._pick()
+        self.call(actor, hour, 'POST /user/requests', 'POST', '/user/requests',
+                  {'event_id': event_id, 'resource_id': resource_id, 'quantity': quantity, 'urgency': urgency})
+
+    def donate(self, hour, actor):
+        if not actor.logged_in:
+            self.login(hour, actor)
+        event_id, resource_id, quantity, _ = self._pick()
+        self.call(actor, hour, 'POST /user/donate', 'POST', '/user/donate',
+                  {'event_id': event_id, 'resource_id': resource_id, 'quantity': quantity * 10})
+
+    # Agents
+
+    def approve(self, hour, admin):
+        """Open the Pending queue, approve one of the newest (reject when out of stock)"""
+        try:
+            self._approve(hour, admin)
+        finally:
+            self.at(self.now() + self.random(self.rng.expovariate, ADMIN_APPROVALS), self.approve, admin)
+
+    def _approve(self, hour, admin):
+        status, payload = self.call(admin, hour, 'GET /admin/requests', 'GET', '/admin/requests?status=Pending')
+        if status != 200 or not payload['requests']:
+            return
+        with self.rng_lock:
+            request_id = self.rng.choice(payload['requests'])['id']
+        path = f'/admin/requests/{request_id}/action'
+        status, _ = self.call(admin, hour, 'POST /admin/requests/<id>/action', 'POST', path, {'action': 'approve'})
+        if status == 400:
+            self.call(admin, hour, 'POST /admin/requests/<id>/action', 'POST', path, {'action': 'reject'})
+
+    def claim(self, hour, volunteer):
+        """Plan a short route over open tasks and claim it; poll again later if there is none"""
+        status, plan = self.call(volunteer, hour, 'GET /volunteer/routes/plan', 'GET',
+                                 f'/volunteer/routes/plan?max_stops={ROUTE_STOPS}')
+        request_ids = [i for stop in plan['stops'] for i in stop['request_ids']] if status == 200 else []
+        if request_ids:
+            status, _ = self.call(volunteer, hour, 'POST /volunteer/routes/claim', 'POST',
+                                  '/volunteer/routes/claim', {'request_ids': request_ids})
+            if status == 200:
+                self.at(self.now() + self.random(self.rng.expovariate, 1 / ROUTE_HOURS), self.complete, volunteer)
+                return
+        self.at(self.now() + VOLUNTEER_POLL_MINUTES / 60, self.claim, volunteer)
+
+    def complete(self, hour, volunteer):
+        with self.app.app_context():
+            # What the volunteer dashboard lists as their open assignments
+            assignment_ids = db.session.scalars(select(VolunteerAssignment.id).where(
+                VolunteerAssignment.user_id == volunteer.user_id,
+                VolunteerAssignment.status == 'In Progress')).all()
+            db.session.remove()
+        for assignment_id in assignment_ids:
+            self.call(volunteer, hour, 'POST /volunteer/tasks/<id>/complete', 'POST',
+                      f'/volunteer/tasks/{assignment_id}/complete')
+        self.claim(hour, volunteer)
+
+    # Observation
+
+    def _sample_loop(self):
+        """Sample on the wall clock, so a run that falls behind shows it instead of waiting for it"""
+        step = self.args.sample_minutes / 60
+        for i in range(1, int(self.args.hours / step) + 1):
+            time.sleep(max(0.0, self._start + i * step * self.wall_per_hour - time.perf_counter()))
+            try:
+                self.sample(i * step)
+            except Exception as e:
+                print(f"  sample at hour {i * step:.2f} failed: {e!r}", file=sys.stderr)
+
+    def sample(self, hour):
+        with self._cond:
+            in_flight = self._in_flight
+        with self.app.app_context():
+            pending = db.session.scalar(select(func.count(Request.id)).where(Request.status == 'Pending'))
+            unassigned = db.session.scalar(
+                select(func.count(Request.id))
+                .outerjoin(VolunteerAssignment, VolunteerAssignment.request_id == Request.id)
+                .where(Request.status == 'Approved', VolunteerAssignment.id.is_(None)))
+            db.session.remove()
+        self.samples.append((hour, pending, unassigned, in_flight, self.probe.take()))
+
+def _ms(values, q):
+    return float(np.percentile(values, q)) * 1000 if len(values) else 0.0
+
+def report(sim, elapsed, csv_path=None):
+    args = sim.args
+    step = args.sample_minutes / 60
+    by_interval = defaultdict(list)
+    for call in sim.calls if sim.samples else ():
+        by_interval[min(int(call[1] // step), len(sim.samples) - 1)].append(call)
+
+    columns = [('hour', 6), ('calls', 6), ('pending', 8), ('unassigned', 10), ('in flight', 9),
+               ('p50 ms', 8), ('p95 ms', 8), ('wait p95', 9), ('5xx', 5),
+               ('lock waits', 10), ('lock ms', 8), ('locked', 6)]
+    print(' '.join(f"{name:>{width}}" for name, width in columns))
+    rows = []
+    for i, (hour, pending, unassigned, in_flight, locks) in enumerate(sorted(sim.samples)):
+        calls = by_interval.get(i, [])
+        latencies = [c[3] for c in calls]
+        lock_waits, lock_seconds, locked = locks if locks else (None, None, None)
+        rows.append([round(hour, 2), len(calls), pending, unassigned, in_flight,
+                     round(_ms(latencies, 50), 1), round(_ms(latencies, 95), 1),
+                     round(_ms([c[2] for c in calls], 95), 1), sum(1 for c in calls if c[4] >= 500),
+                     lock_waits, None if lock_seconds is None else round(lock_seconds * 1000, 1), locked])
+        print(' '.join(f"{'n/a' if value is None else value:>{width}}"
+                       for value, (_, width) in zip(rows[-1], columns)))
+
+    print(f"\n{'endpoint':36s} {'calls':>6} {'4xx':>5} {'5xx':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    by_endpoint = defaultdict(list)
+    for call in sim.calls:
+        by_endpoint[call[0]].append(call)
+    for endpoint, calls in sorted(by_endpoint.items()):
+        latencies = [c[3] for c in calls]
+        client_errors = sum(1 for c in calls if 400 <= c[4] < 500)
+        server_errors = sum(1 for c in calls if c[4] >= 500)
+        print(f"{endpoint:36s} {len(calls):6d} {client_errors:5d} {server_errors:5d} {_ms(latencies, 50):8.1f} "
+              f"{_ms(latencies, 95):8.1f} {_ms(latencies, 99):8.1f} {max(latencies) * 1000:8.1f}")
+
+    behind = max((c[2] for c in sim.calls), default=0)
+    print(f"\n{len(sim.calls)} calls in {elapsed:.1f} s wall for {args.hours:g} h simulated "
+          f"(target {args.hours * sim.wall_per_hour:.1f} s); longest wait for a worker {behind * 1000:.0f} ms")
+
+    if csv_path:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['hour', 'calls', 'pending', 'approved_unassigned', 'in_flight', 'p50_ms', 'p95_ms',
+                             'wait_p95_ms', 'errors_5xx', 'lock_waits', 'lock_ms', 'locked_errors'])
+            writer.writerows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hours', type=float, default=48, help='Simulated timeline length')
+    parser.add_argument('--landfall', type=float, default=6, help='Hour of peak arrivals')
+    parser.add_argument('--speed', type=float, default=720, help='Simulated seconds per wall second')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier on the arrival rates')
+    parser.add_argument('--workers', type=int, default=8, help='Threads issuing calls (server worker threads in-process)')
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--volunteers', type=int, default=15)
+    parser.add_argument('--residents', type=int, default=200, help='Accounts that exist before the storm')
+    parser.add_argument('--events', type=int, default=8)
+    parser.add_argument('--resources', type=int, default=10)
+    parser.add_argument('--stock', type=int, default=100000, help='Initial units per resource')
+    parser.add_argument('--sample-minutes', type=float, default=120, help='Simulated minutes between samples')
+    parser.add_argument('--admission', action='store_true', help='Keep admission control on (in-process)')
+    parser.add_argument('--url', help='Replay against a running server instead of in-process')
+    parser.add_argument('--database-uri', help="The server's database (required with --url); must be empty")
+    parser.add_argument('--csv', help='Write the per-interval rows to this file')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    if args.url and not args.database_uri:
+        parser.error('--url needs --database-uri to seed and sample the backlog')
+
+    # A file database so worker threads share it (and contend for its lock, as in production)
+    uri = args.database_uri or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'capacity.db')}"
+    config = type('RunConfig', (SimConfig,), {'SQLALCHEMY_DATABASE_URI': uri,
+                                              'ADMISSION_CONTROL_ENABLED': args.admission})
+    app = create_app(config)
+    make_client = (lambda: HttpClient(args.url)) if args.url else (lambda: LocalClient(app))
+
+    target = f"{args.url} on {uri.split(':')[0]}" if args.url else 'in-process on a SQLite file'
+    with app.app_context():
+        sim = Simulation(args, app, make_client)
+    # No app context from here on: each call pushes its own, as under a server
+    sim.seed()
+    sim.start()
+    print(f"{args.hours:g} h timeline, landfall at hour {args.landfall:g}, {args.speed:g}x "
+          f"(1 h = {sim.wall_per_hour:.1f} s), scale {args.scale:g}, {args.workers} workers, {target}")
+    elapsed = sim.run()
+    report(sim, elapsed, args.csv)
+
+if __name__ == '__main__':
+    main()
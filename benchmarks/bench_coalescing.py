@@ -0,0 +1,86 @@
+"""
+Request coalescing benchmark: admin queue size and approval work for a burst
+of duplicate requests, with and without folding them into open aggregates.
+
+Usage: python benchmarks/bench_coalescing.py [--requests 5000] [--events 20] [--resources 10]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from app import create_app
+from extensions import db
+from models import User, Event, Resource, Request, RequestContribution
+from routes.admin import _approve_request
+from services import coalescing
+
+class BenchConfig:
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = 'bench-key'
+    ADMISSION_CONTROL_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = False
+
+URGENCIES = ['Low', 'Medium', 'High', 'Critical']
+
+def seed(n_users, n_events, n_resources):
+    db.session.execute(db.insert(User), [
+        {'name': f'User {i}', 'email': f'user{i}@bench.org', 'phone': '0', 'password_hash': 'x',
+         'is_admin': i == 0}
+        for i in range(n_users)])
+    db.session.execute(db.insert(Event), [
+        {'name': f'Event {i}', 'latitude': 0, 'longitude': 0} for i in range(n_events)])
+    db.session.execute(db.insert(Resource), [
+        {'name': f'Resource {i}', 'category': 'Food', 'total_quantity': 10 ** 9, 'available_quantity': 10 ** 9}
+        for i in range(n_resources)])
+    db.session.commit()
+
+def run(enabled, args):
+    app = create_app(BenchConfig)
+    app.config['REQUEST_COALESCING_ENABLED'] = enabled
+    with app.app_context():
+        db.create_all()
+        seed(args.users, args.events, args.resources)
+        rng = random.Random(21)
+
+        # One transaction per submission, as from the request endpoint
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            coalescing.submit(rng.randint(2, args.users), rng.randint(1, args.resources),
+                              rng.randint(1, args.events), rng.randint(1, 50), rng.choice(URGENCIES))
+            db.session.commit()
+        submit_ms = (time.perf_counter() - start) * 1000
+
+        queue = db.session.scalars(db.select(Request.id).where(Request.status == 'Pending')).all()
+        start = time.perf_counter()
+        for request_id in queue:
+            _approve_request(request_id, 1, '')
+            db.session.commit()
+        approve_ms = (time.perf_counter() - start) * 1000
+
+        served = RequestContribution.query.filter_by(status='Approved').count() if enabled else len(queue)
+        db.session.remove()
+        db.drop_all()
+    return submit_ms, len(queue), approve_ms, served
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--resources', type=int, default=10)
+    parser.add_argument('--users', type=int, default=2000)
+    args = parser.parse_args()
+
+    keys = args.events * args.resources
+    print(f"{args.requests} requests from {args.users} users over {keys} event/resource pairs")
+    for label, enabled in (('separate requests', False), ('coalesced', True)):
+        submit_ms, queue, approve_ms, served = run(enabled, args)
+        print(f"{label:18s} submit {submit_ms / args.requests:6.3f} ms each   admin queue {queue:6d}   "
+              f"approve all {approve_ms:9.1f} ms   ({served} submissions served)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Dashboard render benchmark: full Jinja render vs fragment-cached render.
+
+Usage: python benchmarks/bench_dashboard_render.py [--events 200] [--resources 200] [--runs 50]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from app import create_app
+from extensions import db
+from models import User, Event, Resource, Donation, Request
+
+class BenchConfig:
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = 'bench-key'
+    WTF_CSRF_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = True
+
+def seed(n_events, n_resources):
+    admin = User(name='Admin', email='admin@bench.org', phone='0', is_admin=True)
+    admin.set_password('password123')
+    user = User(name='Bench User', email='user@bench.org', phone='1')
+    user.set_password('password123')
+    db.session.add_all([admin, user])
+    db.session.add_all(Event(name=f'Event {i}', description='Flooding and power outages ' * 4,
+                             latitude=20 + i * 0.01, longitude=-80 - i * 0.01,
+                             severity=['Low', 'Medium', 'High', 'Critical'][i % 4])
+                       for i in range(n_events))
+    db.session.add_all(Resource(name=f'Resource {i}', category='Food', description='Relief supply',
+                                total_quantity=1000, available_quantity=(i * 37) % 1000)
+                       for i in range(n_resources))
+    db.session.flush()
+    db.session.add_all(Donation(user_id=user.id, resource_id=1, quantity=5) for _ in range(10))
+    db.session.add_all(Request(user_id=user.id, resource_id=1, event_id=1, quantity=2) for _ in range(10))
+    db.session.commit()
+
+def time_get(client, path, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.get(path)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    return statistics.median(samples), max(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--resources', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+    
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        seed(args.events, args.resources)
+    
+    cache = app.extensions['fragment_cache']
+    print(f"{args.events} events, {args.resources} resources, {args.runs} runs (median / max ms)")
+    
+    for email, path in (('user@bench.org', '/user/dashboard'), ('admin@bench.org', '/admin/dashboard')):
+        client = app.test_client()
+        client.post('/auth/login', json={'email': email, 'password': 'password123'})
+        
+        app.extensions.pop('fragment_cache')
+        uncached = time_get(client, path, args.runs)
+        
+        app.extensions['fragment_cache'] = cache
+        cache.clear()
+        client.get(path)  # fill the cache
+        cached = time_get(client, path, args.runs)
+        
+        print(f"{path:20s} full render: {uncached[0]:7.2f} / {uncached[1]:7.2f}   "
+              f"fragment cached: {cached[0]:7.2f} / {cached[1]:7.2f}   "
+              f"speedup x{uncached[0] / cached[0]:.1f}")
+
+if __name__ == '__main__':
+    main()
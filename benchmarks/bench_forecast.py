@@ -0,0 +1,94 @@
+"""
+Forecast benchmark: cold build, cached call and incremental refresh of
+/admin/forecast with thousands of resources.
+
+Usage: python benchmarks/bench_forecast.py [--resources 5000] [--donations 200000] [--approvals 100000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from app import create_app
+from extensions import db
+from models import User, Event, Resource, Donation, Request, AdminResponse
+
+class BenchConfig:
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = 'bench-key'
+    ADMISSION_CONTROL_ENABLED = False
+
+def seed(n_resources, n_donations, n_approvals, days=30):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    admin = User(name='Admin', email='admin@bench.org', phone='0', is_admin=True)
+    admin.set_password('password123')
+    db.session.add(admin)
+    db.session.add(Event(name='Hurricane', latitude=0, longitude=0))
+    db.session.commit()
+    db.session.execute(db.insert(Resource), [
+        {'name': f'Resource {i}', 'category': 'Food', 'total_quantity': 10000,
+         'available_quantity': rng.randint(0, 10000)} for i in range(n_resources)])
+    when = lambda: now - timedelta(seconds=rng.randint(0, days * 86400))
+    db.session.execute(db.insert(Donation), [
+        {'user_id': 1, 'resource_id': rng.randint(1, n_resources), 'quantity': rng.randint(1, 50),
+         'status': 'Completed', 'donated_at': when()} for _ in range(n_donations)])
+    add_approvals(n_approvals, n_resources, when, rng)
+
+def add_approvals(count, n_resources, when, rng):
+    first_id = (db.session.query(db.func.max(Request.id)).scalar() or 0) + 1
+    times = [when() for _ in range(count)]
+    db.session.execute(db.insert(Request), [
+        {'id': first_id + i, 'user_id': 1, 'resource_id': rng.randint(1, n_resources), 'event_id': 1,
+         'quantity': rng.randint(1, 60), 'status': 'Approved', 'created_at': times[i]} for i in range(count)])
+    db.session.execute(db.insert(AdminResponse), [
+        {'request_id': first_id + i, 'admin_id': 1, 'action': 'Approved', 'responded_at': times[i]}
+        for i in range(count)])
+    db.session.commit()
+
+def timed(fn, runs=1):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--resources', type=int, default=5000)
+    parser.add_argument('--donations', type=int, default=200000)
+    parser.add_argument('--approvals', type=int, default=100000)
+    parser.add_argument('--new-rows', type=int, default=500)
+    args = parser.parse_args()
+    
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        seed(args.resources, args.donations, args.approvals)
+        forecaster = app.extensions['forecaster']
+        print(f"{args.resources} resources, {args.donations} donations, {args.approvals} approvals")
+        
+        cold = timed(forecaster.forecast)
+        print(f"cold build (all history, one pass):  {cold:9.2f} ms")
+        forecaster.ttl = 3600
+        print(f"cached call:                         {timed(forecaster.forecast, runs=50):9.2f} ms")
+        
+        rng = random.Random(11)
+        add_approvals(args.new_rows, args.resources, lambda: datetime.utcnow() - timedelta(hours=2), rng)
+        print(f"incremental refresh (+{args.new_rows} rows):     {timed(forecaster.forecast):9.2f} ms")
+        print(f"per-event view:                      {timed(lambda: forecaster.forecast(event_id=1)):9.2f} ms")
+        
+        client = app.test_client()
+        client.post('/auth/login', json={'email': 'admin@bench.org', 'password': 'password123'})
+        print(f"GET /admin/forecast (cached, gzip):  "
+              f"{timed(lambda: client.get('/admin/forecast', headers={'Accept-Encoding': 'gzip'}), runs=50):9.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Search benchmark: /search query latency over a large synthetic index.
+
+Usage: python benchmarks/bench_search.py [--rows 1000000] [--runs 20]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from app import create_app
+from extensions import db
+from models import User, SearchDocument
+from services import search
+
+class BenchConfig:
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = 'bench-key'
+    ADMISSION_CONTROL_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = False
+
+TARGET_MS = 50  # uncached, at 1M documents
+
+TOPICS = ['flood', 'wildfire', 'earthquake', 'hurricane', 'tornado', 'landslide', 'blizzard', 'drought']
+TYPES = ['event', 'resource', 'donation', 'admin_response']
+
+def seed(rows, batch=50000):
+    rng = random.Random(5)
+    # Zipf-like vocabulary: a few very common words, a long tail of rare ones
+    vocabulary = [f'word{i}' for i in range(20000)]
+    cum_weights = list(itertools.accumulate(1 / (i + 1) for i in range(len(vocabulary))))
+    for start in range(0, rows, batch):
+        docs = []
+        for i in range(start, min(rows, start + batch)):
+            words = rng.choices(vocabulary, cum_weights=cum_weights, k=12)
+            docs.append({
+                'entity_type': TYPES[i % 4],
+                'entity_id': i,
+                'event_id': rng.randint(1, 500),
+                'title': f'{rng.choice(TOPICS)} {words[0]} {words[1]}',
+                'body': ' '.join(words[2:]),
+            })
+        db.session.execute(db.insert(SearchDocument), docs)
+    db.session.commit()
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+    
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        seed(args.rows)
+        print(f"indexed {args.rows} documents in {time.perf_counter() - start:.1f} s")
+        
+        queries = [
+            ('rare term', dict(q='word15000')),
+            ('mid-frequency term', dict(q='word300')),
+            ('common term (1 in 8 docs)', dict(q='flood')),
+            ('two terms', dict(q='hurricane word120')),
+            ('prefix (typing)', dict(q='word1999')),
+            ('topic + event filter', dict(q='flood', event_id=42)),
+            ('common term, events only', dict(q='flood', entity_types=['event'])),
+            ('common term, public types', dict(q='flood', entity_types=['event', 'resource'])),
+        ]
+        # Uncached: every match is ranked; cached: a repeated query at the same index version
+        cache = app.extensions['search_cache']
+        for label, kwargs in queries:
+            median, worst = timed(lambda: (cache.clear(), search.search(limit=20, **kwargs)), args.runs)
+            cached, _ = timed(lambda: search.search(limit=20, **kwargs), args.runs)
+            hits = len(search.search(limit=20, **kwargs))
+            print(f"{label:28s} median {median:7.2f} ms   max {worst:7.2f} ms   "
+                  f"cached {cached:5.2f} ms   ({hits} results){'   over target' if median > TARGET_MS else ''}")
+        
+        client = app.test_client()
+        admin = User(name='Admin', email='admin@bench.org', phone='0', is_admin=True)
+        admin.set_password('password123')
+        db.session.add(admin)
+        db.session.commit()
+        client.post('/auth/login', json={'email': 'admin@bench.org', 'password': 'password123'})
+        for label, url in [('GET /search end to end', '/search?q=hurricane+word120'),
+                           ('GET /search, regular user', '/search?q=flood&type=event,resource')]:
+            median, worst = timed(lambda: (cache.clear(), client.get(url)), args.runs)
+            cached, _ = timed(lambda: client.get(url), args.runs)
+            print(f"{label:28s} median {median:7.2f} ms   max {worst:7.2f} ms   cached {cached:5.2f} ms"
+                  f"{'   over target' if median > TARGET_MS else ''}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Worker startup benchmark: time-to-first-request for a cold worker vs a worker
+forked from a preloaded, warmed master.
+
+Each scenario runs in a fresh interpreter so import costs are real.
+Usage: python benchmarks/bench_startup.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend'))
+
+def child(mode, db_path):
+    """Runs inside the subprocess; prints a JSON timing record"""
+    t0 = time.perf_counter()
+    sys.path.append(BACKEND)
+    from app import create_app, setup_database, warm_app
+    from config import Config
+    t_import = time.perf_counter()
+    
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        AUTO_CREATE_SCHEMA = mode == 'legacy'
+    
+    app = create_app(BenchConfig)
+    setup_database(app)
+    if mode == 'preload':
+        warm_app(app)
+    t_ready = time.perf_counter()
+    
+    if mode == 'preload':
+        # Simulate the fork: the worker only pays from here on
+        pid = os.fork()
+        if pid:
+            os.waitpid(pid, 0)
+            return
+    
+    t_fork = time.perf_counter()
+    client = app.test_client()
+    # Login is dominated by password hashing, keep it out of the measurement
+    client.post('/auth/login', json={'email': 'john@example.com', 'password': 'password123'})
+    t_login = time.perf_counter()
+    for path in ('/user/dashboard', '/user/events/map'):
+        assert client.get(path).status_code == 200
+    t_first = time.perf_counter()
+    
+    print(json.dumps({
+        'import_ms': (t_import - t0) * 1000,
+        'init_ms': (t_ready - t_import) * 1000,
+        'first_request_ms': (t_first - t_login) * 1000,
+        'worker_total_ms': (t_first - (t_fork if mode == 'preload' else t0) - (t_login - t_fork)) * 1000,
+    }), flush=True)
+
+def run(mode, db_path):
+    out = subprocess.run([sys.executable, __file__, '--child', mode, db_path],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'DB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        child(*args.child)
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'startup.db')
+        run('legacy', db_path)  # creates schema and sample data
+        
+        print(f"median of {args.runs} runs (ms)")
+        for mode in ('legacy', 'preload'):
+            results = [run(mode, db_path) for _ in range(args.runs)]
+            summary = {key: statistics.median(r[key] for r in results) for key in results[0]}
+            print(f"{mode:8s} " + '  '.join(f"{key}={value:7.1f}" for key, value in summary.items()))
+        print("worker_total excludes login hashing; preload workers inherit imports, schema check and warm caches")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Delta-sync benchmark: full reload vs /sync?since=<token> with no changes and
+with a handful of changes, over a large change log.
+
+Usage: python benchmarks/bench_sync.py [--events 2000] [--resources 2000] [--requests 20000] [--history 200000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
+
+from sqlalchemy import event as sa_event
+from app import create_app
+from extensions import db
+from models import User, Event, Resource, Request, ChangeLog
+from services import changelog
+
+class BenchConfig:
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = 'bench-key'
+    ADMISSION_CONTROL_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = False
+
+def seed(n_events, n_resources, n_requests, n_history):
+    rng = random.Random(3)
+    user = User(name='Field Team', email='field@bench.org', phone='0')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.commit()
+    db.session.execute(db.insert(Event), [
+        {'name': f'Event {i}', 'latitude': rng.uniform(-60, 60), 'longitude': rng.uniform(-180, 180)}
+        for i in range(n_events)])
+    db.session.execute(db.insert(Resource), [
+        {'name': f'Resource {i}', 'category': 'Food', 'total_quantity': 1000, 'available_quantity': 500}
+        for i in range(n_resources)])
+    db.session.execute(db.insert(Request), [
+        {'user_id': 1, 'resource_id': rng.randint(1, n_resources), 'event_id': rng.randint(1, n_events),
+         'quantity': rng.randint(1, 20)} for _ in range(n_requests)])
+    # Bulk inserts bypass the flush listener: write a realistic history directly
+    tables = [('events', n_events, None), ('resources', n_resources, None), ('requests', n_requests, 1)]
+    entries = []
+    for _ in range(n_history):
+        table, count, owner = rng.choice(tables)
+        entries.append({'table_name': table, 'row_id': rng.randint(1, count), 'op': 'upsert', 'user_id': owner})
+    db.session.execute(db.insert(ChangeLog), entries)
+    db.session.commit()
+
+def timed(fn, runs=20):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--resources', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--history', type=int, default=200000)
+    args = parser.parse_args()
+    
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        seed(args.events, args.resources, args.requests, args.history)
+        client = app.test_client()
+        client.post('/auth/login', json={'email': 'field@bench.org', 'password': 'password123'})
+        
+        legacy = lambda: (client.get('/user/events'), client.get('/user/resources'), client.get('/user/dashboard'))
+        print(f"{args.events} events, {args.resources} resources, {args.requests} requests, {args.history} log entries")
+        print(f"legacy reload (events+resources+dashboard): {timed(legacy, runs=5):9.2f} ms")
+        full = client.get('/sync').get_json()
+        print(f"full snapshot /sync:                        {timed(lambda: client.get('/sync'), runs=5):9.2f} ms")
+        
+        token = full['token']
+        print(f"/sync?since=<token>, no changes:            {timed(lambda: client.get(f'/sync?since={token}')):9.2f} ms")
+        
+        statements = []
+        listener = lambda conn, cursor, statement, *rest: statements.append(statement)
+        sa_event.listen(db.engine, 'before_cursor_execute', listener)
+        changelog.changes_since(int(token), user_id=1)
+        sa_event.remove(db.engine, 'before_cursor_execute', listener)
+        plan = db.session.execute(db.text(
+            'EXPLAIN QUERY PLAN SELECT id FROM change_log WHERE id > :since ORDER BY id LIMIT 1001'),
+            {'since': int(token)}).all()
+        print(f"  change log queries: {len(statements)}; plan: {plan[0][-1]}")
+        
+        for resource in Resource.query.limit(10):
+            resource.available_quantity -= 1
+        db.session.commit()
+        print(f"/sync?since=<token>, 10 changed rows:       {timed(lambda: client.get(f'/sync?since={token}')):9.2f} ms")
+
+if __name__ == '__main__':
+    main()
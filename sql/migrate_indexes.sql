@@ -0,0 +1,80 @@
+-- Index migration for databases created from an older schema.sql
+-- Brings MySQL up to the indexes the models declare; run once with
+--   mysql disaster_db < sql/migrate_indexes.sql
+-- (SQLite and any other backend: `flask indexes ensure` adds missing columns,
+-- rebuilds SQLite tables that would reuse archived ids, and creates missing indexes)
+
+-- Volunteers: the column and table the volunteer blueprint relies on
+-- (MySQL has no ADD COLUMN IF NOT EXISTS: add it only where it is missing)
+SET @add_is_volunteer = (
+    SELECT IF(COUNT(*) = 0,
+              'ALTER TABLE users ADD COLUMN is_volunteer BOOLEAN DEFAULT FALSE AFTER is_admin',
+              'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'users' AND COLUMN_NAME = 'is_volunteer'
+);
+PREPARE add_is_volunteer FROM @add_is_volunteer;
+EXECUTE add_is_volunteer;
+DEALLOCATE PREPARE add_is_volunteer;
+
+-- Approved amount, kept apart from what was requested (priority allocation may approve less)
+SET @add_approved_quantity = (
+    SELECT IF(COUNT(*) = 0,
+              'ALTER TABLE requests ADD COLUMN approved_quantity INT NULL AFTER quantity',
+              'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'requests' AND COLUMN_NAME = 'approved_quantity'
+);
+PREPARE add_approved_quantity FROM @add_approved_quantity;
+EXECUTE add_approved_quantity;
+DEALLOCATE PREPARE add_approved_quantity;
+SET @add_approved_quantity = (
+    SELECT IF(COUNT(*) = 0,
+              'ALTER TABLE requests_archive ADD COLUMN approved_quantity INT NULL AFTER quantity',
+              'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'requests_archive' AND COLUMN_NAME = 'approved_quantity'
+);
+PREPARE add_approved_quantity FROM @add_approved_quantity;
+EXECUTE add_approved_quantity;
+DEALLOCATE PREPARE add_approved_quantity;
+
+-- Lease of an in-flight idempotency key, so a key claimed by a dead worker lapses
+SET @add_claimed_until = (
+    SELECT IF(COUNT(*) = 0 AND EXISTS (SELECT 1 FROM information_schema.TABLES
+                                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'idempotency_keys'),
+              'ALTER TABLE idempotency_keys ADD COLUMN claimed_until DATETIME NULL AFTER expires_at',
+              'DO 0')
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'idempotency_keys' AND COLUMN_NAME = 'claimed_until'
+);
+PREPARE add_claimed_until FROM @add_claimed_until;
+EXECUTE add_claimed_until;
+DEALLOCATE PREPARE add_claimed_until;
+
+CREATE TABLE IF NOT EXISTS volunteer_assignments (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    request_id INT NOT NULL,
+    status VARCHAR(50) DEFAULT 'Assigned',
+    assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL,
+    notes TEXT,
+    
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (request_id) REFERENCES requests(id) ON DELETE CASCADE,
+    
+    INDEX idx_user_id (user_id),
+    INDEX idx_request_id (request_id),
+    INDEX idx_user_assigned (user_id, assigned_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Requests: open aggregate lookup (coalescing), admin queue by status
+-- newest first, a user's requests newest first, archive retention scan
+CREATE INDEX idx_event_resource_status ON requests (event_id, resource_id, status);
+CREATE INDEX idx_status_created ON requests (status, created_at);
+CREATE INDEX idx_user_created ON requests (user_id, created_at);
+CREATE INDEX idx_status_updated ON requests (status, updated_at);
+
+-- Donations: a user's donations newest first
+CREATE INDEX idx_user_donated ON donations (user_id, donated_at);
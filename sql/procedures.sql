@@ -44,6 +44,10 @@ BEGIN
     SET available_quantity = available_quantity - v_quantity
     WHERE id = v_resource_id;
     
+    UPDATE requests
+    SET approved_quantity = v_quantity
+    WHERE id = p_request_id;
+    
     -- Create admin response
     INSERT INTO admin_responses (request_id, admin_id, action, comment)
     VALUES (p_request_id, p_admin_id, 'Approved', p_comment);
@@ -2,7 +2,8 @@
 -- Implements 3NF normalization with proper constraints and indexes
 
 SET FOREIGN_KEY_CHECKS=0;
-DROP TABLE IF EXISTS users, events, resources, donations, requests, admin_responses;
+DROP TABLE IF EXISTS users, events, resources, donations, requests, admin_responses, volunteer_assignments, stock_alerts, change_log, jobs, idempotency_keys, search_documents, request_contributions, audit_log;
+DROP TABLE IF EXISTS events_archive, requests_archive, donations_archive, admin_responses_archive, volunteer_assignments_archive, request_contributions_archive;
 SET FOREIGN_KEY_CHECKS=1;
 
 -- Users table: Stores user information with authentication
@@ -13,6 +14,7 @@ CREATE TABLE users (
     phone VARCHAR(20) NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
     is_admin BOOLEAN DEFAULT FALSE,
+    is_volunteer BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
     INDEX idx_email (email),
@@ -72,6 +74,7 @@ CREATE TABLE donations (
     INDEX idx_resource_id (resource_id),
     INDEX idx_event_id (event_id),
     INDEX idx_donated_at (donated_at),
+    INDEX idx_user_donated (user_id, donated_at),
     CHECK (quantity > 0)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -82,6 +85,7 @@ CREATE TABLE requests (
     resource_id INT NOT NULL,
     event_id INT NOT NULL,
     quantity INT NOT NULL,
+    approved_quantity INT NULL,
     urgency ENUM('Low', 'Medium', 'High', 'Critical') DEFAULT 'Medium',
     status ENUM('Pending', 'Approved', 'Rejected', 'Fulfilled') DEFAULT 'Pending',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -96,6 +100,10 @@ CREATE TABLE requests (
     INDEX idx_event_id (event_id),
     INDEX idx_status (status),
     INDEX idx_created (created_at),
+    INDEX idx_event_resource_status (event_id, resource_id, status),
+    INDEX idx_status_created (status, created_at),
+    INDEX idx_user_created (user_id, created_at),
+    INDEX idx_status_updated (status, updated_at),
     CHECK (quantity > 0)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -114,4 +122,232 @@ CREATE TABLE admin_responses (
     INDEX idx_request_id (request_id),
     INDEX idx_admin_id (admin_id),
     INDEX idx_responded_at (responded_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Volunteer assignments: volunteers claiming approved requests for delivery
+CREATE TABLE volunteer_assignments (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    request_id INT NOT NULL,
+    status VARCHAR(50) DEFAULT 'Assigned',
+    assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL,
+    notes TEXT,
+    
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (request_id) REFERENCES requests(id) ON DELETE CASCADE,
+    
+    INDEX idx_user_id (user_id),
+    INDEX idx_request_id (request_id),
+    INDEX idx_user_assigned (user_id, assigned_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Stock alerts: edge-triggered stock level changes, written with the quantity change
+CREATE TABLE stock_alerts (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    resource_id INT NOT NULL,
+    previous_status VARCHAR(50) NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    available_quantity INT NOT NULL,
+    total_quantity INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (resource_id) REFERENCES resources(id) ON DELETE CASCADE,
+    
+    INDEX idx_resource_id (resource_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Change log: monotonic change sequence for delta sync (/sync?since=<id>)
+-- Written in the same transaction as the change; op 'delete' is a tombstone
+CREATE TABLE change_log (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    table_name VARCHAR(50) NOT NULL,
+    row_id INT NOT NULL,
+    op VARCHAR(10) NOT NULL,
+    user_id INT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_change_log_row (table_name, row_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Audit log: append-only trail of state transitions, written in batches by the
+-- application (see services/audit.py); replaces the trigger-written system_logs
+CREATE TABLE audit_log (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    table_name VARCHAR(50) NOT NULL,
+    row_id INT NOT NULL,
+    action VARCHAR(20) NOT NULL,
+    actor_id INT NULL,
+    `before` TEXT,
+    `after` TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_audit_log_row (table_name, row_id, created_at),
+    INDEX idx_audit_log_actor (actor_id, created_at),
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Jobs: durable background work, enqueued in the transaction of the write that needs it
+CREATE TABLE jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    payload TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    run_at DATETIME NOT NULL,
+    locked_by VARCHAR(100),
+    locked_until DATETIME NULL,
+    last_error TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    
+    INDEX idx_jobs_status_run_at (status, run_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Idempotency keys of write requests, shared by all web processes (see services/idempotency.py)
+CREATE TABLE idempotency_keys (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    owner_id VARCHAR(64) NOT NULL DEFAULT '',
+    endpoint VARCHAR(100) NOT NULL,
+    idem_key VARCHAR(255) NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL,
+    status_code INT NULL,
+    body MEDIUMBLOB,
+    mimetype VARCHAR(100),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME NOT NULL,
+    claimed_until DATETIME NULL,
+    
+    UNIQUE KEY uq_idempotency_keys_scope (owner_id, endpoint, idem_key),
+    INDEX idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Full-text search documents, kept in sync by the application (see services/search.py)
+CREATE TABLE search_documents (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    entity_type VARCHAR(20) NOT NULL,
+    entity_id INT NOT NULL,
+    event_id INT,
+    title VARCHAR(200) NOT NULL DEFAULT '',
+    body TEXT NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    UNIQUE KEY uq_search_entity (entity_type, entity_id),
+    INDEX idx_event_id (event_id),
+    FULLTEXT INDEX ft_search_text (title, body)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Request contributions: each user's share of a coalesced request (see services/coalescing.py)
+CREATE TABLE request_contributions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    request_id INT NOT NULL,
+    user_id INT NOT NULL,
+    quantity INT NOT NULL,
+    urgency ENUM('Low', 'Medium', 'High', 'Critical') DEFAULT 'Medium',
+    status ENUM('Pending', 'Approved', 'Rejected', 'Fulfilled') DEFAULT 'Pending',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (request_id) REFERENCES requests(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    
+    INDEX idx_request_id (request_id),
+    INDEX idx_user_id (user_id),
+    CHECK (quantity > 0)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Archive tables: cold storage for closed events and requests (see `flask archive`)
+-- Same columns as the hot tables plus archived_at, without foreign keys
+CREATE TABLE events_archive (
+    id INT PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    description TEXT,
+    latitude DECIMAL(10, 8) NOT NULL,
+    longitude DECIMAL(11, 8) NOT NULL,
+    severity VARCHAR(50),
+    status VARCHAR(50),
+    created_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_archived_at (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE requests_archive (
+    id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    resource_id INT NOT NULL,
+    event_id INT NOT NULL,
+    quantity INT NOT NULL,
+    approved_quantity INT NULL,
+    urgency VARCHAR(50),
+    status VARCHAR(50),
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_user_id (user_id),
+    INDEX idx_event_id (event_id),
+    INDEX idx_archived_at (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE donations_archive (
+    id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    resource_id INT NOT NULL,
+    event_id INT,
+    quantity INT NOT NULL,
+    status VARCHAR(50),
+    donated_at TIMESTAMP NULL,
+    notes TEXT,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_user_id (user_id),
+    INDEX idx_event_id (event_id),
+    INDEX idx_archived_at (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE admin_responses_archive (
+    id INT PRIMARY KEY,
+    request_id INT NOT NULL,
+    admin_id INT NOT NULL,
+    action VARCHAR(50) NOT NULL,
+    comment TEXT,
+    responded_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_request_id (request_id),
+    INDEX idx_archived_at (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE volunteer_assignments_archive (
+    id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    request_id INT NOT NULL,
+    status VARCHAR(50),
+    assigned_at TIMESTAMP NULL,
+    completed_at TIMESTAMP NULL,
+    notes TEXT,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_user_id (user_id),
+    INDEX idx_request_id (request_id),
+    INDEX idx_archived_at (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE request_contributions_archive (
+    id INT PRIMARY KEY,
+    request_id INT NOT NULL,
+    user_id INT NOT NULL,
+    quantity INT NOT NULL,
+    urgency VARCHAR(50),
+    status VARCHAR(50),
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_request_id (request_id),
+    INDEX idx_user_id (user_id),
+    INDEX idx_archived_at (archived_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
\ No newline at end of file
@@ -1,6 +1,9 @@
 -- Database Triggers for Disaster Management System
 -- Ensures data consistency and automatic quantity updates
 
+-- Replaced by the application's audit log (see below)
+DROP TRIGGER IF EXISTS before_request_insert;
+
 DELIMITER //
 
 -- Trigger 1: Update resource quantities after donation insertion
@@ -17,28 +20,11 @@ BEGIN
     END IF;
 END//
 
--- Trigger 2: Validate request quantity before insertion and log insufficient resources
-CREATE TRIGGER before_request_insert
-BEFORE INSERT ON requests
-FOR EACH ROW
-BEGIN
-    DECLARE available_qty INT;
-    
-    -- Check available quantity
-    SELECT available_quantity INTO available_qty
-    FROM resources 
-    WHERE id = NEW.resource_id;
-    
-    -- Log warning if insufficient resources (for monitoring)
-    IF available_qty < NEW.quantity THEN
-        INSERT INTO system_logs (message, log_level, created_at) 
-        VALUES (CONCAT('Insufficient resources for request: Resource ', NEW.resource_id, 
-                      ', Available: ', available_qty, ', Requested: ', NEW.quantity),
-               'WARNING', NOW());
-    END IF;
-END//
+-- Requests asking for more than is in stock are logged as a warning by the
+-- application (create_request in routes/user.py), which replaces the former
+-- before_request_insert trigger and its system_logs table
 
--- Trigger 3: Update request status when admin responds
+-- Trigger 2: Update request status when admin responds
 CREATE TRIGGER after_admin_response_insert
 AFTER INSERT ON admin_responses
 FOR EACH ROW
@@ -54,14 +40,4 @@ BEGIN
     WHERE id = NEW.request_id;
 END//
 
--- System logs table for trigger logging (if not exists)
-CREATE TABLE IF NOT EXISTS system_logs (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    message TEXT NOT NULL,
-    log_level ENUM('INFO', 'WARNING', 'ERROR') DEFAULT 'INFO',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_level (log_level),
-    INDEX idx_created (created_at)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4//
-
 DELIMITER ;
\ No newline at end of file
@@ -6,6 +6,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend')))
 
 from app import create_app
+from config import Config
 from extensions import db
 from models import User
 
@@ -15,37 +16,58 @@ class TestConfig:
     WTF_CSRF_ENABLED = False
     SECRET_KEY = 'test-key'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    ADMISSION_ENDPOINT_LIMITS = Config.ADMISSION_ENDPOINT_LIMITS
+    JOB_WORKERS = 0  # tests run jobs with jobs.run_pending()
+
+def seed():
+    db.create_all()
+    
+    # Create test users
+    admin = User(name='Admin User', email='admin@disaster.org', phone='+1234567890', is_admin=True)
+    admin.set_password('password123')
+    
+    user = User(name='John Doe', email='john@example.com', phone='+1234567891')
+    user.set_password('password123')
+    
+    db.session.add(admin)
+    db.session.add(user)
+    
+    # Create test event and resource
+    from models import Event, Resource
+    event = Event(name='Test Event', description='Test Desc', latitude=0.0, longitude=0.0, severity='Medium')
+    resource = Resource(name='Water', category='Food', description='Water', total_quantity=100, available_quantity=100, unit='bottles')
+    
+    db.session.add(event)
+    db.session.add(resource)
+    db.session.commit()
 
 @pytest.fixture
 def app():
     app = create_app(TestConfig)
     
     with app.app_context():
-        db.create_all()
-        
-        # Create test users
-        admin = User(name='Admin User', email='admin@disaster.org', phone='+1234567890', is_admin=True)
-        admin.set_password('password123')
-        
-        user = User(name='John Doe', email='john@example.com', phone='+1234567891')
-        user.set_password('password123')
-        
-        db.session.add(admin)
-        db.session.add(user)
-        
-        # Create test event and resource
-        from models import Event, Resource
-        event = Event(name='Test Event', description='Test Desc', latitude=0.0, longitude=0.0, severity='Medium')
-        resource = Resource(name='Water', category='Food', description='Water', total_quantity=100, available_quantity=100, unit='bottles')
-        
-        db.session.add(event)
-        db.session.add(resource)
-        db.session.commit()
-        
+        seed()
         yield app
         db.session.remove()
         db.drop_all()
 
+@pytest.fixture
+def file_app(tmp_path):
+    """
+    The app on a SQLite file, for tests that run requests on several threads
+    (an in-memory database is one shared connection, so nothing would contend)
+    """
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        ADMISSION_CONTROL_ENABLED = False
+    
+    app = create_app(FileConfig)
+    with app.app_context():
+        seed()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
 @pytest.fixture
 def client(app):
     return app.test_client()
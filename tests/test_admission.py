@@ -0,0 +1,96 @@
+import pytest
+from extensions import db
+from models import User, Resource, Event
+from services.admission import LocalBucketBackend, AdmissionController
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_register_flood_is_shed_before_db(client, app):
+    """Test a registration flood gets 429 with Retry-After and no new users"""
+    # Freeze time: password hashing is slow enough to refill the bucket otherwise
+    app.extensions['admission'].backend = LocalBucketBackend(clock=FakeClock())
+    rate, burst = app.extensions['admission'].endpoint_limits['auth.register']
+    statuses = [client.post('/auth/register', json={
+        'name': 'Bot', 'email': f'bot{i}@example.com', 'phone': '1', 'password': 'secret123'
+    }).status_code for i in range(burst + 5)]
+    
+    assert statuses == [201] * burst + [429] * 5
+    assert User.query.filter(User.email.like('bot%')).count() == statuses.count(201)
+    
+    response = client.post('/auth/register', json={'name': 'Bot'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+def test_per_user_bucket(client, app):
+    """Test one user's burst of requests is limited without affecting reads"""
+    app.extensions['admission'].backend = LocalBucketBackend(clock=FakeClock())
+    login(client, 'john@example.com', 'password123')
+    payload = {'resource_id': Resource.query.first().id, 'event_id': Event.query.first().id, 'quantity': 1}
+    _, burst = app.extensions['admission'].user_limit
+    
+    statuses = [client.post('/user/requests', json=payload).status_code for _ in range(burst + 3)]
+    
+    assert statuses[:burst] == [201] * burst
+    assert statuses[burst:] == [429] * 3
+    assert client.get('/user/resources').status_code == 200
+
+def test_admin_endpoints_keep_reserved_headroom():
+    """Test the global reserve is only available to admins"""
+    clock = FakeClock()
+    controller = AdmissionController({'ADMISSION_GLOBAL_LIMIT': (10, 10), 'ADMISSION_ADMIN_RESERVE': 0.3,
+                                      'ADMISSION_USER_LIMIT': (100, 100)},
+                                     backend=LocalBucketBackend(clock=clock))
+    acquire = lambda endpoint, user: controller.backend.acquire(
+        controller.limits_for(endpoint, user, '10.0.0.1', is_admin=user == 'admin'))
+    
+    granted = [acquire('user.donate', f'u{i}')[0] for i in range(10)]
+    assert granted == [True] * 7 + [False] * 3
+    
+    assert acquire('admin.process_request', 'admin')[0]
+    assert acquire('admin.process_request', 'admin')[0]
+    assert acquire('admin.process_request', 'admin')[0]
+    allowed, retry_after = acquire('admin.process_request', 'admin')
+    assert not allowed and retry_after == pytest.approx(0.1)
+    
+    clock.now += 0.5
+    assert acquire('admin.process_request', 'admin')[0]
+
+def test_admin_reserve_requires_a_signed_in_admin(app):
+    """Test anonymous and regular users cannot drain the reserve through admin endpoints"""
+    controller = app.extensions['admission']
+    controller.backend = LocalBucketBackend(clock=FakeClock())
+    controller.global_limit = (10, 10)
+    controller.admin_reserve = 0.3
+    controller.ip_limit = controller.user_limit = (100, 100)
+    admin, user, anonymous = app.test_client(), app.test_client(), app.test_client()
+    login(admin, 'admin@disaster.org', 'password123')
+    login(user, 'john@example.com', 'password123')
+    
+    statuses = [anonymous.post('/admin/requests/1/action', json={}).status_code for _ in range(6)]
+    assert statuses.count(429) == 1  # 2 logins + 5 posts reach the floor of 3
+    assert user.post('/admin/requests/1/action', json={}).status_code == 429
+    assert admin.post('/admin/requests/1/action', json={}).status_code != 429
+
+def test_bucket_denial_consumes_nothing():
+    """Test a request denied by one bucket does not drain the others"""
+    clock = FakeClock()
+    backend = LocalBucketBackend(clock=clock)
+    
+    assert backend.acquire([('a', 1, 1, 0)])[0]
+    allowed, retry_after = backend.acquire([('b', 1, 5, 0), ('a', 1, 1, 0)])
+    assert not allowed and retry_after == pytest.approx(1.0)
+    
+    clock.now += 1
+    assert backend.acquire([('b', 1, 5, 0), ('a', 1, 1, 0)])[0]
+    assert backend._buckets['b'][0] == pytest.approx(4)
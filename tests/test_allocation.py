@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+from sqlalchemy import update
+from extensions import db
+from models import User, Event, Resource, Request, AdminResponse, ChangeLog, StockAlert
+from services import allocation, search
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+@pytest.fixture
+def scarce(app):
+    """60 units of water wanted three times over; the last request is the most urgent"""
+    user = User.query.filter_by(email='john@example.com').first()
+    water = Resource.query.filter_by(name='Water').first()
+    water.available_quantity = 60
+    severe = Event(name='Hurricane', latitude=0.0, longitude=0.0, severity='High')
+    db.session.add(severe)
+    db.session.flush()
+    requests = [
+        Request(user_id=user.id, resource_id=water.id, event_id=1, quantity=60, urgency='Low', status='Pending'),
+        Request(user_id=user.id, resource_id=water.id, event_id=1, quantity=60, urgency='Medium', status='Pending'),
+        Request(user_id=user.id, resource_id=water.id, event_id=severe.id, quantity=60, urgency='Critical',
+                status='Pending'),
+    ]
+    db.session.add_all(requests)
+    db.session.commit()
+    return requests
+
+def test_water_fill_is_weighted_max_min():
+    """Test shares follow weights, never exceed demand and use up the stock"""
+    group = [0, 0, 0, 1, 1]
+    demand = [10, 50, 50, 5, 5]
+    weight = [1, 1, 2, 1, 1]
+    shares, level = allocation.water_fill(group, demand, weight, [60, 100])
+    assert shares == pytest.approx([10, 50 / 3, 100 / 3, 5, 5])
+    assert np.isinf(level[1])  # enough stock: everyone fully served
+
+    rounded = allocation.round_shares(group, shares, [60, 100])
+    assert list(rounded) == [10, 17, 33, 5, 5]
+
+def test_preview_favours_urgent_requests_and_changes_nothing(client, scarce):
+    login(client, 'admin@disaster.org', 'password123')
+    response = client.get('/admin/allocation')
+    assert response.status_code == 200
+    plan = response.json
+    shares = {r['id']: r['allocated'] for r in plan['requests']}
+    low, medium, critical = (shares[r.id] for r in scarce)
+    assert low + medium + critical == 60
+    assert critical > medium > low
+    assert plan['resources'][0]['requested'] == 180
+    assert Request.query.filter_by(status='Pending').count() == 3
+    assert Resource.query.filter_by(name='Water').first().available_quantity == 60
+
+def test_apply_approves_in_one_transaction(client, scarce):
+    login(client, 'admin@disaster.org', 'password123')
+    plan = client.get('/admin/allocation').json
+    shares = {r['id']: r['allocated'] for r in plan['requests']}
+
+    response = client.post('/admin/allocation/apply', json={'token': plan['token']})
+    assert response.status_code == 200
+    assert response.json['approved'] == 3
+    assert response.json['partial'] == 3
+
+    for request_obj in scarce:
+        db.session.refresh(request_obj)
+        assert request_obj.status == 'Approved'
+        assert request_obj.quantity == 60  # what was asked is kept
+        assert request_obj.approved_quantity == shares[request_obj.id]
+    assert Resource.query.filter_by(name='Water').first().available_quantity == 0
+    assert [alert.status for alert in StockAlert.query.all()] == ['Out of Stock']
+    comments = [r.comment for r in AdminResponse.query.all()]
+    assert all('of 60 requested' in comment for comment in comments)
+    # Written in bulk, but still visible to sync clients and search
+    assert ChangeLog.query.filter_by(table_name='requests').count() >= 3
+    assert len(search.search('partially allocated')) == 3
+
+def test_apply_rejects_a_stale_preview(client, scarce):
+    login(client, 'admin@disaster.org', 'password123')
+    plan = client.get('/admin/allocation').json
+
+    Resource.query.filter_by(name='Water').first().available_quantity = 30
+    db.session.commit()
+
+    response = client.post('/admin/allocation/apply', json={'token': plan['token']})
+    assert response.status_code == 409
+    assert Request.query.filter_by(status='Pending').count() == 3
+    assert AdminResponse.query.count() == 0
+
+def test_apply_rejects_a_malformed_resource_id(client, scarce):
+    login(client, 'admin@disaster.org', 'password123')
+    plan = client.get('/admin/allocation').json
+    for resource_id in ('water', ['1']):
+        response = client.post('/admin/allocation/apply', json={'token': plan['token'], 'resource_id': resource_id})
+        assert response.status_code == 400
+    assert Request.query.filter_by(status='Pending').count() == 3
+
+def test_apply_never_oversells_after_a_racing_approval(file_app, monkeypatch):
+    """Test stock taken by an approval committed after the plan's reads is not overwritten"""
+    water = Resource.query.filter_by(name='Water').first()
+    water.available_quantity = 60
+    db.session.add_all([Request(user_id=2, resource_id=water.id, event_id=1, quantity=60, status='Pending')
+                        for _ in range(2)])
+    db.session.commit()
+    token = allocation.plan()['token']
+    
+    read_inputs = allocation._inputs
+    def racing_inputs(*args, **kwargs):
+        inputs = read_inputs(*args, **kwargs)
+        # Another admin's approval commits on its own connection in between
+        with db.engine.begin() as connection:
+            connection.execute(update(Resource).where(Resource.id == water.id)
+                               .values(available_quantity=Resource.available_quantity - 50))
+        return inputs
+    monkeypatch.setattr(allocation, '_inputs', racing_inputs)
+    
+    with pytest.raises(allocation.StalePlan):
+        allocation.apply(1, token)
+    db.session.expire_all()
+    assert db.session.get(Resource, water.id).available_quantity == 10
+    assert Request.query.filter_by(status='Pending').count() == 2
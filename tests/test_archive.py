@@ -0,0 +1,126 @@
+import pytest
+from datetime import datetime, timedelta
+from extensions import db
+from models import (User, Event, Resource, Donation, Request, AdminResponse, VolunteerAssignment,
+                    RequestContribution, EventArchive, RequestArchive, DonationArchive, AdminResponseArchive)
+from services import archive
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+@pytest.fixture
+def history(app):
+    """A resolved event with a full request lifecycle, plus the live seeded event"""
+    user = User.query.filter_by(email='john@example.com').first()
+    admin = User.query.filter_by(email='admin@disaster.org').first()
+    resource = Resource.query.first()
+    
+    resolved = Event(name='Old Flood', latitude=1.0, longitude=1.0, status='Resolved')
+    db.session.add(resolved)
+    db.session.flush()
+    
+    request_obj = Request(user_id=user.id, resource_id=resource.id, event_id=resolved.id, quantity=3, status='Fulfilled')
+    db.session.add(request_obj)
+    db.session.add(Donation(user_id=user.id, resource_id=resource.id, event_id=resolved.id, quantity=7))
+    db.session.flush()
+    db.session.add(AdminResponse(request_id=request_obj.id, admin_id=admin.id, action='Approved', comment='ok'))
+    db.session.add(VolunteerAssignment(user_id=user.id, request_id=request_obj.id, status='Completed'))
+    db.session.commit()
+    return resolved.id, request_obj.id
+
+def test_archive_moves_closed_event_tree(app, history):
+    """Test a resolved event and all its rows leave the hot tables"""
+    event_id, request_id = history
+    
+    moved = archive.archive_closed_events(batch_size=1)
+    
+    assert moved == {'admin_responses': 1, 'volunteer_assignments': 1, 'request_contributions': 0,
+                     'requests': 1, 'donations': 1, 'events': 1}
+    assert db.session.get(Event, event_id) is None
+    assert Request.query.filter_by(event_id=event_id).count() == 0
+    assert db.session.get(EventArchive, event_id).status == 'Resolved'
+    assert db.session.get(RequestArchive, request_id).status == 'Fulfilled'
+    assert DonationArchive.query.filter_by(event_id=event_id).count() == 1
+    assert AdminResponseArchive.query.filter_by(request_id=request_id).one().comment == 'ok'
+    
+    # The active seeded event is untouched and a second run has nothing to do
+    assert Event.query.filter_by(status='Active').count() == 1
+    assert archive.archive_closed_events() == {}
+
+def test_archive_closed_requests_respects_retention(app):
+    """Test closed requests of active events are archived only after the retention window"""
+    user = User.query.filter_by(email='john@example.com').first()
+    event = Event.query.first()
+    resource = Resource.query.first()
+    old = datetime.utcnow() - timedelta(days=60)
+    db.session.add_all([
+        Request(user_id=user.id, resource_id=resource.id, event_id=event.id, quantity=1, status='Rejected', updated_at=old),
+        Request(user_id=user.id, resource_id=resource.id, event_id=event.id, quantity=1, status='Rejected'),
+        Request(user_id=user.id, resource_id=resource.id, event_id=event.id, quantity=1, status='Pending', updated_at=old),
+    ])
+    db.session.commit()
+    
+    moved = archive.archive_closed_requests(older_than_days=30)
+    
+    assert moved['requests'] == 1
+    assert Request.query.count() == 2
+
+def test_archived_rows_stay_readable(client, app, history):
+    """Test request details and event history read through to the archive"""
+    event_id, request_id = history
+    archive.archive_closed_events()
+    
+    login(client, 'john@example.com', 'password123')
+    response = client.get(f'/user/requests/{request_id}')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['archived'] is True
+    assert data['event_name'] == 'Old Flood'
+    assert data['response']['admin_name'] == 'Admin User'
+    
+    client.get('/auth/logout')
+    login(client, 'admin@disaster.org', 'password123')
+    response = client.get(f'/admin/history/events/{event_id}')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['archived'] is True
+    assert [req['id'] for req in data['requests']] == [request_id]
+    assert len(data['donations']) == 1
+
+def test_archived_ids_are_not_reused(app, history):
+    """Test new rows never take the id of an archived max-id row, so archiving again works"""
+    event_id, request_id = history
+    archive.archive_closed_events()
+    
+    event = Event(name='New Storm', latitude=2.0, longitude=2.0, status='Resolved')
+    db.session.add(event)
+    db.session.flush()
+    request_obj = Request(user_id=2, resource_id=1, event_id=event.id, quantity=1, status='Rejected')
+    db.session.add(request_obj)
+    db.session.commit()
+    assert event.id > event_id and request_obj.id > request_id
+    
+    assert archive.archive_closed_events()['requests'] == 1
+    assert db.session.get(RequestArchive, request_id).event_id == event_id
+
+def test_archived_coalesced_request_is_visible_to_contributors(client, app, history):
+    """Test a contributor still sees a coalesced request once it is archived"""
+    event_id, request_id = history
+    db.session.add_all([RequestContribution(request_id=request_id, user_id=1, quantity=2, status='Fulfilled'),
+                        RequestContribution(request_id=request_id, user_id=2, quantity=1, status='Fulfilled')])
+    db.session.commit()
+    archive.archive_closed_events()
+    
+    login(client, 'admin@disaster.org', 'password123')
+    data = client.get(f'/user/requests/{request_id}').get_json()
+    assert data['archived'] is True
+    assert (data['contributors'], data['your_quantity']) == (2, 2)
+
+def test_archive_cli(app, runner, history):
+    """Test the flask archive command"""
+    result = runner.invoke(args=['archive', '--batch-size', '10'])
+    assert 'Archived closed events' in result.output
+    assert EventArchive.query.count() == 1
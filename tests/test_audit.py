@@ -0,0 +1,105 @@
+import pytest
+from extensions import db
+from models import User, Request, AuditLog
+from services import audit
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+def submit_request(client, quantity=10):
+    login(client, 'john@example.com', 'password123')
+    response = client.post('/user/requests', json={'resource_id': 1, 'event_id': 1, 'quantity': quantity})
+    assert response.status_code == 201
+    client.get('/auth/logout')
+    return response.get_json()['request_id']
+
+def test_transitions_are_audited_with_actor(client, app):
+    request_id = submit_request(client)
+    login(client, 'admin@disaster.org', 'password123')
+    assert client.post(f'/admin/requests/{request_id}/action', json={'action': 'approve'}).status_code == 200
+
+    john = User.query.filter_by(email='john@example.com').first()
+    admin = User.query.filter_by(email='admin@disaster.org').first()
+    trail = audit.history('requests', request_id)  # newest first
+    assert [(e['action'], e['actor_id']) for e in trail] == [('update', admin.id), ('create', john.id)]
+    assert trail[1]['after'] == {'status': 'Pending', 'quantity': 10, 'approved_quantity': None, 'urgency': 'Medium'}
+    assert trail[0]['before'] == {'status': 'Pending', 'approved_quantity': None}
+    assert trail[0]['after'] == {'status': 'Approved', 'approved_quantity': 10}
+
+def test_entries_are_buffered_and_written_in_batches(client, app):
+    buffer = audit.get_buffer(app)
+    audit.flush()  # the fixture's users and event
+    written = AuditLog.query.count()
+    submit_request(client)
+    submit_request(client)
+    # Committed, but not yet written: no INSERT on the request path
+    assert len(buffer) == 2
+    assert AuditLog.query.count() == written
+
+    assert audit.flush() == 2
+    assert len(buffer) == 0
+    assert AuditLog.query.count() == written + 2
+
+def test_full_batch_is_written_by_the_committing_request(client, app):
+    buffer = audit.get_buffer(app)
+    audit.flush()
+    written = AuditLog.query.count()
+    buffer.batch_size = 3
+    for _ in range(2):
+        submit_request(client)
+    assert len(buffer) == 2
+    submit_request(client)
+    assert len(buffer) == 0
+    assert AuditLog.query.count() == written + 3
+
+def test_rolled_back_changes_are_not_audited(app):
+    audit.flush()
+    request_obj = Request(user_id=2, resource_id=1, event_id=1, quantity=5)
+    db.session.add(request_obj)
+    db.session.flush()
+    db.session.rollback()
+    assert len(audit.get_buffer(app)) == 0
+
+def test_volunteer_claim_and_completion(client, app):
+    request_id = submit_request(client)
+    db.session.get(Request, request_id).status = 'Approved'
+    volunteer = User(name='Vera Volunteer', email='volunteer@example.com', phone='+1234567893', is_volunteer=True)
+    volunteer.set_password('password123')
+    db.session.add(volunteer)
+    db.session.commit()
+
+    login(client, 'volunteer@example.com', 'password123')
+    client.post(f'/volunteer/tasks/{request_id}/accept')
+    client.post('/volunteer/tasks/1/complete')
+    trail = audit.history('volunteer_assignments', 1)
+    assert [e['action'] for e in trail] == ['update', 'create']
+    assert trail[1]['actor_id'] == volunteer.id
+    assert trail[0]['before']['status'] == 'In Progress'
+    assert trail[0]['after']['status'] == 'Completed'
+
+def test_shortfall_is_logged_not_audited(client, app, caplog):
+    request_id = submit_request(client, quantity=500)
+    assert audit.history('resources', 1) == []
+    assert f'Shortfall on resource 1: request {request_id} asks for 500, 100 available' in caplog.text
+
+def test_history_pages_back_from_the_newest(client, app):
+    ids = [submit_request(client) for _ in range(5)]
+    login(client, 'admin@disaster.org', 'password123')
+    first = client.get('/admin/audit?table=requests&limit=3').get_json()
+    assert [e['row_id'] for e in first['entries']] == ids[:1:-1]
+    second = client.get(f"/admin/audit?table=requests&limit=3&before={first['next']}").get_json()
+    assert [e['row_id'] for e in second['entries']] == ids[1::-1]
+    assert second['next'] is None
+
+def test_audit_endpoint_filters(client, app):
+    request_id = submit_request(client)
+    login(client, 'admin@disaster.org', 'password123')
+    response = client.get(f'/admin/audit?table=requests&row_id={request_id}')
+    assert response.status_code == 200
+    assert [e['action'] for e in response.get_json()['entries']] == ['create']
+    assert client.get('/admin/audit?since=2000-01-01T00:00:00').get_json()['entries']
+    assert client.get('/admin/audit?since=2999-01-01').get_json()['entries'] == []
+    assert client.get('/admin/audit?since=yesterday').status_code == 400
@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+from extensions import db
+from models import User, Event, Resource, Request, RequestContribution, ChangeLog
+from services import coalescing
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+@pytest.fixture
+def coalescing_on(app):
+    app.config['REQUEST_COALESCING_ENABLED'] = True
+    jane = User(name='Jane Roe', email='jane@example.com', phone='+1234567892')
+    jane.set_password('password123')
+    db.session.add(jane)
+    db.session.commit()
+    return app
+
+def submit(client, email, quantity, urgency='Medium', resource_id=1):
+    client.get('/auth/logout')
+    login(client, email, 'password123')
+    response = client.post('/user/requests', json={
+        'resource_id': resource_id, 'event_id': 1, 'quantity': quantity, 'urgency': urgency
+    })
+    assert response.status_code == 201
+    return response.get_json()
+
+def test_duplicate_demand_folds_into_one_request(client, coalescing_on):
+    """Test a second request for the same event and resource joins the open one"""
+    first = submit(client, 'john@example.com', 10)
+    second = submit(client, 'jane@example.com', 5, urgency='Critical')
+    assert first['coalesced'] is False
+    assert second['coalesced'] is True
+    assert second['request_id'] == first['request_id']
+
+    aggregate = db.session.get(Request, first['request_id'])
+    assert aggregate.quantity == 15
+    assert aggregate.urgency == 'Critical'
+    assert Request.query.filter_by(status='Pending').count() == 1
+    assert sorted(c.quantity for c in aggregate.contributions) == [5, 10]
+
+    # Both contributors can see it, each with their own share
+    details = client.get(f"/user/requests/{first['request_id']}").get_json()
+    assert details['contributors'] == 2
+    assert details['your_quantity'] == 5
+
+def test_other_resources_and_closed_requests_are_not_folded(client, coalescing_on):
+    db.session.add(Resource(name='Blankets', category='Shelter', total_quantity=50, available_quantity=50))
+    db.session.commit()
+    first = submit(client, 'john@example.com', 10)
+    other = submit(client, 'jane@example.com', 5, resource_id=2)
+    assert other['request_id'] != first['request_id']
+
+    db.session.get(Request, first['request_id']).status = 'Rejected'
+    db.session.commit()
+    again = submit(client, 'jane@example.com', 5)
+    assert again['coalesced'] is False
+    assert again['request_id'] != first['request_id']
+
+def test_status_changes_fan_out_to_contributions(client, coalescing_on):
+    first = submit(client, 'john@example.com', 10)
+    submit(client, 'jane@example.com', 5)
+
+    client.get('/auth/logout')
+    login(client, 'admin@disaster.org', 'password123')
+    response = client.post(f"/admin/requests/{first['request_id']}/action", json={'action': 'approve'})
+    assert response.status_code == 200
+    # One approval serves both users
+    assert Resource.query.first().available_quantity == 85
+    assert [c.status for c in RequestContribution.query.all()] == ['Approved', 'Approved']
+    jane = User.query.filter_by(email='jane@example.com').first()
+    assert ChangeLog.query.filter_by(table_name='request_contributions', user_id=jane.id).count() >= 2
+
+def test_fan_out_after_bulk_writes(app, coalescing_on):
+    user = User.query.filter_by(email='john@example.com').first()
+    request_obj, contribution, coalesced = coalescing.submit(user.id, 1, 1, 10)
+    db.session.commit()
+
+    db.session.execute(db.update(Request).where(Request.id == request_obj.id).values(status='Rejected'))
+    assert coalescing.fan_out(db.session, Request.id == request_obj.id) == 1
+    db.session.commit()
+    db.session.refresh(contribution)
+    assert contribution.status == 'Rejected'
+
+def test_disabled_by_default(client):
+    first = submit(client, 'john@example.com', 10)
+    second = submit(client, 'john@example.com', 10)
+    assert second['coalesced'] is False
+    assert second['request_id'] != first['request_id']
+    assert 'contribution_id' not in second
+    assert RequestContribution.query.count() == 0
+
+def test_concurrent_submits_fold_into_one_aggregate(file_app):
+    """Test simultaneous duplicate requests lose no demand and open one aggregate"""
+    file_app.config['REQUEST_COALESCING_ENABLED'] = True
+    for i in range(8):
+        user = User(name=f'Submitter {i}', email=f'submitter{i}@example.com', phone='+1000')
+        user.set_password('password123')
+        db.session.add(user)
+    db.session.commit()
+    
+    start = threading.Barrier(8)
+    statuses = []
+    
+    def submitter(i):
+        with file_app.app_context():
+            client = file_app.test_client()
+            login(client, f'submitter{i}@example.com', 'password123')
+            start.wait()
+            for quantity in (1, 2, 3, 4, 5):
+                statuses.append(client.post('/user/requests', json={
+                    'resource_id': 1, 'event_id': 1, 'quantity': quantity + i}).status_code)
+            db.session.remove()
+    
+    threads = [threading.Thread(target=submitter, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert statuses == [201] * 40
+    db.session.expire_all()
+    aggregates = Request.query.filter_by(status='Pending').all()
+    assert len(aggregates) == 1
+    contributions = RequestContribution.query.all()
+    assert len(contributions) == 40
+    assert aggregates[0].quantity == sum(c.quantity for c in contributions) == 8 * 15 + 5 * 28
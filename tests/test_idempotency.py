@@ -0,0 +1,177 @@
+import threading
+import time
+import pytest
+from flask import jsonify
+from extensions import db
+from models import User, Resource, Donation, Request, Event
+from app import create_app
+from services.idempotency import IdempotencyStore, DatabaseIdempotencyStore, idempotent
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+def test_donation_replay_applies_once(client, app):
+    """Test a retried donation returns the original response and donates once"""
+    login(client, 'john@example.com', 'password123')
+    resource_id = Resource.query.first().id
+    payload = {'resource_id': resource_id, 'quantity': 10, 'notes': 'retry me'}
+    headers = {'Idempotency-Key': 'donation-1'}
+    
+    first = client.post('/user/donate', json=payload, headers=headers)
+    second = client.post('/user/donate', json=payload, headers=headers)
+    
+    assert first.status_code == second.status_code == 201
+    assert second.get_json()['donation_id'] == first.get_json()['donation_id']
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert Donation.query.count() == 1
+    assert db.session.get(Resource, resource_id).total_quantity == 110
+
+def _multipart(boundary, fields):
+    body = ''.join(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                   for name, value in fields.items()) + f'--{boundary}--\r\n'
+    return body.encode(), f'multipart/form-data; boundary={boundary}'
+
+def test_form_retry_with_new_boundary_is_replayed(client, app):
+    """Test a FormData retry (fresh multipart boundary, same fields) gets the stored response"""
+    login(client, 'john@example.com', 'password123')
+    fields = {'resource_id': Resource.query.first().id, 'quantity': 10}
+    headers = {'Idempotency-Key': 'form-1'}
+    responses = []
+    for boundary in ('----WebKitFormBoundaryAAAA', '----WebKitFormBoundaryBBBB'):
+        body, content_type = _multipart(boundary, fields)
+        responses.append(client.post('/user/donate', data=body, content_type=content_type, headers=headers))
+    
+    assert [r.status_code for r in responses] == [201, 201]
+    assert responses[1].headers['Idempotent-Replayed'] == 'true'
+    assert Donation.query.count() == 1
+
+def test_database_store_is_shared_between_processes(tmp_path):
+    """Test a retry reaching another worker (its own app and store) is replayed from the database"""
+    class SharedConfig:
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'shared.db'}"
+        SECRET_KEY = 'test-key'
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        IDEMPOTENCY_STORE = 'database'
+    workers = [create_app(SharedConfig), create_app(SharedConfig)]
+    with workers[0].app_context():
+        db.create_all()
+        user = User(name='John Doe', email='john@example.com', phone='+1234567891')
+        user.set_password('password123')
+        db.session.add_all([user, Resource(name='Water', category='Food', total_quantity=100, available_quantity=100)])
+        db.session.commit()
+        db.session.remove()
+    
+    responses = []
+    for worker in workers:
+        worker_client = worker.test_client()
+        login(worker_client, 'john@example.com', 'password123')
+        responses.append(worker_client.post('/user/donate', json={'resource_id': 1, 'quantity': 5},
+                                            headers={'Idempotency-Key': 'shared-1'}))
+    
+    assert [r.status_code for r in responses] == [201, 201]
+    assert responses[1].headers['Idempotent-Replayed'] == 'true'
+    assert responses[1].get_json() == responses[0].get_json()
+    with workers[1].app_context():
+        assert Donation.query.count() == 1
+        db.session.remove()
+
+def test_request_key_reuse_with_different_payload(client, app):
+    """Test reusing a key for a different request body is refused"""
+    login(client, 'john@example.com', 'password123')
+    payload = {'resource_id': Resource.query.first().id, 'event_id': Event.query.first().id, 'quantity': 5}
+    headers = {'Idempotency-Key': 'request-1'}
+    
+    assert client.post('/user/requests', json=payload, headers=headers).status_code == 201
+    payload['quantity'] = 50
+    assert client.post('/user/requests', json=payload, headers=headers).status_code == 422
+    assert Request.query.count() == 1
+
+def test_keys_are_scoped_per_user(client, app):
+    """Test two users sending the same key both get their own donation"""
+    resource_id = Resource.query.first().id
+    headers = {'Idempotency-Key': 'same-key'}
+    
+    login(client, 'john@example.com', 'password123')
+    client.post('/user/donate', json={'resource_id': resource_id, 'quantity': 1}, headers=headers)
+    client.get('/auth/logout')
+    login(client, 'admin@disaster.org', 'password123')
+    client.post('/user/donate', json={'resource_id': resource_id, 'quantity': 1}, headers=headers)
+    
+    assert Donation.query.count() == 2
+
+def test_concurrent_duplicates_run_view_once(app):
+    """Test concurrent duplicate submissions execute the view exactly once"""
+    calls = []
+    
+    @app.route('/test/slow-write', methods=['POST'])
+    @idempotent
+    def slow_write():
+        calls.append(1)
+        time.sleep(0.2)
+        return jsonify({'write': len(calls)}), 201
+    
+    results = []
+    def submit():
+        response = app.test_client().post('/test/slow-write', json={'x': 1},
+                                          headers={'Idempotency-Key': 'dup'})
+        results.append((response.status_code, response.get_json()))
+    
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert results == [(201, {'write': 1})] * 8
+
+def test_store_ttl_and_capacity_eviction():
+    """Test the key store drops expired and overflowing finished keys"""
+    store = IdempotencyStore(ttl=0.05, max_entries=2)
+    for key in 'abc':
+        entry, owner = store.begin(key, 'fp')
+        assert owner
+        store.complete(key, entry, (201, b'{}', 'application/json'))
+    store.begin('d', 'fp')
+    assert len(store) == 2
+    
+    time.sleep(0.06)
+    entry, owner = store.begin('a', 'fp')
+    assert owner
+    assert len(store) == 1
+
+def test_claim_of_a_dead_worker_lapses(app):
+    """Test a key whose first request never finished is taken over once its lease has passed"""
+    store = DatabaseIdempotencyStore(lease=0.2)
+    key = ('2', 'user.donate', 'crashed')
+    dead, owner = store.begin(key, 'fp')
+    assert owner
+    assert store.begin(key, 'fp')[1] is False
+    
+    time.sleep(0.3)
+    retry, owner = store.begin(key, 'fp')
+    assert owner
+    # The dead claim can no longer store its response over the retry's
+    store.complete(key, dead, (201, b'stale', 'application/json'))
+    store.complete(key, retry, (201, b'fresh', 'application/json'))
+    assert store.wait(key, retry, 0) == (201, b'fresh', 'application/json')
+
+def test_response_is_returned_when_it_cannot_be_stored(client, app, monkeypatch):
+    """Test a committed write still answers 201 if storing its response fails, and the key lapses"""
+    store = app.extensions['idempotency'] = DatabaseIdempotencyStore(lease=0.2)
+    def broken(key, entry, response):
+        raise RuntimeError('database went away')
+    monkeypatch.setattr(store, 'complete', broken)
+    
+    login(client, 'john@example.com', 'password123')
+    payload = {'resource_id': Resource.query.first().id, 'quantity': 1}
+    headers = {'Idempotency-Key': 'unstored'}
+    assert client.post('/user/donate', json=payload, headers=headers).status_code == 201
+    
+    time.sleep(0.3)
+    assert store.begin((str(User.query.filter_by(email='john@example.com').first().id), 'user.donate', 'unstored'),
+                       'fp')[1] is True
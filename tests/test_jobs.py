@@ -0,0 +1,167 @@
+import time
+import pytest
+from datetime import datetime, timedelta
+from extensions import db
+from models import User, Event, Resource, Request, VolunteerAssignment, Job
+from services import jobs
+
+calls = []
+
+@jobs.task('test.record')
+def record(payload):
+    calls.append(payload)
+    db.session.add(Event(name=payload['name'], latitude=0.0, longitude=0.0))
+
+@jobs.task('test.fail')
+def fail(payload):
+    db.session.add(Event(name='Should roll back', latitude=0.0, longitude=0.0))
+    raise RuntimeError('boom')
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+def test_jobs_follow_the_enqueuing_transaction(app):
+    """Test a job exists only if the write that enqueued it commits"""
+    jobs.enqueue('test.record', {'name': 'Rolled back'})
+    db.session.rollback()
+    assert Job.query.count() == 0
+    
+    jobs.enqueue('test.record', {'name': 'Flood'})
+    db.session.commit()
+    assert Job.query.one().status == jobs.QUEUED
+    
+    assert jobs.run_pending() == 1
+    job = Job.query.one()
+    assert (job.status, job.attempts) == (jobs.DONE, 1)
+    assert calls == [{'name': 'Flood'}]
+    assert Event.query.filter_by(name='Flood').count() == 1
+    assert jobs.run_pending() == 0
+
+def test_failures_retry_with_backoff_then_fail(app):
+    """Test failed jobs roll back their writes, back off and give up after max attempts"""
+    job = jobs.enqueue('test.fail', max_attempts=2)
+    db.session.commit()
+    job_id = job.id
+    
+    assert jobs.run_pending() == 1
+    job = db.session.get(Job, job_id)
+    assert job.status == jobs.QUEUED
+    assert job.run_at > datetime.utcnow()
+    assert 'boom' in job.last_error
+    assert Event.query.filter_by(name='Should roll back').count() == 0
+    assert jobs.run_pending() == 0  # not due yet
+    
+    job.run_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert jobs.run_pending() == 1
+    assert db.session.get(Job, job_id).status == jobs.FAILED
+
+def test_backoff_grows_and_is_capped():
+    """Test exponential backoff with jitter"""
+    assert 1 <= jobs.backoff_seconds(1, base=2) <= 2
+    assert 8 <= jobs.backoff_seconds(4, base=2) <= 16
+    assert jobs.backoff_seconds(30, base=2, cap=600) <= 600
+
+def test_expired_lease_is_reclaimed(app):
+    """Test a job whose worker died is run again (at-least-once)"""
+    jobs.enqueue('test.record', {'name': 'Retry me'})
+    db.session.commit()
+    claimed = jobs.claim('dead-worker', lease_seconds=60)
+    assert claimed.status == jobs.RUNNING
+    assert jobs.claim('other-worker') is None
+    
+    claimed.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert jobs.run_pending('other-worker') == 1
+    job = Job.query.one()
+    assert (job.status, job.attempts, job.locked_by) == (jobs.DONE, 2, 'other-worker')
+
+def test_complete_task_propagates_in_background(client, app):
+    """Test volunteer completion marks the request Fulfilled via a job"""
+    user = User.query.filter_by(email='john@example.com').first()
+    user.is_volunteer = True
+    request_obj = Request(user_id=user.id, resource_id=Resource.query.first().id,
+                          event_id=Event.query.first().id, quantity=1, status='Approved')
+    db.session.add(request_obj)
+    db.session.flush()
+    assignment = VolunteerAssignment(user_id=user.id, request_id=request_obj.id, status='In Progress')
+    db.session.add(assignment)
+    db.session.commit()
+    
+    login(client, 'john@example.com', 'password123')
+    client.post(f'/volunteer/tasks/{assignment.id}/complete')
+    assert assignment.status == 'Completed'
+    assert Job.query.filter_by(name='volunteer.propagate_completion').count() == 1
+    assert request_obj.status == 'Approved'
+    
+    jobs.run_pending()
+    db.session.expire_all()
+    assert db.session.get(Request, request_obj.id).status == 'Fulfilled'
+
+def test_queue_stats_endpoint(client, app):
+    """Test queue depth and latency metrics"""
+    jobs.enqueue('test.record', {'name': 'A'})
+    jobs.enqueue('test.record', {'name': 'B'})
+    db.session.commit()
+    jobs.run_pending(limit=1)
+    
+    login(client, 'admin@disaster.org', 'password123')
+    stats = client.get('/admin/jobs').get_json()
+    assert stats['depth'] == {'queued': 1, 'running': 0, 'done': 1, 'failed': 0}
+    assert stats['latency']['completed'] == 1
+    assert 'wait_p50_ms' in stats['latency']
+
+def test_worker_pool_runs_jobs_after_commit(tmp_path):
+    """Test in-process workers pick up committed jobs (file database shared by threads)"""
+    from app import create_app
+    
+    class PoolConfig:
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'jobs.db'}"
+        SECRET_KEY = 'test-key'
+        JOB_WORKERS = 2
+        JOB_POLL_INTERVAL = 0.05
+    
+    app = create_app(PoolConfig)
+    with app.app_context():
+        db.create_all()
+        for name in ('One', 'Two', 'Three'):
+            jobs.enqueue('test.record', {'name': name})
+        db.session.commit()
+        
+        deadline = time.time() + 5
+        while Job.query.filter_by(status=jobs.DONE).count() < 3 and time.time() < deadline:
+            time.sleep(0.05)
+            db.session.rollback()
+        assert Job.query.filter_by(status=jobs.DONE).count() == 3
+        assert sorted(call['name'] for call in calls) == ['One', 'Three', 'Two']
+        
+        app.extensions['jobs']['pool'].stop()
+        db.session.remove()
+        db.engine.dispose()
+
+def test_jobs_without_workers_are_flagged(app, caplog):
+    """Test a process without job workers warns once, and in-memory databases refuse them"""
+    from app import create_app
+    
+    jobs.enqueue('test.record', {'name': 'A'})
+    db.session.commit()
+    jobs.enqueue('test.record', {'name': 'B'})
+    db.session.commit()
+    assert sum('JOB_WORKERS=0' in record.message for record in caplog.records) == 1
+    
+    class ThreadedMemoryConfig:
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+        SECRET_KEY = 'test-key'
+        JOB_WORKERS = 2
+    
+    with pytest.raises(RuntimeError, match='JOB_WORKERS'):
+        create_app(ThreadedMemoryConfig)
@@ -0,0 +1,177 @@
+import os
+import re
+import shutil
+import pytest
+from sqlalchemy import event as sa_event, select, text
+from extensions import db
+from models import User, Donation, Request
+from services import indexes
+
+SCHEMA_SQL = os.path.join(os.path.dirname(__file__), '..', 'sql', 'schema.sql')
+
+# Tables some views list whole by design (no WHERE): the catalogue and the
+# events on the admin dashboard and full sync snapshots. Any filtered or
+# limited read of them, and any full read of another table, must use an index.
+WHOLE_TABLE_READS = {'resources', 'events'}
+
+# (user, method, path, json) for the blueprints' hot paths
+HOT_PATHS = [
+    ('john@example.com', 'GET', '/user/dashboard', None),
+    ('john@example.com', 'GET', '/user/events', None),
+    ('john@example.com', 'GET', '/user/events/map', None),
+    ('john@example.com', 'GET', '/user/events/1', None),
+    ('john@example.com', 'GET', '/user/resources', None),
+    ('john@example.com', 'GET', '/user/requests/1', None),
+    ('john@example.com', 'POST', '/user/requests', {'resource_id': 1, 'event_id': 1, 'quantity': 2}),
+    ('john@example.com', 'POST', '/user/donate', {'resource_id': 1, 'event_id': 1, 'quantity': 2}),
+    ('john@example.com', 'GET', '/sync', None),
+    ('john@example.com', 'GET', '/sync?since=0', None),
+    ('john@example.com', 'GET', '/search?q=water', None),
+    ('admin@disaster.org', 'GET', '/admin/dashboard', None),
+    ('admin@disaster.org', 'GET', '/admin/requests?status=Pending', None),
+    ('admin@disaster.org', 'GET', '/admin/stats', None),
+    ('admin@disaster.org', 'GET', '/admin/forecast', None),
+    ('admin@disaster.org', 'GET', '/admin/allocation', None),
+    ('admin@disaster.org', 'GET', '/admin/alerts', None),
+    ('admin@disaster.org', 'GET', '/admin/history/events/1', None),
+    ('admin@disaster.org', 'GET', '/admin/audit?table=requests&row_id=1', None),
+    ('admin@disaster.org', 'GET', '/admin/audit?actor_id=1', None),
+    ('admin@disaster.org', 'GET', '/admin/audit?since=2000-01-01T00:00:00', None),
+    ('admin@disaster.org', 'GET', '/admin/audit?since=2000-01-01T00:00:00&before=1000', None),
+    ('admin@disaster.org', 'POST', '/admin/requests/2/action', {'action': 'approve'}),
+    ('volunteer@example.com', 'GET', '/volunteer/dashboard', None),
+    ('volunteer@example.com', 'GET', '/volunteer/routes/plan?lat=0&lon=0', None),
+    ('volunteer@example.com', 'POST', '/volunteer/tasks/1/accept', None),
+    ('volunteer@example.com', 'POST', '/volunteer/tasks/1/complete', None),
+]
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+@pytest.fixture
+def workload(app):
+    volunteer = User(name='Vera Volunteer', email='volunteer@example.com', phone='+1234567893', is_volunteer=True)
+    volunteer.set_password('password123')
+    db.session.add(volunteer)
+    db.session.add_all([
+        Request(user_id=2, resource_id=1, event_id=1, quantity=5, status='Approved'),
+        Request(user_id=2, resource_id=1, event_id=1, quantity=5, status='Pending'),
+        Donation(user_id=2, resource_id=1, event_id=1, quantity=10),
+    ])
+    db.session.commit()
+    return app
+
+@pytest.fixture
+def statements(app):
+    """SELECT statements (with their parameters) run while the test is active"""
+    seen = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and not executemany:
+            seen.append((statement, parameters))
+
+    sa_event.listen(db.engine, 'before_cursor_execute', capture)
+    yield seen
+    sa_event.remove(db.engine, 'before_cursor_execute', capture)
+
+def _allowed(statement, table):
+    return table in WHOLE_TABLE_READS and not re.search(r'\b(WHERE|LIMIT)\b', statement)
+
+def test_hot_queries_do_not_scan_tables(client, workload, statements):
+    """Test every query behind the hot paths is served by an index"""
+    ran = {}
+    for email, method, path, body in HOT_PATHS:
+        client.get('/auth/logout')
+        login(client, email, 'password123')
+        del statements[:]
+        response = client.open(path, method=method, json=body)
+        assert response.status_code < 400, (path, response.status_code)
+        for statement, parameters in statements:
+            ran.setdefault(statement, (path, parameters))
+
+    connection = db.session.connection()
+    failures = []
+    for statement, (path, parameters) in ran.items():
+        scanned = [table for table in indexes.full_scans(connection, statement, parameters)
+                   if not _allowed(statement, table)]
+        if scanned:
+            failures.append(f"{path}: full scan of {', '.join(scanned)} in\n    {' '.join(statement.split())}")
+    assert not failures, '\n'.join(failures)
+
+def test_full_scans_are_detected(app):
+    connection = db.session.connection()
+    assert indexes.full_scans(connection, 'SELECT * FROM donations WHERE quantity > ?', (1,)) == ['donations']
+    assert indexes.full_scans(connection, 'SELECT * FROM donations WHERE user_id = ?', (1,)) == []
+
+def test_admin_queue_is_read_in_index_order(app):
+    """Test the pending queue needs no sort: (status, created_at) index"""
+    query = select(Request).filter_by(status='Pending').order_by(Request.created_at.desc()).limit(10)
+    sql = str(query.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    plan = [row[-1] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+    assert any('idx_requests_status_created' in step for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+def test_model_indexes_match_schema_sql(app):
+    """Test create_all and sql/schema.sql build the same indexes"""
+    with open(SCHEMA_SQL, encoding='utf-8') as f:
+        schema = indexes.schema_indexes(f.read())
+    models = indexes.model_indexes()
+    assert set(schema) == set(models)
+    for table, keys in models.items():
+        assert keys == schema[table], table
+
+def test_indexes_are_matched_by_columns_not_name(app):
+    """Test schema.sql-named indexes (idx_status, ...) count as present: ensure adds no duplicates"""
+    for model_name, schema_name, columns in (('ix_events_status', 'idx_status', 'status'),
+                                             ('ix_events_created_at', 'idx_created', 'created_at'),
+                                             ('idx_events_location', 'idx_location', 'latitude, longitude')):
+        db.session.execute(text(f'DROP INDEX {model_name}'))
+        db.session.execute(text(f'CREATE INDEX {schema_name} ON events ({columns})'))
+    db.session.commit()
+    assert indexes.missing_indexes() == []
+
+def test_ensure_indexes_adds_missing(app, runner):
+    db.session.execute(text('DROP INDEX idx_requests_status_created'))
+    db.session.commit()
+    assert [index.name for index in indexes.missing_indexes()] == ['idx_requests_status_created']
+
+    result = runner.invoke(args=['indexes', 'ensure'])
+    assert 'idx_requests_status_created' in result.output
+    assert indexes.missing_indexes() == []
+    assert 'All model columns and indexes present' in runner.invoke(args=['indexes', 'check']).output
+
+def test_ensure_upgrades_the_shipped_sqlite_database(tmp_path):
+    """Test `indexes ensure` adds new columns and stops id reuse on a database made by older models"""
+    from app import create_app
+    from conftest import TestConfig
+    from models import RequestArchive
+    shutil.copy(os.path.join(os.path.dirname(__file__), '..', 'backend', 'disaster.db'), tmp_path / 'old.db')
+    
+    class OldDatabaseConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'old.db'}"
+    
+    app = create_app(OldDatabaseConfig)
+    with app.app_context():
+        db.create_all()
+        assert [f'{c.table.name}.{c.name}' for c in indexes.missing_columns()] == ['requests.approved_quantity']
+        assert 'requests' in [table.name for table in indexes.reusing_ids()]
+        db.session.add(RequestArchive(id=500, user_id=2, resource_id=1, event_id=1, quantity=1, status='Rejected'))
+        db.session.commit()
+        
+        result = app.test_cli_runner().invoke(args=['indexes', 'ensure'])
+        assert 'requests.approved_quantity' in result.output
+        assert 'All model columns and indexes present' in app.test_cli_runner().invoke(args=['indexes', 'check']).output
+        
+        request_obj = Request(user_id=2, resource_id=1, event_id=1, quantity=3)
+        db.session.add(request_obj)
+        db.session.commit()
+        assert request_obj.id > 500
+        
+        client = app.test_client()
+        login(client, 'john@example.com', 'password123')
+        assert client.get('/user/dashboard').status_code == 200
+        assert client.post('/user/requests', json={'resource_id': 1, 'event_id': 1, 'quantity': 2}).status_code == 201
+        db.session.remove()
@@ -0,0 +1,113 @@
+import sqlite3
+import time
+import pytest
+from extensions import db
+from models import User, Event, Resource
+from services import replicas
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+@pytest.fixture
+def split_app(tmp_path):
+    """Primary and replica SQLite files; replication only happens when replicate() is called"""
+    from app import create_app
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    
+    class SplitConfig:
+        TESTING = True
+        SECRET_KEY = 'test-key'
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{primary}'
+        SQLALCHEMY_BINDS = {'replica': f'sqlite:///{replica}'}
+        REPLICA_STICKY_SECONDS = 30
+        FRAGMENT_CACHE_ENABLED = False
+    
+    def replicate():
+        source, target = sqlite3.connect(primary), sqlite3.connect(replica)
+        source.backup(target)
+        source.close()
+        target.close()
+    
+    app = create_app(SplitConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(name='John Doe', email='john@example.com', phone='+1234567891')
+        user.set_password('password123')
+        db.session.add(user)
+        db.session.add(Event(name='Test Event', latitude=0.0, longitude=0.0))
+        db.session.add(Resource(name='Water', category='Food', total_quantity=100, available_quantity=100))
+        db.session.commit()
+        replicate()
+        
+        yield app, replicate
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registers an (empty) metadata per bind on the shared db object
+    db.metadatas.pop('replica', None)
+
+def event_names(client):
+    return sorted(event['name'] for event in client.get('/user/events').get_json())
+
+def test_get_views_read_from_replica(split_app):
+    """Test GET reads see the replica, lag included, until it catches up"""
+    app, replicate = split_app
+    client = app.test_client()
+    login(client, 'john@example.com', 'password123')
+    
+    db.session.add(Event(name='Flood', latitude=1.0, longitude=1.0))
+    db.session.commit()
+    assert event_names(client) == ['Test Event']  # replica still lagging
+    
+    replicate()
+    assert event_names(client) == ['Flood', 'Test Event']
+
+def test_reads_stick_to_primary_after_a_write(split_app):
+    """Test a user sees their own donation despite replication lag"""
+    app, replicate = split_app
+    client = app.test_client()
+    other = app.test_client()
+    login(client, 'john@example.com', 'password123')
+    login(other, 'john@example.com', 'password123')
+    resource_id = Resource.query.first().id
+    
+    assert client.post('/user/donate', json={'resource_id': resource_id, 'quantity': 10}).status_code == 201
+    assert client.get('/user/resources').get_json()[0]['available_quantity'] == 110
+    # Another session without the write still reads the lagging replica
+    assert other.get('/user/resources').get_json()[0]['available_quantity'] == 100
+    
+    # Once the sticky window is over, reads go back to the replica
+    with client.session_transaction() as session:
+        session['_primary_until'] = time.time() - 1
+    assert client.get('/user/resources').get_json()[0]['available_quantity'] == 100
+    replicate()
+    assert client.get('/user/resources').get_json()[0]['available_quantity'] == 110
+
+def test_failed_writes_do_not_stick(split_app):
+    """Test only successful writes pin reads to the primary"""
+    app, replicate = split_app
+    client = app.test_client()
+    login(client, 'john@example.com', 'password123')
+    
+    assert client.post('/user/donate', json={'resource_id': 999, 'quantity': 1}).status_code == 404
+    with client.session_transaction() as session:
+        assert '_primary_until' not in session
+
+def test_writes_and_background_reads_use_primary(split_app):
+    """Test reads outside a request never touch the replica"""
+    app, replicate = split_app
+    db.session.add(Event(name='Primary only', latitude=0.0, longitude=0.0))
+    db.session.commit()
+    
+    assert Event.query.filter_by(name='Primary only').count() == 1
+    assert db.session.get_bind(clause=db.select(Event)) is db.engines[None]
+    assert not replicas.reading_from_replica()
+
+def test_no_replica_configured_uses_primary(client, app):
+    """Test the default single-database setup is unchanged"""
+    assert not replicas.replica_configured(app)
+    login(client, 'john@example.com', 'password123')
+    assert client.get('/user/events').status_code == 200
@@ -0,0 +1,138 @@
+import threading
+
+import numpy as np
+import pytest
+from extensions import db
+from models import User, Event, Request, VolunteerAssignment
+from services import routing
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+@pytest.fixture
+def stops(app):
+    """Approved requests at three events along a line, plus one far away"""
+    user = User.query.filter_by(email='john@example.com').first()
+    user.is_volunteer = True
+    events = [Event(name=f'Stop {i}', latitude=0.0, longitude=lon) for i, lon in enumerate([0.1, 0.2, 0.3, 5.0])]
+    db.session.add_all(events)
+    db.session.flush()
+    quantities = {0: [10, 20], 1: [30], 2: [40], 3: [5]}
+    for index, amounts in quantities.items():
+        for quantity in amounts:
+            db.session.add(Request(user_id=user.id, resource_id=1, event_id=events[index].id,
+                                   quantity=quantity, urgency='Medium', status='Approved'))
+    db.session.commit()
+    return events
+
+def test_two_opt_removes_crossings():
+    """Test 2-opt untangles a zig-zag path over points on a line"""
+    lon = np.array([0.0, 3.0, 1.0, 4.0, 2.0, 5.0])
+    dist = routing.distance_matrix(np.zeros(6), lon)
+    zigzag = [0, 1, 2, 3, 4, 5]
+    improved = routing.two_opt(zigzag, dist)
+    assert list(lon[improved]) == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    assert routing.route_length(improved, dist) < routing.route_length(np.array(zigzag), dist)
+
+def test_two_opt_reverses_the_tail():
+    """Test the open end can move: reversing the last two stops is the only improving move"""
+    lon = np.array([0.0, 1.0, 3.0, 2.0])
+    dist = routing.distance_matrix(np.zeros(4), lon)
+    improved = routing.two_opt([0, 1, 2, 3], dist)
+    assert list(lon[improved]) == [0.0, 1.0, 2.0, 3.0]
+
+def test_plan_groups_requests_by_event_in_visiting_order(client, stops):
+    """Test a route visits nearby events in order, loading all their requests"""
+    login(client, 'john@example.com', 'password123')
+    response = client.get('/volunteer/routes/plan?lat=0&lon=0&capacity=100&max_stops=3')
+    assert response.status_code == 200
+    plan = response.json
+    assert [stop['event_id'] for stop in plan['stops']] == [e.id for e in stops[:3]]
+    assert plan['stops'][0]['quantity'] == 30
+    assert len(plan['stops'][0]['request_ids']) == 2
+    assert plan['quantity'] == 100
+    assert plan['total_km'] == pytest.approx(33.4, abs=0.5)
+
+def test_plan_respects_capacity(client, stops):
+    """Test stops are only loaded with what still fits"""
+    login(client, 'john@example.com', 'password123')
+    plan = client.get('/volunteer/routes/plan?lat=0&lon=0&capacity=45').json
+    assert sum(stop['quantity'] for stop in plan['stops']) <= 45
+    # 10 + 20 at the first stop, the 30 and 40 do not fit, the far-away 5 does
+    assert [stop['quantity'] for stop in plan['stops']] == [30, 5]
+
+def test_claim_is_all_or_nothing(client, stops):
+    """Test a route with one already-taken request claims nothing"""
+    login(client, 'john@example.com', 'password123')
+    plan = client.get('/volunteer/routes/plan?lat=0&lon=0&capacity=100').json
+    request_ids = [i for stop in plan['stops'] for i in stop['request_ids']]
+
+    other = User(name='Other', email='other@example.com', phone='1', password_hash='x', is_volunteer=True)
+    db.session.add(other)
+    db.session.flush()
+    db.session.add(VolunteerAssignment(user_id=other.id, request_id=request_ids[-1], status='In Progress'))
+    db.session.commit()
+
+    response = client.post('/volunteer/routes/claim', json={'request_ids': request_ids})
+    assert response.status_code == 409
+    assert VolunteerAssignment.query.count() == 1
+
+    response = client.post('/volunteer/routes/claim', json={'request_ids': request_ids[:-1]})
+    assert response.status_code == 200
+    assert response.json['claimed'] == len(request_ids) - 1
+    mine = VolunteerAssignment.query.filter(VolunteerAssignment.user_id != other.id).all()
+    assert sorted(a.request_id for a in mine) == sorted(request_ids[:-1])
+
+    # Claimed requests are no longer offered; only the far-away stop is left
+    plan = client.get('/volunteer/routes/plan?lat=0&lon=0').json
+    assert [stop['event_id'] for stop in plan['stops']] == [stops[3].id]
+
+def test_routes_require_volunteer(client, stops):
+    login(client, 'admin@disaster.org', 'password123')
+    assert client.get('/volunteer/routes/plan').status_code == 403
+    assert client.post('/volunteer/routes/claim', json={'request_ids': [1]}).status_code == 403
+
+def test_concurrent_claims_never_share_a_request(file_app):
+    """Test volunteers claiming overlapping routes at once each get all of theirs or nothing"""
+    volunteers = []
+    for i in range(3):
+        volunteer = User(name=f'Volunteer {i}', email=f'volunteer{i}@example.com', phone='1', is_volunteer=True)
+        volunteer.set_password('password123')
+        volunteers.append(volunteer)
+    db.session.add_all(volunteers)
+    db.session.add_all([Request(user_id=2, resource_id=1, event_id=1, quantity=1, status='Approved')
+                        for _ in range(40)])
+    db.session.commit()
+    request_ids = [r.id for r in Request.query.order_by(Request.id)]
+    
+    start = threading.Barrier(3)
+    results = {}
+    
+    def claimer(i):
+        # Overlapping batches of 5, in a different order per volunteer
+        batches = [request_ids[j:j + 5] for j in range(0, 40, 5)]
+        batches = batches[i:] + batches[:i]
+        with file_app.app_context():
+            client = file_app.test_client()
+            login(client, f'volunteer{i}@example.com', 'password123')
+            start.wait()
+            results[i] = [(batch, client.post('/volunteer/routes/claim', json={'request_ids': batch}).status_code)
+                          for batch in batches]
+            db.session.remove()
+    
+    threads = [threading.Thread(target=claimer, args=(i,)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    db.session.expire_all()
+    assignments = VolunteerAssignment.query.all()
+    assert sorted(a.request_id for a in assignments) == request_ids
+    for i, volunteer in enumerate(volunteers):
+        won = sorted(request_id for batch, status in results[i] if status == 200 for request_id in batch)
+        assert {status for _, status in results[i]} <= {200, 409}
+        assert sorted(a.request_id for a in assignments if a.user_id == volunteer.id) == won
@@ -0,0 +1,132 @@
+import pytest
+from extensions import db
+from models import User, Event, Resource, Donation, Request, AdminResponse, SearchDocument
+from sqlalchemy import inspect
+from services import search, archive
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+@pytest.fixture
+def corpus(app):
+    user = User.query.filter_by(email='john@example.com').first()
+    admin = User.query.filter_by(email='admin@disaster.org').first()
+    flood = Event(name='River Flood', description='Levee breach, evacuation of riverside homes', latitude=1, longitude=1)
+    fire = Event(name='Wildfire', description='Smoke and evacuation near the river valley', latitude=2, longitude=2)
+    blankets = Resource(name='Thermal Blankets', category='Shelter', description='Emergency blankets')
+    db.session.add_all([flood, fire, blankets])
+    db.session.flush()
+    donation = Donation(user_id=user.id, resource_id=blankets.id, event_id=flood.id, quantity=5,
+                        notes='Dropped at the riverside shelter')
+    request_obj = Request(user_id=user.id, resource_id=blankets.id, event_id=fire.id, quantity=2)
+    db.session.add_all([donation, request_obj])
+    db.session.flush()
+    db.session.add(AdminResponse(request_id=request_obj.id, admin_id=admin.id, action='Approved',
+                                 comment='Deliver via the north valley road'))
+    db.session.commit()
+    return flood.id, fire.id
+
+def results(client, query):
+    response = client.get(f'/search?{query}')
+    assert response.status_code == 200
+    return [(r['type'], r['title']) for r in response.get_json()['results']]
+
+def test_search_ranks_titles_above_bodies(client, corpus):
+    """Test matches are ranked with title hits first"""
+    login(client, 'admin@disaster.org', 'password123')
+    found = results(client, 'q=river')
+    assert found[0] == ('event', 'River Flood')
+    assert ('event', 'Wildfire') in found  # "river" only in its description
+    assert ('donation', 'Thermal Blankets') in found  # stemmed/prefix: riverside
+
+def test_search_filters_by_type_and_event(client, corpus):
+    """Test entity type and event filters"""
+    flood_id, fire_id = corpus
+    login(client, 'admin@disaster.org', 'password123')
+    assert results(client, 'q=valley&type=admin_response') == [('admin_response', 'Approved')]
+    assert results(client, f'q=evacuation&event_id={fire_id}') == [('event', 'Wildfire')]
+    assert results(client, 'q=blank&type=resource') == [('resource', 'Thermal Blankets')]  # prefix of the last term
+
+def test_regular_users_only_see_public_types(client, corpus):
+    """Test notes and admin comments are admin-only"""
+    login(client, 'john@example.com', 'password123')
+    assert {kind for kind, _ in results(client, 'q=river')} == {'event'}
+    assert client.get('/search?q=valley&type=admin_response').status_code == 403
+    assert client.get('/search?q=valley&type=bogus').status_code == 400
+    assert client.get('/search?q=').status_code == 400
+
+def test_index_follows_writes(client, corpus):
+    """Test edits, deletes and archival keep the index in sync"""
+    flood_id, fire_id = corpus
+    login(client, 'admin@disaster.org', 'password123')
+    
+    fire = db.session.get(Event, fire_id)
+    fire.name = 'Canyon Wildfire'
+    db.session.commit()
+    assert ('event', 'Canyon Wildfire') in results(client, 'q=canyon')
+    
+    # Quantity-only updates do not rewrite documents
+    blankets = Resource.query.filter_by(name='Thermal Blankets').one()
+    document = SearchDocument.query.filter_by(entity_type='resource', entity_id=blankets.id).one()
+    before = document.updated_at
+    blankets.available_quantity = 3
+    db.session.commit()
+    assert document.updated_at == before
+    
+    db.session.get(Event, flood_id).status = 'Resolved'
+    db.session.commit()
+    archive.archive_closed_events()
+    assert results(client, 'q=levee') == []
+    assert ('donation', 'Thermal Blankets') not in results(client, 'q=riverside')
+
+def test_reindex_rebuilds_from_source_tables(app, corpus):
+    """Test a full rebuild produces the same searchable set"""
+    count = SearchDocument.query.count()
+    assert count == 7  # 3 events, 2 resources, 1 donation note, 1 admin comment
+    SearchDocument.query.delete()
+    assert search.reindex() == count
+    assert [r['title'] for r in search.search('levee')] == ['River Flood']
+
+def test_query_syntax_is_sanitized(app, corpus):
+    """Test FTS operators in user input are treated as plain words"""
+    assert search.search('(river* -') != []
+    assert search.search('***') == []
+    assert search.fts5_query(['river', 'flo']) == '{title body}: ("river" "flo"*)'
+    assert search.fts5_query(['fl']) == '{title body}: ("fl")'
+    assert search.fts5_query(['flood'], ['event', 'admin_response'], 3) == \
+        '{title body}: ("flood"*) AND tags: (typeevent OR typeadminresponse) AND tags: event3'
+
+def test_older_better_matches_are_ranked(app, corpus):
+    """Test ranking covers every match, not just the newest ones"""
+    newer = [{'entity_type': 'resource', 'entity_id': 1000 + i, 'title': f'Sandbags {i}',
+              'body': 'Stacked along the levee by volunteers from the north side of town'} for i in range(1200)]
+    db.session.execute(db.insert(SearchDocument), newer)
+    db.session.commit()
+    found = search.search('levee', limit=5)
+    assert found[0]['title'] == 'River Flood'  # oldest match, shortest body
+    assert len(search.search('levee', limit=5, offset=1195)) == 5
+
+def test_results_are_cached_until_the_index_changes(app, corpus):
+    """Test repeated queries are served from the cache and writes invalidate it"""
+    cache = app.extensions['search_cache']
+    assert [r['title'] for r in search.search('levee')] == ['River Flood']
+    hits = cache.hits
+    assert [r['title'] for r in search.search('levee')] == ['River Flood']
+    assert cache.hits == hits + 1
+    
+    db.session.add(Event(name='Levee Repair', description='Sandbagging', latitude=3, longitude=3))
+    db.session.commit()
+    assert [r['title'] for r in search.search('levee')] == ['Levee Repair', 'River Flood']
+
+def test_fulltext_index_is_mysql_only(app):
+    """Test SQLite gets no B-tree stand-in for the MySQL FULLTEXT index"""
+    assert 'ft_search_text' not in {index['name'] for index in inspect(db.engine).get_indexes('search_documents')}
+
+def test_snippet_starts_near_the_first_hit():
+    """Test snippets window the body around the first matching word"""
+    body = ' '.join(f'w{i}' for i in range(30)) + ' flooding downstream'
+    assert search.snippet(body, ['flood'], size=4) == '…w28 w29 flooding downstream'
+    assert search.snippet('Levee breach, evacuation', ['zzz'], size=2) == 'Levee breach…'
@@ -0,0 +1,34 @@
+import pytest
+from app import create_app, setup_database, warm_app
+from extensions import db
+from models import Event
+from services import compression
+from conftest import TestConfig
+
+def test_warm_app_precompiles_templates_and_map_feed(client, app):
+    """Test warm-up compiles every template and precompresses the map feed"""
+    db.session.add_all(Event(name=f'Event {i}', latitude=i, longitude=-i) for i in range(30))
+    db.session.commit()
+    compression.body_cache.clear()
+    warm_app(app)
+    
+    cached_templates = {template.name for template in app.jinja_env.cache.values()}
+    assert set(app.jinja_env.list_templates()) <= cached_templates
+    assert len(compression.body_cache) == len(compression.available_encodings())
+    
+    client.post('/auth/login', json={'email': 'john@example.com', 'password': 'password123'})
+    response = client.get('/user/events/map', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(compression.body_cache) == len(compression.available_encodings())
+
+def test_production_startup_skips_schema_creation(tmp_path):
+    """Test AUTO_CREATE_SCHEMA=False leaves the schema to migrations"""
+    class ProductionConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'prod.db')
+        AUTO_CREATE_SCHEMA = False
+    
+    app = create_app(ProductionConfig)
+    setup_database(app)
+    
+    with app.app_context():
+        assert db.inspect(db.engine).get_table_names() == []
@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import update
+from extensions import db
+from models import User, Event, Resource, Request, StockAlert
+from services import stock_alerts
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+def approve(client, quantity):
+    user = User.query.filter_by(email='john@example.com').first()
+    request_obj = Request(user_id=user.id, resource_id=Resource.query.first().id,
+                          event_id=Event.query.first().id, quantity=quantity)
+    db.session.add(request_obj)
+    db.session.commit()
+    return client.post(f'/admin/requests/{request_obj.id}/action', json={'action': 'approve'})
+
+def test_stock_status_matches_view_thresholds():
+    """Test levels follow resource_availability_view"""
+    assert stock_alerts.stock_status(0, 100) == 'Out of Stock'
+    assert stock_alerts.stock_status(9, 100) == 'Low Stock'
+    assert stock_alerts.stock_status(29, 100) == 'Medium Stock'
+    assert stock_alerts.stock_status(30, 100) == 'Good Stock'
+
+def test_alerts_on_approval_and_donation_edges(client, app):
+    """Test alerts fire only when entering or leaving Low / Out of Stock"""
+    login(client, 'admin@disaster.org', 'password123')
+    
+    assert approve(client, 75).status_code == 200  # Good -> Medium: no alert
+    assert StockAlert.query.count() == 0
+    assert approve(client, 20).status_code == 200  # Medium -> Low
+    assert approve(client, 3).status_code == 200   # still Low: no alert
+    assert approve(client, 2).status_code == 200   # Low -> Out
+    
+    response = client.post('/user/donate', json={'resource_id': Resource.query.first().id, 'quantity': 50})
+    assert response.status_code == 201             # 50 of 150 -> Good
+    
+    alerts = client.get('/admin/alerts').get_json()['alerts']
+    assert [(a['previous_status'], a['status']) for a in alerts] == [
+        ('Medium Stock', 'Low Stock'), ('Low Stock', 'Out of Stock'), ('Out of Stock', 'Good Stock')]
+    assert alerts[-1]['available_quantity'] == 50
+    assert alerts[-1]['total_quantity'] == 150
+    
+    since = alerts[0]['id']
+    newer = client.get(f'/admin/alerts?since={since}').get_json()['alerts']
+    assert [a['id'] for a in newer] == [a['id'] for a in alerts[1:]]
+    
+    # Committed alerts reach the in-process feed too
+    feed = stock_alerts.get_feed(app)
+    assert [a['id'] for a in feed.wait(since, timeout=0)] == [a['id'] for a in alerts[1:]]
+
+def test_rolled_back_change_publishes_nothing(app):
+    """Test alerts from a rolled back transaction are never published"""
+    resource = Resource.query.first()
+    resource.available_quantity = 0
+    db.session.flush()
+    assert StockAlert.query.count() == 1
+    db.session.rollback()
+    
+    assert StockAlert.query.count() == 0
+    assert stock_alerts.get_feed(app).wait(0, timeout=0) == []
+
+def test_check_resource_after_raw_write(app):
+    """Test the stored-procedure path compares against the pre-write levels"""
+    resource_id = Resource.query.first().id
+    before = (100, 100)
+    db.session.execute(update(Resource).where(Resource.id == resource_id).values(available_quantity=5))
+    
+    alert = stock_alerts.check_resource(db.session, resource_id, before)
+    db.session.commit()
+    assert (alert.previous_status, alert.status) == ('Good Stock', 'Low Stock')
+    assert stock_alerts.check_resource(db.session, resource_id, (5, 100)) is None
+
+def test_alerts_require_admin(client, app):
+    """Test regular users cannot read the alert feed"""
+    login(client, 'john@example.com', 'password123')
+    assert client.get('/admin/alerts').status_code == 403
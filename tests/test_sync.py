@@ -0,0 +1,138 @@
+import pytest
+from sqlalchemy import event as sa_event
+from extensions import db
+from models import User, Event, Resource, Request, VolunteerAssignment, ChangeLog
+from services import archive, changelog
+
+def login(client, email, password):
+    return client.post('/auth/login', json={
+        'email': email,
+        'password': password
+    }, follow_redirects=True)
+
+def sync(client, token=None):
+    response = client.get('/sync' if token is None else f'/sync?since={token}')
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_full_snapshot_then_delta(client, app):
+    """Test a client only receives rows changed since its token"""
+    login(client, 'john@example.com', 'password123')
+    snapshot = sync(client)
+    assert snapshot['full'] is True
+    assert [e['name'] for e in snapshot['changes']['events']] == ['Test Event']
+    token = snapshot['token']
+    
+    resource = Resource.query.first()
+    assert client.post('/user/donate', json={'resource_id': resource.id, 'quantity': 5}).status_code == 201
+    response = client.post('/user/requests', json={'resource_id': resource.id, 'event_id': Event.query.first().id, 'quantity': 2})
+    request_id = response.get_json()['request_id']
+    db.session.add(Event(name='Flood', latitude=1.0, longitude=2.0))
+    db.session.commit()
+    
+    delta = sync(client, token)
+    assert delta['full'] is False
+    assert [e['name'] for e in delta['changes']['events']] == ['Flood']
+    assert delta['changes']['resources'][0]['available_quantity'] == 105
+    assert [r['id'] for r in delta['changes']['requests']] == [request_id]
+    assert delta['changes']['volunteer_assignments'] == []
+    
+    # Nothing new: empty delta and the same token
+    again = sync(client, delta['token'])
+    assert again['token'] == delta['token']
+    assert all(rows == [] for rows in again['changes'].values())
+    assert all(ids == [] for ids in again['deleted'].values())
+
+def test_deletes_and_archival_become_tombstones(client, app):
+    """Test deleted and archived rows are reported as tombstones"""
+    user = User.query.filter_by(email='john@example.com').first()
+    flood = Event(name='Flood', latitude=1.0, longitude=2.0, status='Resolved')
+    db.session.add(flood)
+    db.session.flush()
+    request_obj = Request(user_id=user.id, resource_id=Resource.query.first().id, event_id=flood.id, quantity=1)
+    extra = Event(name='Duplicate', latitude=0.0, longitude=0.0)
+    db.session.add_all([request_obj, extra])
+    db.session.commit()
+    flood_id, request_id, extra_id = flood.id, request_obj.id, extra.id
+    
+    login(client, 'john@example.com', 'password123')
+    token = sync(client)['token']
+    
+    db.session.delete(extra)
+    db.session.commit()
+    archive.archive_closed_events()
+    
+    delta = sync(client, token)
+    assert delta['deleted']['events'] == sorted([flood_id, extra_id])
+    assert delta['deleted']['requests'] == [request_id]
+    assert delta['changes']['events'] == []
+
+def test_private_rows_only_reach_their_owner(client, app):
+    """Test requests and assignments of other users are filtered out"""
+    admin = User.query.filter_by(email='admin@disaster.org').first()
+    request_obj = Request(user_id=admin.id, resource_id=Resource.query.first().id,
+                          event_id=Event.query.first().id, quantity=1)
+    db.session.add(request_obj)
+    db.session.flush()
+    db.session.add(VolunteerAssignment(user_id=admin.id, request_id=request_obj.id))
+    db.session.commit()
+    
+    login(client, 'john@example.com', 'password123')
+    assert sync(client)['changes']['requests'] == []
+    assert sync(client, 0)['changes']['volunteer_assignments'] == []
+    
+    client.get('/auth/logout')
+    login(client, 'admin@disaster.org', 'password123')
+    delta = sync(client, 0)
+    assert [r['id'] for r in delta['changes']['requests']] == [request_obj.id]
+    assert len(delta['changes']['volunteer_assignments']) == 1
+
+def test_rolled_back_changes_are_not_logged(app):
+    """Test change log entries share the transaction of the change"""
+    before = ChangeLog.query.count()
+    db.session.add(Event(name='Ghost', latitude=0.0, longitude=0.0))
+    db.session.flush()
+    assert ChangeLog.query.count() == before + 1
+    db.session.rollback()
+    assert ChangeLog.query.count() == before
+
+def test_paging_and_compaction(client, app):
+    """Test paged delta sync and that compaction keeps every token valid"""
+    app.config['SYNC_PAGE_SIZE'] = 2
+    resource = Resource.query.first()
+    start = changelog.current_token()
+    for quantity in (90, 80, 70):
+        resource.available_quantity = quantity
+        db.session.commit()
+    db.session.add(Event(name='Storm', latitude=0.0, longitude=0.0))
+    db.session.commit()
+    
+    login(client, 'john@example.com', 'password123')
+    first = sync(client, start)
+    assert first['more'] is True
+    second = sync(client, first['token'])
+    assert second['more'] is False
+    assert second['changes']['resources'][0]['available_quantity'] == 70
+    assert [e['name'] for e in second['changes']['events']] == ['Storm']
+    
+    assert changelog.compact() == 3  # the seeded insert and the 90 and 80 updates
+    compacted = sync(client, start)
+    assert compacted['changes']['resources'][0]['available_quantity'] == 70
+    assert compacted['more'] is False
+
+def test_no_change_sync_is_one_query(app):
+    """Test an up-to-date client costs a single change log lookup"""
+    token = changelog.current_token()
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    sa_event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        latest, new_token, more = changelog.changes_since(token, user_id=2)
+    finally:
+        sa_event.remove(db.engine, 'before_cursor_execute', count)
+    
+    assert (latest, new_token, more) == ({}, token, False)
+    assert len(statements) == 1
+    assert 'change_log' in statements[0]
@@ -1,4 +1,5 @@
 import pytest
+import re
 from extensions import db
 from models import User, Resource, Event
 
@@ -49,4 +50,85 @@ def test_create_request(client, app):
         })
         
         assert response.status_code == 201
-        assert b'Request submitted successfully' in response.data
\ No newline at end of file
+        assert b'Request submitted successfully' in response.data
+
+def test_map_feed_is_columnar(client, app):
+    """Test the compact map feed packs markers into parallel arrays"""
+    login(client, 'john@example.com', 'password123')
+    
+    with app.app_context():
+        event_id = Event.query.first().id
+        db.session.add(Event(name='Flood', description='x' * 500, latitude=27.66481, longitude=-81.51581, severity='Critical'))
+        db.session.commit()
+    
+    response = client.get('/user/events/map')
+    assert response.status_code == 200
+    feed = response.get_json()
+    
+    assert feed['id'][0] == event_id
+    assert len(feed['id']) == len(feed['lat']) == len(feed['lon']) == len(feed['sev']) == 2
+    assert feed['lat'][1] / feed['scale'] == 27.66481
+    assert feed['severities'][feed['sev'][1]] == 'Critical'
+    assert b'description' not in response.data
+
+def test_map_feed_compression_and_revalidation(client, app):
+    """Test gzip negotiation and ETag revalidation on the map feed"""
+    import gzip
+    import json
+    login(client, 'john@example.com', 'password123')
+    
+    with app.app_context():
+        for i in range(20):
+            db.session.add(Event(name=f'Event {i}', latitude=10.0 + i, longitude=20.0 + i, severity='High'))
+        db.session.commit()
+    
+    plain = client.get('/user/events/map')
+    assert 'Content-Encoding' not in plain.headers
+    
+    zipped = client.get('/user/events/map', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert zipped.headers['Vary'] == 'Accept-Encoding'
+    assert json.loads(gzip.decompress(zipped.data)) == plain.get_json()
+    assert len(zipped.data) < len(plain.data)
+    
+    etag = zipped.headers['ETag']
+    cached = client.get('/user/events/map', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+def test_event_details(client, app):
+    """Test lazy per-event detail endpoint used by map popups"""
+    login(client, 'john@example.com', 'password123')
+    
+    with app.app_context():
+        event_id = Event.query.first().id
+    
+    response = client.get(f'/user/events/{event_id}')
+    assert response.status_code == 200
+    assert response.get_json()['description'] == 'Test Desc'
+    
+    assert client.get('/user/events/9999').status_code == 404
+
+def test_dashboard_fragments_follow_data_versions(client, app):
+    """Test cached dashboard fragments are reused and invalidated on writes"""
+    login(client, 'john@example.com', 'password123')
+    cache = app.extensions['fragment_cache']
+    
+    first = client.get('/user/dashboard')
+    assert b'Test Event' in first.data
+    misses = cache.misses
+    
+    second = client.get('/user/dashboard')
+    assert second.data == first.data
+    assert cache.misses == misses
+    assert cache.hits > 0
+    
+    # Write through the fixture's session, which the test client shares
+    resource = Resource.query.first()
+    resource.available_quantity = 42
+    db.session.add(Event(name='New Flood', latitude=1.0, longitude=2.0))
+    db.session.commit()
+    
+    third = client.get('/user/dashboard')
+    assert b'New Flood' in third.data
+    assert re.search(rb'Available:\s+42\)', third.data)